@@ -0,0 +1,330 @@
+"""
+Benchmarks for the summary pipeline and the dashboard aggregations.
+
+For each size a synthetic raw extract shaped like the Superstore sample is
+generated (sales_analytics.synthetic), pushed through
+notebooks/generate_summary_tables.run_full() with its stages timed by the
+pipeline's own StageProfiler, and the dashboard's load step and
+panel aggregations are timed headlessly for an unfiltered and a filtered
+state; when duckdb is installed the same panels are also timed on the SQL
+backend (sales_analytics.sql_backend). Every size runs in a fresh process,
+so peak RSS belongs to that size alone. Results are written as JSON with seconds, rows per second and peak
+RSS per stage, and compared against a baseline stored on the same machine.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10k,1m
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --save-baseline
+    python benchmarks/run_benchmarks.py --sizes 10m,100m --chunksize 1000000 --skip dashboard
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'notebooks'))
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+RESULTS_PATH = os.path.join(ROOT, 'benchmarks', 'results.json')
+SIZE_SUFFIXES = {'k': 10 ** 3, 'm': 10 ** 6}
+# Stages faster than this are too noisy to flag as regressions
+NOISE_FLOOR_SECONDS = 0.05
+# Output path constants of generate_summary_tables and where a benchmark run writes them
+PIPELINE_OUTPUTS = {
+    'PROCESSED_DATA_PATH': 'FactSales_clean.csv',
+    'FACT_STORE_PATH': 'FactSales_parquet',
+    'STAR_SCHEMA_PATH': 'star',
+    'CUBE_PATH': 'SalesCube.parquet',
+    'MANIFEST_PATH': 'manifest.json',
+    'INCREMENTAL_STATE_DIR': 'incremental',
+    'SUMMARY_TABLES_DIR': 'tables',
+    'SUMMARY_TABLES_PATH': os.path.join('tables', 'Summary_Tables.xlsx'),
+    'DATA_QUALITY_PATH': 'data_quality_report.json',
+    'SCALING_REPORT_PATH': 'scaling_report.json',
+}
+
+# The columns streamlit_dashboard.PANEL_COLUMNS loads
+DASHBOARD_COLUMNS = [
+    'Category', 'CustomerID', 'CustomerName', 'Date', 'Discount', 'Month', 'OrderID', 'Product', 'Profit',
+    'Quantity', 'Quarter', 'Region', 'Revenue', 'Segment', 'SubCategory', 'UnitPrice', 'Year',
+]
+# The panels the dashboard draws for one filter state (sales_analytics.panels)
+PANELS = [
+    'totals', 'orders', 'monthly', 'region', 'category', 'subcategory', 'segment', 'quarterly', 'profit_bins',
+    'scatter_points', 'top_products', 'top_customers', 'correlation', 'numeric_summary', 'time_intelligence',
+]
+# Panels aggregating the filtered rows rather than the cube cells
+ROW_PANELS = {'profit_bins', 'scatter_points', 'top_products', 'top_customers', 'numeric_summary'}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def size_label(rows):
+    for suffix, factor in sorted(SIZE_SUFFIXES.items(), key=lambda item: -item[1]):
+        if rows >= factor and rows % factor == 0:
+            return f'{rows // factor}{suffix}'
+    return str(rows)
+
+
+def _round_mb(value):
+    return None if value is None else round(value, 1)
+
+
+def peak_rss_mb():
+    """High-water RSS of this process and of its largest finished child; None where resource is unavailable"""
+    from sales_analytics.profiling import peak_rss_bytes
+
+    own, children = peak_rss_bytes(), peak_rss_bytes('children')
+    return tuple(None if peak is None else round(peak / 2 ** 20, 1) for peak in (own, children))
+
+
+class StageTimer:
+    """Records wall time, throughput and peak RSS of named stages"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, rows, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        own, children = peak_rss_mb()
+        self.stages[name] = {
+            'seconds': round(seconds, 4),
+            'rows': int(rows),
+            'rows_per_second': round(rows / seconds) if seconds > 0 else None,
+            'peak_rss_mb': own,
+            'peak_child_rss_mb': children,
+        }
+        return result
+
+
+def bench_pipeline(timer, raw_path, work_dir, rows, chunksize, workers, export_formats):
+    """
+    generate_summary_tables.run_full() with its outputs redirected into
+    `work_dir`; each stage its StageProfiler records becomes pipeline.<stage>
+    """
+    import generate_summary_tables as pipeline
+    from sales_analytics.profiling import StageProfiler
+
+    for constant, name in PIPELINE_OUTPUTS.items():
+        setattr(pipeline, constant, os.path.join(work_dir, name))
+    profiler = StageProfiler(log=lambda message: None)
+    # The pipeline reports progress on stdout, which carries this process's results
+    with contextlib.redirect_stdout(sys.stderr):
+        timer.run('pipeline', rows, pipeline.run_full, raw_path, chunksize=chunksize, workers=workers,
+                  export_formats=export_formats, profiler=profiler)
+    for record in profiler.stages:
+        stage_rows = next((count for count in (record['rows_in'], record['rows_out']) if count is not None), rows)
+        seconds = record['wall_seconds']
+        timer.stages[f'pipeline.{record["name"]}'] = {
+            'seconds': round(seconds, 4),
+            'cpu_seconds': round(record['cpu_seconds'], 4),
+            'rows': int(stage_rows),
+            'rows_per_second': round(stage_rows / seconds) if seconds > 0 else None,
+            'peak_rss_delta_mb': _round_mb(record['peak_rss_delta_mb']),
+            **({'breakdown': {step: round(value, 4) for step, value in record['breakdown'].items()}}
+               if record.get('breakdown') else {}),
+        }
+    return {key: os.path.join(work_dir, PIPELINE_OUTPUTS[constant]) for key, constant in
+            [('csv', 'PROCESSED_DATA_PATH'), ('store', 'FACT_STORE_PATH'), ('cube', 'CUBE_PATH')]}
+
+
+def bench_dashboard(timer, paths, rows):
+    """The dashboard's load step and every panel aggregation, unfiltered and filtered"""
+    from sales_analytics.cube import filter_cells, read_cube
+    from sales_analytics.fact_store import load_fact_table
+    from sales_analytics.filter_index import FilterIndex, sort_by_date
+    from sales_analytics.panels import PandasPanels
+    from sales_analytics.schema import compact_frame
+
+    def build_frame():
+        df = sort_by_date(load_fact_table(columns=DASHBOARD_COLUMNS, store_path=paths['store'],
+                                          csv_path=paths['csv']))
+        return compact_frame(df)
+
+    df, _ = timer.run('dashboard.load', rows, build_frame)
+    filter_index = timer.run('dashboard.filter_index', rows, FilterIndex, df)
+    cube = timer.run('dashboard.read_cube', rows, read_cube, paths['cube'])
+
+    # A mid-period date range with partial edge months and one region
+    first, last = filter_index.date_bounds()
+    span = last - first
+    states = {
+        'all': (None, {}),
+        'filtered': ((first + span / 4, last - span / 4), {'Region': filter_index.values('Region')[0]}),
+    }
+    for state, (date_range, selections) in states.items():
+        prefix = f'dashboard.{state}'
+        cells = timer.run(f'{prefix}.cells', rows, filter_cells, cube, df, filter_index,
+                          date_range=date_range, selections=selections)
+        positions = timer.run(f'{prefix}.rows', rows, filter_index.query, date_range=date_range,
+                              selections=selections)
+        history = timer.run(f'{prefix}.history_cells', rows, filter_cells, cube, df, filter_index,
+                            selections=selections)
+        data = SimpleNamespace(cells=cells, filtered_df=df.iloc[positions], history_cells=history, cube=cube)
+        panels = PandasPanels(data)
+        for panel in PANELS:
+            size = len(data.filtered_df) if panel in ROW_PANELS else len(cells)
+            timer.run(f'{prefix}.{panel}', size, getattr(panels, panel))
+    return states
+
+
+def bench_sql(timer, paths, rows, states):
+    """The same panels pushed down to DuckDB over the fact store, for the same filter states"""
+    from sales_analytics.sql_backend import SQLEngine, SQLPanels
+
+    engine = timer.run('sql.connect', rows, SQLEngine, paths['store'], paths['csv'])
+    for state, (date_range, selections) in states.items():
+        panels = SQLPanels(engine, date_range, selections)
+        for panel in PANELS:
+            timer.run(f'sql.{state}.{panel}', rows, getattr(panels, panel))
+
+
+def bench_size(rows, args):
+    """Stage results for one extract size (run in its own process)"""
+    from sales_analytics.synthetic import write_extract
+
+    work_dir = tempfile.mkdtemp(prefix=f'bench_{size_label(rows)}_', dir=args.work_dir)
+    timer = StageTimer()
+    try:
+        raw_path = os.path.join(work_dir, 'raw.csv')
+        timer.run('generate', rows, write_extract, raw_path, rows, seed=args.seed)
+        if 'pipeline' not in args.skip:
+            paths = bench_pipeline(timer, raw_path, work_dir, rows, args.chunksize, args.workers,
+                                   args.export)
+            if 'dashboard' not in args.skip:
+                states = bench_dashboard(timer, paths, rows)
+                if 'sql' not in args.skip and importlib.util.find_spec('duckdb'):
+                    bench_sql(timer, paths, rows, states)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'rows': rows, 'stages': timer.stages}
+
+
+def compare(results, baseline, tolerance):
+    """Per stage ratio to the baseline's seconds; slower than 1 + tolerance above the noise floor is a regression"""
+    regressions = []
+    for label, size in results['sizes'].items():
+        base_size = baseline.get('sizes', {}).get(label)
+        if base_size is None:
+            continue
+        for name, stage in size['stages'].items():
+            base = base_size['stages'].get(name)
+            if base is None or not base['seconds']:
+                continue
+            ratio = stage['seconds'] / base['seconds']
+            regressed = ratio > 1 + tolerance and stage['seconds'] - base['seconds'] > NOISE_FLOOR_SECONDS
+            stage['baseline'] = {
+                'seconds': base['seconds'],
+                'ratio': round(ratio, 3),
+                **{key: base[key] for key in ('peak_rss_mb', 'peak_rss_delta_mb') if key in base},
+                'regression': regressed,
+            }
+            if regressed:
+                regressions.append(f'{label} {name}: {stage["seconds"]:.3f}s vs {base["seconds"]:.3f}s '
+                                   f'({ratio:.2f}x)')
+    return regressions
+
+
+def run_in_child(rows, args):
+    """bench_size() in a fresh interpreter, so each size gets its own peak RSS"""
+    command = [sys.executable, os.path.abspath(__file__), '--single', str(rows), '--seed', str(args.seed),
+               '--workers', str(args.workers), '--export', ','.join(args.export),
+               '--skip', ','.join(args.skip)]
+    if args.chunksize:
+        command += ['--chunksize', str(args.chunksize)]
+    if args.work_dir:
+        command += ['--work-dir', args.work_dir]
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline and dashboard aggregations on synthetic data")
+    parser.add_argument('--sizes', default='10k,1m',
+                        help="comma-separated extract sizes, e.g. 10k,1m,10m,100m (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the generator (default: %(default)s)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="ingest chunk size, as the pipeline's --chunksize (default: whole file)")
+    parser.add_argument('--workers', type=int, default=1, help="ingest worker processes (default: %(default)s)")
+    parser.add_argument('--export', default='parquet',
+                        help="comma-separated export formats to time (default: %(default)s)")
+    parser.add_argument('--skip', default='', help="comma-separated benchmark groups to skip: pipeline, dashboard, sql")
+    parser.add_argument('--work-dir', default=None, help="directory for generated files (default: system temp)")
+    parser.add_argument('--output', default=RESULTS_PATH, help="results JSON (default: %(default)s)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON to compare with (default: %(default)s)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="relative slowdown over the baseline flagged as a regression (default: %(default)s)")
+    parser.add_argument('--save-baseline', action='store_true', help="also store the results as the new baseline")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 on any regression")
+    parser.add_argument('--single', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.export = [fmt.strip() for fmt in args.export.split(',') if fmt.strip()]
+    args.skip = [group.strip() for group in args.skip.split(',') if group.strip()]
+
+    if args.single is not None:
+        json.dump(bench_size(args.single, args), sys.stdout)
+        return
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpu_count': os.cpu_count()},
+        'settings': {'seed': args.seed, 'chunksize': args.chunksize, 'workers': args.workers,
+                     'export': args.export},
+        'sizes': {},
+    }
+    for rows in (parse_size(size) for size in args.sizes.split(',')):
+        label = size_label(rows)
+        print(f"Benchmarking {label} rows...")
+        results['sizes'][label] = run_in_child(rows, args)
+        for name, stage in results['sizes'][label]['stages'].items():
+            # Pipeline stages report their growth of the peak RSS, the rest the peak itself
+            if 'peak_rss_mb' in stage:
+                memory, spec = stage['peak_rss_mb'], '>9.1f'
+            else:
+                memory, spec = stage['peak_rss_delta_mb'], '>+9.1f'
+            memory = f"{'n/a' if memory is None else format(memory, spec):>9} MB"
+            print(f"  {name:<40} {stage['seconds']:>9.3f}s {memory}")
+
+    regressions = []
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(f"Compared with {args.baseline}: {len(regressions)} regression(s)")
+        for regression in regressions:
+            print(f"  {regression}")
+    results['regressions'] = regressions
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
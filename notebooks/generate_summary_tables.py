@@ -1,271 +1,315 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import json
+import argparse
 from datetime import datetime
 
+# Make the shared sales_analytics package importable when run from notebooks/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sales_analytics import settings
+from sales_analytics.anomalies import ORDER_DETECTORS, RunningStats
+from sales_analytics.cube import write_cube
+from sales_analytics.export import EXPORTERS, export_tables
+from sales_analytics.fact_store import iter_fact_batches
+from sales_analytics.cleaning import clean_frame, raw_order_dates
+from sales_analytics.incremental import apply_increment, increment_pending, load_state, save_state, window_start
+from sales_analytics.ingest import count_replacements, detect_encoding, ingest_extract, iter_raw_chunks, update_scaling_report
+from sales_analytics.profiling import StageProfiler
+from sales_analytics.publish import write_manifest
+from sales_analytics.star_schema import build_star_schema, star_schema_exists, update_star_schema
+from sales_analytics.summaries import (
+    combine_anomalies, detect_anomalies, fit_order_detector, revenue_by_month, revenue_by_region,
+    time_intelligence_by_month, top_customers, top_products
+)
+
 # Set paths
 RAW_DATA_PATH = '../data/raw/Sample - Superstore.csv'
 PROCESSED_DATA_PATH = '../data/processed/FactSales_clean.csv'
+FACT_STORE_PATH = '../data/processed/FactSales_parquet'
+STAR_SCHEMA_PATH = '../data/processed/star'
+CUBE_PATH = '../data/processed/SalesCube.parquet'
+MANIFEST_PATH = '../data/processed/manifest.json'
+INCREMENTAL_STATE_DIR = '../data/processed/incremental'
+SUMMARY_TABLES_DIR = '../outputs/tables'
 SUMMARY_TABLES_PATH = '../outputs/tables/Summary_Tables.xlsx'
+DATA_QUALITY_PATH = '../outputs/data_quality_report.json'
+SCALING_REPORT_PATH = '../outputs/scaling_report.json'
+RUN_REPORT_PATH = '../outputs/pipeline_run_report.json'
+PROFILE_DIR = '../outputs/profiles'
+
+# Named stages of each run mode, in order; --profile-stage picks one of them
+FULL_STAGES = ['ingest', 'star_schema', 'scaling_report', 'cube', 'write_cube', 'entity_totals', 'quality_report', 'save_state',
+               'anomalies', 'summary_tables', 'export', 'save_quality', 'publish']
+INCREMENTAL_STAGES = ['load_window', 'apply_increment', 'star_schema', 'anomalies', 'summary_tables', 'export', 'publish']
+
+
+def load_clean_window(path, start, chunksize=None, sample_rows=1000):
+    """
+    Cleaned rows of the extract dated on or after `start`, read chunk by chunk,
+    and the first `sample_rows` cleaned rows of the extract. Only the order
+    dates of the other rows are parsed; they are never cleaned
+    """
+    print("Loading data...")
+    window = []
+    sample = None
+    replaced = 0
+    encoding = detect_encoding(path)
+    for chunk in iter_raw_chunks(path, chunksize, encoding):
+        replaced += count_replacements(chunk, encoding)
+        if sample is None:
+            sample = clean_frame(chunk.head(sample_rows), log=lambda message: None)
+        in_window = (raw_order_dates(chunk) >= start).to_numpy()
+        window.append(clean_frame(chunk[in_window], log=lambda message: None))
+    if replaced:
+        print(f"Warning: {replaced} characters of the extract did not decode and were replaced with U+FFFD")
+    return pd.concat(window, ignore_index=True), sample
+
 
-# Create directories if they don't exist
-os.makedirs(os.path.dirname(PROCESSED_DATA_PATH), exist_ok=True)
-os.makedirs(os.path.dirname(SUMMARY_TABLES_PATH), exist_ok=True)
-
-# Load the data
-print("Loading data...")
-# Try different encodings to handle potential encoding issues
-try:
-    df = pd.read_csv(RAW_DATA_PATH, encoding='utf-8')
-except UnicodeDecodeError:
-    try:
-        df = pd.read_csv(RAW_DATA_PATH, encoding='latin1')
-    except UnicodeDecodeError:
-        df = pd.read_csv(RAW_DATA_PATH, encoding='cp1252')
-
-# Print original column names for debugging
-print(f"Original columns: {df.columns.tolist()}")
-
-# Create a copy of the dataframe with normalized column names
-df_clean = df.copy()
-
-# Rename columns to match required schema
-print("Renaming columns...")
-column_mapping = {
-    'Row ID': 'RowID',
-    'Order ID': 'OrderID',
-    'Order Date': 'Date',
-    'Ship Date': 'ShipDate',
-    'Ship Mode': 'ShipMode',
-    'Customer ID': 'CustomerID',
-    'Customer Name': 'CustomerName',
-    'Segment': 'Segment',
-    'Country': 'Country',
-    'City': 'City',
-    'State': 'State',
-    'Postal Code': 'PostalCode',
-    'Region': 'Region',
-    'Product ID': 'ProductID',
-    'Category': 'Category',
-    'Sub-Category': 'SubCategory',
-    'Product Name': 'Product',
-    'Sales': 'Revenue',
-    'Quantity': 'Quantity',
-    'Discount': 'Discount',
-    'Profit': 'Profit'
-}
-
-# Apply column renaming
-df_clean.rename(columns=column_mapping, inplace=True)
-
-# Convert date columns to datetime
-print("Converting date columns...")
-df_clean['Date'] = pd.to_datetime(df_clean['Date'])
-df_clean['ShipDate'] = pd.to_datetime(df_clean['ShipDate'])
-
-# Feature engineering - create date-related columns
-print("Creating date features...")
-df_clean['Year'] = df_clean['Date'].dt.year
-df_clean['Month'] = df_clean['Date'].dt.month
-df_clean['YearMonth'] = df_clean['Date'].dt.strftime('%Y-%m')
-df_clean['Quarter'] = df_clean['Date'].dt.quarter
-df_clean['MonthStart'] = df_clean['Date'].dt.to_period('M').dt.to_timestamp()
-
-# Standardize categorical values
-print("Standardizing categorical values...")
-categorical_cols = ['ShipMode', 'Segment', 'Country', 'City', 'State', 'Region', 'Category', 'SubCategory']
-for col in categorical_cols:
-    if col in df_clean.columns:
-        df_clean[col] = df_clean[col].str.strip().str.title()
-
-# Calculate UnitPrice if missing
-print("Calculating UnitPrice...")
-if 'UnitPrice' not in df_clean.columns:
-    df_clean['UnitPrice'] = df_clean['Revenue'] / df_clean['Quantity']
-
-# Anomaly detection
-print("Performing anomaly detection...")
-
-# Z-score method for per-order revenue
-order_revenue = df_clean.groupby('OrderID')['Revenue'].sum().reset_index()
-order_revenue['RevenueZScore'] = (order_revenue['Revenue'] - order_revenue['Revenue'].mean()) / order_revenue['Revenue'].std()
-order_revenue['IsAnomalyZScore'] = abs(order_revenue['RevenueZScore']) > 3.0
-
-# Rolling median deviation by region-quarter
-region_quarter_revenue = df_clean.groupby(['Region', 'Year', 'Quarter'])['Revenue'].sum().reset_index()
-region_quarter_revenue = region_quarter_revenue.sort_values(['Region', 'Year', 'Quarter'])
-
-# Calculate rolling median and deviation for each region
-anomalies_region_quarter = []
-for region in region_quarter_revenue['Region'].unique():
-    region_data = region_quarter_revenue[region_quarter_revenue['Region'] == region].copy()
-    if len(region_data) >= 3:  # Need at least 3 quarters for rolling median
-        region_data['RollingMedian'] = region_data['Revenue'].rolling(window=3, min_periods=1).median()
-        region_data['MedianDeviation'] = abs(region_data['Revenue'] - region_data['RollingMedian']) / region_data['RollingMedian']
-        region_data['IsAnomalyMedian'] = region_data['MedianDeviation'] > 0.5  # 50% threshold
-        anomalies_region_quarter.append(region_data[region_data['IsAnomalyMedian']])
-
-# Combine anomalies
-if anomalies_region_quarter:
-    anomalies_df = pd.concat(anomalies_region_quarter)
-    anomalies_df = anomalies_df[['Region', 'Year', 'Quarter', 'Revenue', 'RollingMedian', 'MedianDeviation']]
-    anomalies_df.rename(columns={'MedianDeviation': 'DeviationPercentage'}, inplace=True)
-    anomalies_df['DeviationPercentage'] = anomalies_df['DeviationPercentage'] * 100  # Convert to percentage
-    anomalies_df['AnomalyType'] = 'Region-Quarter Revenue Deviation'
-else:
-    anomalies_df = pd.DataFrame(columns=['Region', 'Year', 'Quarter', 'Revenue', 'RollingMedian', 'DeviationPercentage', 'AnomalyType'])
-
-# Add order-level anomalies
-order_anomalies = df_clean.merge(order_revenue[order_revenue['IsAnomalyZScore']][['OrderID', 'Revenue', 'RevenueZScore']], on='OrderID')
-if not order_anomalies.empty:
-    order_anomalies_summary = order_anomalies.groupby('OrderID').agg({
-        'Date': 'first',
-        'Region': 'first',
-        'Revenue_x': 'sum',
-        'RevenueZScore': 'first'
-    }).reset_index()
-    order_anomalies_summary.rename(columns={'Revenue_x': 'Revenue', 'RevenueZScore': 'ZScore'}, inplace=True)
-    order_anomalies_summary['AnomalyType'] = 'Order Revenue Z-Score'
-    order_anomalies_summary['Year'] = order_anomalies_summary['Date'].dt.year
-    order_anomalies_summary['Quarter'] = order_anomalies_summary['Date'].dt.quarter
-
-# Save cleaned data
-print("Saving cleaned data...")
-df_clean.to_csv(PROCESSED_DATA_PATH, index=False)
-
-# Generate summary tables
-print("Generating summary tables...")
-
-# 1. Revenue by Month
-revenue_by_month = df_clean.groupby('YearMonth').agg({
-    'Revenue': 'sum',
-    'OrderID': pd.Series.nunique,
-    'Profit': 'sum'
-}).reset_index()
-revenue_by_month.rename(columns={'OrderID': 'OrderCount'}, inplace=True)
-revenue_by_month['AvgOrderValue'] = revenue_by_month['Revenue'] / revenue_by_month['OrderCount']
-revenue_by_month.sort_values('YearMonth', inplace=True)
-
-# 2. Revenue by Region
-revenue_by_region = df_clean.groupby(['Region', 'Year', 'Quarter']).agg({
-    'Revenue': 'sum',
-    'OrderID': pd.Series.nunique,
-    'Profit': 'sum'
-}).reset_index()
-revenue_by_region.rename(columns={'OrderID': 'OrderCount'}, inplace=True)
-revenue_by_region['AvgOrderValue'] = revenue_by_region['Revenue'] / revenue_by_region['OrderCount']
-revenue_by_region.sort_values(['Year', 'Quarter', 'Revenue'], ascending=[True, True, False], inplace=True)
-
-# 3. Top Customers
-top_customers = df_clean.groupby('CustomerName').agg({
-    'Revenue': 'sum',
-    'OrderID': pd.Series.nunique,
-    'Profit': 'sum'
-}).reset_index()
-top_customers.rename(columns={'OrderID': 'OrderCount'}, inplace=True)
-top_customers['AvgOrderValue'] = top_customers['Revenue'] / top_customers['OrderCount']
-top_customers.sort_values('Revenue', ascending=False, inplace=True)
-top_customers = top_customers.head(20)  # Top 20 customers
-
-# 4. Top Products
-top_products = df_clean.groupby(['Category', 'SubCategory', 'Product']).agg({
-    'Revenue': 'sum',
-    'Quantity': 'sum',
-    'Profit': 'sum'
-}).reset_index()
-top_products['ProfitMargin'] = (top_products['Profit'] / top_products['Revenue']) * 100
-top_products.sort_values('Revenue', ascending=False, inplace=True)
-top_products = top_products.head(20)  # Top 20 products
-
-# 5. Anomalies table (combine both types of anomalies)
-# This would be populated with the anomalies detected above
-
-# Export all tables to Excel
-print("Exporting tables to Excel...")
-with pd.ExcelWriter(SUMMARY_TABLES_PATH) as writer:
-    revenue_by_month.to_excel(writer, sheet_name='Revenue_by_Month', index=False)
-    revenue_by_region.to_excel(writer, sheet_name='Revenue_by_Region', index=False)
-    top_customers.to_excel(writer, sheet_name='Top_Customers', index=False)
-    top_products.to_excel(writer, sheet_name='Top_Products', index=False)
-    
+def build_summary_tables(cube, customers, products):
+    """Summary sheets, built from the cube and the entity totals"""
+    return {
+        'Revenue_by_Month': revenue_by_month(cube),
+        'Time_Intelligence': time_intelligence_by_month(cube),
+        'Revenue_by_Region': revenue_by_region(cube),
+        'Top_Customers': top_customers(customers),  # Top 20 customers
+        'Top_Products': top_products(products),     # Top 20 products
+    }
+
+
+def export_summary_tables(tables, anomalies, fact_sample, formats):
+    """Export all tables in each of `formats`, one thread per format"""
+    print(f"Exporting tables as {', '.join(formats)}...")
+    tables = dict(tables)
     # Export anomalies if they exist
-    if not anomalies_df.empty or not order_anomalies.empty:
-        if 'order_anomalies_summary' in locals():
-            # Select relevant columns for Excel export
-            order_cols = ['OrderID', 'Region', 'Year', 'Quarter', 'Revenue', 'ZScore', 'AnomalyType']
-            order_anomalies_for_excel = order_anomalies_summary[order_cols]
-            
-            # Combine with region-quarter anomalies if they exist
-            if not anomalies_df.empty:
-                # Ensure compatible columns for concatenation
-                region_cols = ['Region', 'Year', 'Quarter', 'Revenue', 'RollingMedian', 'DeviationPercentage', 'AnomalyType']
-                region_anomalies_for_excel = anomalies_df[region_cols]
-                
-                # Add placeholder columns to make dataframes compatible
-                order_anomalies_for_excel['RollingMedian'] = np.nan
-                order_anomalies_for_excel['DeviationPercentage'] = np.nan
-                region_anomalies_for_excel['OrderID'] = 'N/A'
-                region_anomalies_for_excel['ZScore'] = np.nan
-                
-                # Combine anomalies
-                all_anomalies = pd.concat([order_anomalies_for_excel, region_anomalies_for_excel])
-                all_anomalies.to_excel(writer, sheet_name='Anomalies', index=False)
-            else:
-                order_anomalies_for_excel.to_excel(writer, sheet_name='Anomalies', index=False)
-        elif not anomalies_df.empty:
-            anomalies_df.to_excel(writer, sheet_name='Anomalies', index=False)
-    
+    if anomalies is not None:
+        tables['Anomalies'] = anomalies
     # Also export the cleaned data
-    df_clean.head(1000).to_excel(writer, sheet_name='FactSales_clean_sample', index=False)
-
-print(f"Summary tables exported to {SUMMARY_TABLES_PATH}")
-
-# Save data quality metrics to JSON
-data_quality = {
-    "row_count": len(df_clean),
-    "null_counts": {col: df_clean[col].isnull().sum() for col in df_clean.columns},
-    "duplicate_order_ids": df_clean['OrderID'].duplicated().sum(),
-    "date_range": {
-        "min_date": df_clean['Date'].min().strftime('%Y-%m-%d'),
-        "max_date": df_clean['Date'].max().strftime('%Y-%m-%d')
-    },
-    "numeric_stats": {
-        "Revenue": {
-            "min": df_clean['Revenue'].min(),
-            "max": df_clean['Revenue'].max(),
-            "mean": df_clean['Revenue'].mean(),
-            "median": df_clean['Revenue'].median()
-        },
-        "Quantity": {
-            "min": df_clean['Quantity'].min(),
-            "max": df_clean['Quantity'].max(),
-            "mean": df_clean['Quantity'].mean(),
-            "median": df_clean['Quantity'].median()
-        }
-    },
-    "categorical_counts": {
-        "Region": df_clean['Region'].value_counts().to_dict(),
-        "Category": df_clean['Category'].value_counts().to_dict(),
-        "Segment": df_clean['Segment'].value_counts().to_dict()
+    tables['FactSales_clean_sample'] = fact_sample
+
+    targets = {
+        'parquet': SUMMARY_TABLES_DIR,
+        'feather': SUMMARY_TABLES_DIR,
+        'excel': SUMMARY_TABLES_PATH,
     }
-}
+    return export_tables(tables, {fmt: targets[fmt] for fmt in formats})
 
-# Save data quality report to JSON file
-DATA_QUALITY_PATH = '../outputs/data_quality_report.json'
-os.makedirs(os.path.dirname(DATA_QUALITY_PATH), exist_ok=True)
-with open(DATA_QUALITY_PATH, 'w') as f:
-    json.dump(data_quality, f, indent=4, default=str)
-print(f"Data quality report saved to {DATA_QUALITY_PATH}")
-
-# Print summary
-print("\nData Processing Summary:")
-print(f"Total rows processed: {len(df_clean)}")
-print(f"Date range: {data_quality['date_range']['min_date']} to {data_quality['date_range']['max_date']}")
-print(f"Total revenue: ${df_clean['Revenue'].sum():,.2f}")
-print(f"Total profit: ${df_clean['Profit'].sum():,.2f}")
-print(f"Number of unique orders: {df_clean['OrderID'].nunique()}")
-print(f"Number of unique customers: {df_clean['CustomerName'].nunique()}")
-print(f"Number of unique products: {df_clean['Product'].nunique()}")
-
-print("\nProcess completed successfully!")
\ No newline at end of file
+
+def exported_rows(tables, anomalies, fact_sample):
+    return sum(len(table) for table in tables.values()) + len(fact_sample) + (0 if anomalies is None else len(anomalies))
+
+
+def write_star_schema(profiler, rows, delta=None):
+    """
+    Rebuild the star schema (narrow FactSales and the Dim* tables) from the
+    fact store, or with `delta` key only those new and changed rows into it
+    """
+    if delta is not None and not star_schema_exists(STAR_SCHEMA_PATH):
+        delta = None
+    with profiler.stage('star_schema', rows_in=rows if delta is None else len(delta)) as stage:
+        if delta is None:
+            tables = build_star_schema(lambda columns: iter_fact_batches(FACT_STORE_PATH, columns), STAR_SCHEMA_PATH)
+        else:
+            tables = update_star_schema(delta, STAR_SCHEMA_PATH)
+        stage['rows_out'] = sum(tables.values())
+    print(f"Star schema saved to {STAR_SCHEMA_PATH}: " + ', '.join(f"{name} {count:,}" for name, count in tables.items()))
+
+
+def publish_outputs(profiler, mode, rows):
+    """Write the manifest, last: dashboards pick up this run's outputs only once it exists"""
+    outputs = [PROCESSED_DATA_PATH, FACT_STORE_PATH, STAR_SCHEMA_PATH, CUBE_PATH]
+    with profiler.stage('publish'):
+        write_manifest(MANIFEST_PATH, mode=mode, rows=rows, outputs=[os.path.abspath(path) for path in outputs])
+    print(f"Outputs published in {MANIFEST_PATH}")
+
+
+def save_data_quality(data_quality):
+    """Save data quality report to JSON file"""
+    os.makedirs(os.path.dirname(DATA_QUALITY_PATH), exist_ok=True)
+    with open(DATA_QUALITY_PATH, 'w') as f:
+        json.dump(data_quality, f, indent=4, default=str)
+    print(f"Data quality report saved to {DATA_QUALITY_PATH}")
+
+
+def run_full(raw_path, chunksize=None, workers=1, order_detector=settings.ORDER_ANOMALY_DETECTOR,
+             export_formats=('parquet',), profiler=None):
+    """Rebuild every output from the full raw extract"""
+    profiler = profiler or StageProfiler()
+
+    # Clean the extract chunk by chunk, saving the cleaned CSV and the typed,
+    # Year/Region partitioned columnar store read by the dashboard
+    with profiler.stage('ingest') as stage:
+        aggregates, quality, fact_sample, timings = ingest_extract(raw_path, PROCESSED_DATA_PATH, FACT_STORE_PATH,
+                                                                   chunksize=chunksize, workers=workers)
+        stage['rows_out'] = timings['rows']
+        stage['breakdown'] = {**timings['main_seconds'], **timings['worker_seconds'],
+                              **{f'clean.{step}': seconds for step, seconds in timings['clean_seconds'].items()}}
+    print(f"Cleaned data saved to {PROCESSED_DATA_PATH} and {FACT_STORE_PATH}")
+    rows = timings['rows']
+    write_star_schema(profiler, rows)
+
+    with profiler.stage('scaling_report'):
+        scaling = update_scaling_report(SCALING_REPORT_PATH, raw_path, timings)['runs'][str(workers)]
+    print(f"Ingested {timings['rows']} rows in {timings['chunks']} chunks with {workers} worker(s) "
+          f"in {timings['wall_seconds']:.2f}s" +
+          (f" (speedup {scaling['speedup']:.2f}x)" if 'speedup' in scaling else ""))
+
+    # Pre-aggregated cube of the additive measures the dashboard panels roll up
+    with profiler.stage('cube', rows_in=rows) as stage:
+        cube = aggregates.cube()
+        stage['rows_out'] = len(cube)
+    with profiler.stage('write_cube', rows_in=len(cube)):
+        write_cube(cube, CUBE_PATH)
+
+    # Entity totals, also saved as the starting point of incremental runs
+    with profiler.stage('entity_totals', rows_in=rows) as stage:
+        orders = aggregates.orders()
+        customers = aggregates.customers()
+        products = aggregates.products()
+        order_stats = RunningStats().update(orders['Revenue'])
+        stage['rows_out'] = len(orders) + len(customers) + len(products)
+    with profiler.stage('quality_report', rows_in=rows):
+        data_quality = quality.report()
+
+    # Record the high-water mark for the next --incremental run
+    print("Saving incremental state...")
+    with profiler.stage('save_state', rows_in=len(orders) + len(customers) + len(products)):
+        save_state(INCREMENTAL_STATE_DIR, quality.date_max, orders, customers, products, order_stats)
+
+    # Anomaly detection
+    print("Performing anomaly detection...")
+    with profiler.stage('anomalies', rows_in=len(orders)) as stage:
+        anomalies_df, order_anomalies = detect_anomalies(orders, cube,
+                                                         fit_order_detector(orders, order_detector, order_stats))
+        anomalies = combine_anomalies(anomalies_df, order_anomalies)
+        stage['rows_out'] = 0 if anomalies is None else len(anomalies)
+
+    # Generate summary tables
+    print("Generating summary tables...")
+    with profiler.stage('summary_tables', rows_in=len(cube) + len(customers) + len(products)) as stage:
+        tables = build_summary_tables(cube, customers, products)
+        stage['rows_out'] = sum(len(table) for table in tables.values())
+    with profiler.stage('export') as stage:
+        stage['breakdown'] = export_summary_tables(tables, anomalies, fact_sample, export_formats)
+        stage['rows_in'] = stage['rows_out'] = exported_rows(tables, anomalies, fact_sample)
+
+    # Save data quality metrics to JSON
+    with profiler.stage('save_quality'):
+        save_data_quality(data_quality)
+    publish_outputs(profiler, 'full', rows)
+
+    # Print summary
+    print("\nData Processing Summary:")
+    print(f"Total rows processed: {data_quality['row_count']}")
+    print(f"Date range: {data_quality['date_range']['min_date']} to {data_quality['date_range']['max_date']}")
+    print(f"Total revenue: ${cube['Revenue'].sum():,.2f}")
+    print(f"Total profit: ${cube['Profit'].sum():,.2f}")
+    print(f"Number of unique orders: {len(orders)}")
+    print(f"Number of unique customers: {len(customers)}")
+    print(f"Number of unique products: {products['Product'].nunique()}")
+
+
+def run_incremental(input_path, lookback_days, chunksize=None, workers=1,
+                    order_detector=settings.ORDER_ANOMALY_DETECTOR, export_formats=('parquet',), profiler=None):
+    """Merge only the new or changed rows of the extract into the saved outputs"""
+    profiler = profiler or StageProfiler()
+    state = load_state(INCREMENTAL_STATE_DIR)
+    if state is None:
+        print("No incremental state found, running a full build instead")
+        run_full(input_path, chunksize, workers, order_detector, export_formats, profiler)
+        return
+    if increment_pending(INCREMENTAL_STATE_DIR):
+        print("The last incremental run did not finish, running a full build instead")
+        run_full(input_path, chunksize, workers, order_detector, export_formats, profiler)
+        return
+
+    with profiler.stage('load_window') as stage:
+        df_clean, fact_sample = load_clean_window(input_path, window_start(state, lookback_days), chunksize)
+        stage['rows_out'] = len(df_clean)
+
+    print("Applying increment...")
+    with profiler.stage('apply_increment', rows_in=len(df_clean)) as stage:
+        result = apply_increment(df_clean, FACT_STORE_PATH, CUBE_PATH, INCREMENTAL_STATE_DIR,
+                                 lookback_days=lookback_days)
+        stage['rows_out'] = 0 if result is None else result['new_rows'] + result['changed_rows']
+    if result is None:
+        print("No new or changed rows, outputs are up to date")
+        return
+    # Existing members keep their keys, so only the new and changed rows are keyed
+    write_star_schema(profiler, None, result['delta'])
+
+    print("Performing anomaly detection...")
+    with profiler.stage('anomalies', rows_in=len(result['orders'])) as stage:
+        detector = fit_order_detector(result['orders'], order_detector, result['order_stats'])
+        anomalies_df, order_anomalies = detect_anomalies(result['orders'], result['cube'], detector)
+        anomalies = combine_anomalies(anomalies_df, order_anomalies)
+        stage['rows_out'] = 0 if anomalies is None else len(anomalies)
+
+    print("Generating summary tables...")
+    with profiler.stage('summary_tables', rows_in=len(result['cube'])) as stage:
+        tables = build_summary_tables(result['cube'], result['customers'], result['products'])
+        stage['rows_out'] = sum(len(table) for table in tables.values())
+    with profiler.stage('export') as stage:
+        stage['breakdown'] = export_summary_tables(tables, anomalies, fact_sample, export_formats)
+        stage['rows_in'] = stage['rows_out'] = exported_rows(tables, anomalies, fact_sample)
+    publish_outputs(profiler, 'incremental', int(result['cube']['RowCount'].sum()))
+
+    # The cleaned CSV and the data quality report are only rebuilt by full runs
+    print("\nIncremental Update Summary:")
+    print(f"New rows: {result['new_rows']}")
+    print(f"Changed rows: {result['changed_rows']}")
+    print(f"Total revenue: ${result['cube']['Revenue'].sum():,.2f}")
+    print(f"Total profit: ${result['cube']['Profit'].sum():,.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the Superstore extract and generate the summary tables")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only process rows on or after the high-water mark of the last run")
+    parser.add_argument('--input', default=RAW_DATA_PATH,
+                        help="raw extract to read (default: %(default)s)")
+    parser.add_argument('--lookback-days', type=int, default=0,
+                        help="with --incremental, also re-check rows this many days before the high-water mark")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="read the extract in chunks of this many rows to bound memory (default: whole file)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="clean and aggregate chunks in this many processes (0: one per CPU core)")
+    parser.add_argument('--order-detector', choices=sorted(ORDER_DETECTORS), default=settings.ORDER_ANOMALY_DETECTOR,
+                        help="detector for order revenue anomalies (default: %(default)s)")
+    parser.add_argument('--export', default=settings.EXPORT_FORMATS,
+                        help="comma-separated formats for the summary tables: "
+                             f"{', '.join(EXPORTERS)} (default: %(default)s)")
+    parser.add_argument('--profile-stage', choices=sorted(set(FULL_STAGES + INCREMENTAL_STAGES)), default=None,
+                        help=f"run this stage under cProfile and save its stats in {PROFILE_DIR}")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count()
+    export_formats = [fmt.strip() for fmt in args.export.split(',') if fmt.strip()]
+    unknown = sorted(set(export_formats) - set(EXPORTERS))
+    if unknown:
+        parser.error(f"unknown export format(s): {', '.join(unknown)}")
+
+    # Create directories if they don't exist
+    os.makedirs(os.path.dirname(PROCESSED_DATA_PATH), exist_ok=True)
+    os.makedirs(os.path.dirname(SUMMARY_TABLES_PATH), exist_ok=True)
+
+    profiler = StageProfiler(args.profile_stage, PROFILE_DIR)
+    if args.incremental:
+        run_incremental(args.input, args.lookback_days, args.chunksize, workers, args.order_detector,
+                        export_formats, profiler)
+    else:
+        run_full(args.input, args.chunksize, workers, args.order_detector, export_formats, profiler)
+
+    # Stage timings of this run, next to the data quality report
+    profiler.write_report(RUN_REPORT_PATH, mode='incremental' if args.incremental else 'full',
+                          input=os.path.abspath(args.input), chunksize=args.chunksize, workers=workers,
+                          export_formats=export_formats)
+    print(f"\nRun report saved to {RUN_REPORT_PATH}; slowest stages:")
+    for line in profiler.summary():
+        print(f"  {line}")
+
+    print("\nProcess completed successfully!")
+
+
+if __name__ == '__main__':
+    main()
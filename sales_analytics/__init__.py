@@ -0,0 +1,4 @@
+"""
+Shared data access and aggregation helpers used by both the pipeline script
+(notebooks/generate_summary_tables.py) and the Streamlit dashboard.
+"""
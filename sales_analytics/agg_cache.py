@@ -0,0 +1,124 @@
+"""
+Memoized dashboard aggregates.
+
+Every widget change reruns the whole dashboard script, so panels whose
+inputs did not change would be recomputed, and users tend to flip between
+the same few filter combinations. AggregationCache keeps panel results keyed
+by (dataset version, normalized filter state, panel id) in an LRU bounded by
+the estimated size of the cached values, and counts hits and misses. Entries
+of older dataset versions are dropped as soon as a newer version is seen.
+
+Cached values are shared between reruns and sessions, so callers must treat
+them as read-only.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def filter_key(date_range, selections, bounds=None):
+    """
+    Hashable, order-independent form of the active filters.
+
+    'All' and None selections mean no filter. A date range covering all of
+    `bounds` (the data's first and last day) is the same as no date filter.
+    """
+    dates = tuple(date_range) if date_range else None
+    if dates and bounds and dates[0] <= bounds[0] and dates[1] >= bounds[1]:
+        dates = None
+    chosen = tuple(sorted(
+        (dim, value) for dim, value in (selections or {}).items() if value is not None and value != 'All'
+    ))
+    return dates, chosen
+
+
+def estimate_size(value):
+    """Approximate bytes held by a cached value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class AggregationCache:
+    """Thread-safe LRU of computed aggregates, bounded by total estimated bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached value for `key` = (version, filter_key, panel), or compute(),
+        store and return it.
+        """
+        with self._lock:
+            self._retain_version(key[0])
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Computed outside the lock so other sessions are not blocked
+        value = compute()
+        size = estimate_size(value)
+        with self._lock:
+            if size <= self.max_bytes and key[0] == self._version and key not in self._entries:
+                self._entries[key] = value
+                self._sizes[key] = size
+                self._bytes += size
+                self._evict()
+        return value
+
+    def _retain_version(self, version):
+        if version == self._version:
+            return
+        self._version = version
+        for key in [key for key in self._entries if key[0] != version]:
+            self._remove(key)
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._bytes -= self._sizes.pop(key)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,218 @@
+"""
+Anomaly detectors used by the summary pipeline.
+
+Order detectors share one small interface: update(values) folds a batch of
+order revenues into the detector's state, remove(values) takes back values
+that were revised, and score(values) / flag(values) judge values against the
+current state. A new batch of orders is absorbed without revisiting the
+history: the z-score detector keeps running moments (Welford) that can be
+merged, reversed and persisted between incremental runs, and the MAD
+detector a quantile sketch. Each names the column its scores are reported
+in (score_column).
+
+The region-quarter check compares each quarter with a rolling median of its
+region's recent quarters, computed for every region in one vectorized pass.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .quantiles import QuantileSketch, median_from_counts
+
+
+def _finite(values):
+    values = np.asarray(values, dtype='float64')
+    return values[~np.isnan(values)]
+
+
+class RunningStats:
+    """Count, mean and sum of squared deviations of a stream; mergeable and reversible"""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def _combine(self, count, mean, m2):
+        # Chan et al.'s pairwise update; a batch of one is Welford's step
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        values = _finite(values)
+        if len(values):
+            batch_mean = values.mean()
+            self._combine(len(values), batch_mean, ((values - batch_mean) ** 2).sum())
+        return self
+
+    def remove(self, values):
+        """Take back values previously passed to update()"""
+        values = _finite(values)
+        remaining = self.count - len(values)
+        if not len(values):
+            return self
+        if remaining <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return self
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        rest_mean = (self.count * self.mean - len(values) * batch_mean) / remaining
+        delta = batch_mean - rest_mean
+        rest_m2 = self.m2 - batch_m2 - delta ** 2 * remaining * len(values) / self.count
+        self.count, self.mean, self.m2 = remaining, rest_mean, max(rest_m2, 0.0)
+        return self
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1), as pandas' Series.var()"""
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def to_dict(self):
+        return {'count': int(self.count), 'mean': float(self.mean), 'm2': float(self.m2)}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['count'], state['mean'], state['m2'])
+
+
+class ZScoreDetector:
+    """Flags values whose z-score against the running mean and std exceeds `threshold`"""
+
+    name = 'zscore'
+    anomaly_type = 'Order Revenue Z-Score'
+    score_column = 'ZScore'
+
+    def __init__(self, threshold=3.0, stats=None):
+        self.threshold = threshold
+        self.stats = stats if stats is not None else RunningStats()
+
+    def update(self, values):
+        self.stats.update(values)
+        return self
+
+    def remove(self, values):
+        self.stats.remove(values)
+        return self
+
+    def score(self, values):
+        return (np.asarray(values, dtype='float64') - self.stats.mean) / self.stats.std
+
+    def flag(self, values):
+        return np.abs(self.score(values)) > self.threshold
+
+
+class MADDetector:
+    """
+    Flags values whose robust z-score, 0.6745 * (value - median) / MAD,
+    exceeds `threshold` (3.5 after Iglewicz and Hoaglin).
+
+    The state is a QuantileSketch of the stream: value counts, bucketed to
+    within its relative error once there are many distinct values, so a
+    batch is folded in without re-sorting the history and the state stays
+    bounded. When more than half the values equal the median the MAD is 0;
+    the mean absolute deviation, scaled by 0.7979, stands in for it then,
+    and values are scored 0 if every value is the same.
+    """
+
+    name = 'mad'
+    anomaly_type = 'Order Revenue MAD'
+    score_column = 'ModifiedZScore'
+
+    def __init__(self, threshold=3.5, sketch=None):
+        self.threshold = threshold
+        self.sketch = sketch if sketch is not None else QuantileSketch()
+
+    def update(self, values):
+        self.sketch.add(_finite(values))
+        return self
+
+    def remove(self, values):
+        self.sketch.remove(_finite(values))
+        return self
+
+    def _centre_and_scale(self):
+        counts = self.sketch.counts
+        if counts is None or not len(counts):
+            return np.nan, np.nan
+        median = median_from_counts(counts)
+        weights = counts.to_numpy()
+        deviations = np.abs(counts.index.to_numpy(dtype='float64') - median)
+        mad = median_from_counts(pd.Series(weights, index=deviations))
+        if mad > 0:
+            return median, mad / 0.6745
+        return median, (weights * deviations).sum() / weights.sum() / 0.7979
+
+    def score(self, values):
+        median, scale = self._centre_and_scale()
+        deviations = np.asarray(values, dtype='float64') - median
+        if scale == 0:
+            return np.zeros_like(deviations)
+        return deviations / scale
+
+    def flag(self, values):
+        return np.abs(self.score(values)) > self.threshold
+
+
+ORDER_DETECTORS = {
+    ZScoreDetector.name: ZScoreDetector,
+    MADDetector.name: MADDetector,
+}
+
+
+def rolling_group_median(values, groups, window):
+    """
+    Trailing rolling median of `values` within each run of equal `groups`
+    codes (rows sorted by group, then time), as
+    Series.groupby(groups).rolling(window, min_periods=1).median().
+    """
+    values = np.asarray(values, dtype='float64')
+    groups = np.asarray(groups)
+    if len(values) == 0:
+        return values
+    positions = np.arange(len(values))
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    group_start = starts[np.searchsorted(starts, positions, side='right') - 1]
+    # One row per position holding its window; slots before the group start are NaN
+    window_positions = positions[:, None] - (window - 1) + np.arange(window)[None, :]
+    windows = np.where(window_positions >= group_start[:, None],
+                       values[np.maximum(window_positions, 0)], np.nan)
+    return np.nanmedian(windows, axis=1)
+
+
+class RollingMedianDetector:
+    """
+    Flags periods whose value deviates from the trailing `window`-period
+    median of their group by more than `threshold` (relative). Groups with
+    fewer than `min_periods` periods are skipped.
+    """
+
+    name = 'rolling_median'
+    anomaly_type = 'Region-Quarter Revenue Deviation'
+
+    def __init__(self, window=3, threshold=0.5, min_periods=3):
+        self.window = window
+        self.threshold = threshold
+        self.min_periods = min_periods
+
+    def evaluate(self, table, group_col, order_cols, value_col):
+        """`table` sorted by group and period, with RollingMedian, MedianDeviation and IsAnomaly added"""
+        table = table.sort_values([group_col] + order_cols)
+        sizes = table.groupby(group_col, sort=False)[value_col].transform('size')
+        table = table[sizes >= self.min_periods].copy()
+        codes = pd.factorize(table[group_col])[0]
+        table['RollingMedian'] = rolling_group_median(table[value_col], codes, self.window)
+        table['MedianDeviation'] = abs(table[value_col] - table['RollingMedian']) / table['RollingMedian']
+        table['IsAnomaly'] = table['MedianDeviation'] > self.threshold
+        return table
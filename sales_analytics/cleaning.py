@@ -0,0 +1,94 @@
+"""
+Cleaning steps that turn the raw Superstore extract into FactSales rows.
+"""
+
+import time
+
+from .dates import RAW_DATE_FORMAT, date_features, parse_dates
+from .standardize import configured_rules, standardize_frame
+
+# Raw Superstore column names -> FactSales schema
+COLUMN_MAPPING = {
+    'Row ID': 'RowID',
+    'Order ID': 'OrderID',
+    'Order Date': 'Date',
+    'Ship Date': 'ShipDate',
+    'Ship Mode': 'ShipMode',
+    'Customer ID': 'CustomerID',
+    'Customer Name': 'CustomerName',
+    'Segment': 'Segment',
+    'Country': 'Country',
+    'City': 'City',
+    'State': 'State',
+    'Postal Code': 'PostalCode',
+    'Region': 'Region',
+    'Product ID': 'ProductID',
+    'Category': 'Category',
+    'Sub-Category': 'SubCategory',
+    'Product Name': 'Product',
+    'Sales': 'Revenue',
+    'Quantity': 'Quantity',
+    'Discount': 'Discount',
+    'Profit': 'Profit'
+}
+
+CATEGORICAL_COLS = ['ShipMode', 'Segment', 'Country', 'City', 'State', 'Region', 'Category', 'SubCategory']
+
+
+def raw_order_dates(df, date_format=RAW_DATE_FORMAT):
+    """Order dates of raw extract rows, parsed without cleaning anything else"""
+    return parse_dates(df['Order Date'], date_format)
+
+
+def rename_columns(df):
+    return df.rename(columns=COLUMN_MAPPING)
+
+
+def convert_dates(df, date_format=RAW_DATE_FORMAT):
+    df['Date'] = parse_dates(df['Date'], date_format)
+    df['ShipDate'] = parse_dates(df['ShipDate'], date_format)
+    return df
+
+
+def add_date_features(df):
+    features = date_features(df['Date'])
+    for col in ['Year', 'Month', 'YearMonth', 'Quarter', 'MonthStart']:
+        df[col] = features[col]
+    return df
+
+
+def standardize_categoricals(df, rules=None):
+    # Rules run once per distinct value; the columns come back as categoricals
+    return standardize_frame(df, rules or configured_rules(CATEGORICAL_COLS))
+
+
+def add_unit_price(df):
+    if 'UnitPrice' not in df.columns:
+        df['UnitPrice'] = df['Revenue'] / df['Quantity']
+    return df
+
+
+# Named cleaning steps in order, with their progress messages
+CLEANING_STEPS = [
+    ('rename', "Renaming columns...", rename_columns),
+    ('convert_dates', "Converting date columns...", convert_dates),
+    ('date_features', "Creating date features...", add_date_features),
+    ('standardize_categoricals', "Standardizing categorical values...", standardize_categoricals),
+    ('unit_price', "Calculating UnitPrice...", add_unit_price),
+]
+
+
+def clean_frame(df, log=print, timings=None):
+    """
+    Run every cleaning step on a raw extract and return the FactSales frame.
+
+    With a `timings` dict, each step's seconds are added to timings[step].
+    """
+    df_clean = df
+    for name, message, step in CLEANING_STEPS:
+        log(message)
+        start = time.perf_counter()
+        df_clean = step(df_clean)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return df_clean
@@ -0,0 +1,285 @@
+"""
+Pre-aggregated sales cube.
+
+The cube holds additive measures at the grain of
+Year x Month x Region x Segment x Category x SubCategory. Any dashboard panel
+built from sums (trend, region, category, segment, quarter, heatmap) can be
+answered by rolling up the cells that match the active filters instead of
+grouping the fact table on every rerun.
+
+Alongside Revenue/Profit/Quantity/RowCount each cell keeps the means and
+centred co-moments (sums of products of deviations from the cell means) of
+the numeric columns, and a mergeable distinct-count sketch of its OrderIDs
+and CustomerIDs (see sketches.py). Cells are combined with Chan et al.'s
+parallel update, so the correlation matrix of any slice is rebuilt without
+the cancellation of raw product sums at large counts and means.
+"""
+
+import calendar
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+from .publish import staging_path
+from .sketches import count_blobs, hash_ids, merge_blob_groups, sketch_groups
+
+CUBE_DIMENSIONS = ['Year', 'Month', 'Region', 'Segment', 'Category', 'SubCategory']
+CUBE_MEASURES = ['Revenue', 'Profit', 'Quantity', 'RowCount']
+CORRELATION_COLUMNS = ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']
+DISTINCT_COLUMNS = ['OrderID', 'CustomerID']
+_LABEL_DIMENSIONS = ['Region', 'Segment', 'Category', 'SubCategory']
+
+
+def _mean_name(col):
+    return f'Mean_{col}'
+
+
+def _comoment_name(a, b):
+    return f'CoMoment_{a}_{b}'
+
+
+MOMENT_PAIRS = list(itertools.combinations_with_replacement(CORRELATION_COLUMNS, 2))
+MOMENT_COLUMNS = [_mean_name(col) for col in CORRELATION_COLUMNS] + [_comoment_name(a, b) for a, b in MOMENT_PAIRS]
+
+
+def combine_moments(counts, means, comoments, group_ids, groups):
+    """
+    Merge per-part moments into `groups` groups (Chan et al.'s parallel update).
+
+    `counts` are the parts' row counts, `means` {col: part means} and
+    `comoments` {(a, b): part co-moments}. Returns the groups' counts, means
+    and co-moments; a co-moment is the parts' co-moments plus the spread of
+    the part means around the group mean, weighted by the part counts.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = np.bincount(group_ids, weights=counts, minlength=groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        merged_means = {col: np.bincount(group_ids, weights=counts * values, minlength=groups) / total
+                        for col, values in means.items()}
+    deviations = {col: means[col] - merged_means[col][group_ids] for col in means}
+    merged = {}
+    for (a, b), values in comoments.items():
+        spread = counts * deviations[a] * deviations[b]
+        merged[a, b] = np.bincount(group_ids, weights=values + spread, minlength=groups)
+    return total, merged_means, merged
+
+
+def _cell_moments(cells):
+    means = {col: cells[_mean_name(col)].to_numpy() for col in CORRELATION_COLUMNS}
+    comoments = {pair: cells[_comoment_name(*pair)].to_numpy() for pair in MOMENT_PAIRS}
+    return cells['RowCount'].to_numpy(), means, comoments
+
+
+def sketch_column(col):
+    return f'{col}Sketch'
+
+
+def build_cube(df, sketch_mode=None):
+    """Aggregate fact rows into cube cells (measures are summed in float64)"""
+    work = df[CUBE_DIMENSIONS].copy()
+    work['Revenue'] = df['Revenue'].astype('float64')
+    work['Profit'] = df['Profit'].astype('float64')
+    work['Quantity'] = df['Quantity'].astype('int64')
+    work['RowCount'] = 1
+
+    grouped = work.groupby(CUBE_DIMENSIONS, observed=True, sort=True)
+    cube = grouped.sum().reset_index()
+    cell_ids = grouped.ngroup().to_numpy()
+
+    # Each row is one part with a co-moment of 0; merging gives the cells' moments
+    numeric = {col: df[col].to_numpy(dtype=np.float64) for col in CORRELATION_COLUMNS}
+    zeros = np.zeros(len(df))
+    _, means, comoments = combine_moments(np.ones(len(df)), numeric, {pair: zeros for pair in MOMENT_PAIRS},
+                                          cell_ids, len(cube))
+    _set_moments(cube, means, comoments)
+    for col in DISTINCT_COLUMNS:
+        cube[sketch_column(col)] = sketch_groups(hash_ids(df[col]), cell_ids, len(cube), sketch_mode)
+    return _finish_cube(cube)
+
+
+def _set_moments(cube, means, comoments):
+    for col, values in means.items():
+        cube[_mean_name(col)] = values
+    for (a, b), values in comoments.items():
+        cube[_comoment_name(a, b)] = values
+
+
+def _finish_cube(cube):
+    for col in _LABEL_DIMENSIONS:
+        cube[col] = cube[col].astype('category')
+    cube['Quarter'] = (cube['Month'] - 1) // 3 + 1
+    return cube
+
+
+def merge_cubes(cubes):
+    """
+    Combine cubes built from different rows into one.
+
+    Cells with the same dimensions are summed and their distinct sketches
+    merged, so building a cube chunk by chunk and merging gives the cube of
+    all the rows.
+    """
+    combined = pd.concat([cube.drop(columns='Quarter') for cube in cubes], ignore_index=True)
+    for col in _LABEL_DIMENSIONS:
+        combined[col] = combined[col].astype(str)
+    sketches = [sketch_column(col) for col in DISTINCT_COLUMNS]
+    grouped = combined.groupby(CUBE_DIMENSIONS, sort=True)
+    merged = grouped[[col for col in combined.columns if col not in CUBE_DIMENSIONS + sketches + MOMENT_COLUMNS]].sum()
+    cell_ids = grouped.ngroup().to_numpy()
+    _, means, comoments = combine_moments(*_cell_moments(combined), cell_ids, len(merged))
+    _set_moments(merged, means, comoments)
+    for col in sketches:
+        merged[col] = merge_blob_groups(combined[col], cell_ids, len(merged))
+    return _finish_cube(merged.reset_index())
+
+
+def write_cube(cube, path=settings.CUBE_PATH):
+    """Write the cube aside and swap it in, so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    staging = staging_path(path)
+    cube.to_parquet(staging, index=False)
+    os.replace(staging, path)
+
+
+def read_cube(path=settings.CUBE_PATH):
+    return pd.read_parquet(path)
+
+
+def _month_key(year, month):
+    return year * 12 + (month - 1)
+
+
+def _full_month_range(start, end):
+    """Month keys [first, last] whose every day lies inside start..end"""
+    first = _month_key(start.year, start.month) + (0 if start.day == 1 else 1)
+    last_day = calendar.monthrange(end.year, end.month)[1]
+    last = _month_key(end.year, end.month) - (0 if end.day == last_day else 1)
+    return first, last
+
+
+def _covered_range(date_range, bounds):
+    # Days outside the data bounds have no rows, so treat them as covered
+    (start, end), (data_start, data_end) = date_range, bounds
+    if start <= data_start:
+        start = _first_of_month(data_start)
+    if end >= data_end:
+        end = _last_of_month(data_end)
+    return start, end
+
+
+def full_months(date_range, bounds):
+    """
+    Month keys (year * 12 + month - 1) [first, last] of the months `date_range`
+    covers whole, counting days outside the data `bounds` as covered
+    """
+    return _full_month_range(*_covered_range(date_range, bounds))
+
+
+def filter_cells(cube, df, filter_index, date_range=None, selections=None):
+    """
+    Cube cells for the active filters.
+
+    Whole months inside the date range come straight from the cube. A range
+    that starts or ends mid-month contributes those partial months by
+    aggregating just their rows, found through the filter index.
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    for dim, value in (selections or {}).items():
+        if value is not None and value != 'All':
+            mask &= (cube[dim] == value).to_numpy()
+
+    if not date_range:
+        return cube[mask]
+
+    start, end = _covered_range(date_range, filter_index.date_bounds())
+    if start > end:
+        return cube.iloc[0:0]
+
+    first, last = _full_month_range(start, end)
+    keys = _month_key(cube['Year'].to_numpy(), cube['Month'].to_numpy())
+    parts = [cube[mask & (keys >= first) & (keys <= last)]]
+
+    for edge_start, edge_end in _edge_ranges(start, end, first, last):
+        rows = filter_index.query((edge_start, edge_end), selections)
+        edge_rows = df.iloc[rows]
+        if len(edge_rows):
+            parts.append(build_cube(edge_rows))
+
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def _first_of_month(day):
+    return day.replace(day=1)
+
+
+def _last_of_month(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _edge_ranges(start, end, first, last):
+    """Day ranges of the partial months at either end of start..end"""
+    start_key = _month_key(start.year, start.month)
+    end_key = _month_key(end.year, end.month)
+    if first > last:
+        # No whole month inside the range: it is one or two partial months
+        if start_key == end_key:
+            return [(start, end)]
+        return [(start, _last_of_month(start)), (_first_of_month(end), end)]
+    edges = []
+    if first > start_key:
+        edges.append((start, _last_of_month(start)))
+    if last < end_key:
+        edges.append((_first_of_month(end), end))
+    return edges
+
+
+def rollup(cells, by, measures=('Revenue', 'Profit', 'Quantity', 'RowCount'), distinct=()):
+    """
+    Sum cube cells up to the `by` dimensions.
+
+    Each column named in `distinct` (e.g. 'OrderID') is added as the distinct
+    count obtained by merging the cells' sketches.
+    """
+    grouped = cells.groupby(by, observed=True)
+    result = grouped[list(measures)].sum()
+    for col in distinct:
+        result[col] = grouped[sketch_column(col)].agg(count_blobs)
+    return result.reset_index()
+
+
+def grand_totals(cells):
+    """Grand totals of the additive measures over the given cells"""
+    return {measure: cells[measure].sum() for measure in CUBE_MEASURES}
+
+
+def distinct_count(cells, col):
+    """Distinct `col` values (OrderID or CustomerID) across the given cells"""
+    return count_blobs(cells[sketch_column(col)])
+
+
+def correlation_matrix(cells, columns=CORRELATION_COLUMNS):
+    """Pearson correlation matrix of the numeric columns, from the cells' centred moments"""
+    _, _, comoments = combine_moments(*_cell_moments(cells), np.zeros(len(cells), dtype=np.int64), 1)
+    cov = pd.DataFrame(index=columns, columns=columns, dtype='float64')
+    for a, b in itertools.combinations_with_replacement(columns, 2):
+        pair = tuple(sorted((a, b), key=CORRELATION_COLUMNS.index))
+        cov.loc[a, b] = cov.loc[b, a] = comoments[pair][0] if len(cells) else np.nan
+    std = np.sqrt(np.diag(cov.to_numpy()))
+    return cov / np.outer(std, std)
+
+
+def cube_matches(cube, df):
+    """
+    Whether `cube` was built from the rows of `df`: it has the current cell
+    columns, the same row count and the same span of months
+    """
+    if len(df) == 0 or any(col not in cube.columns for col in MOMENT_COLUMNS):
+        return False
+    months = _month_key(cube['Year'].to_numpy(np.int64), cube['Month'].to_numpy(np.int64))
+    dates = df['Date']
+    return (int(cube['RowCount'].sum()) == len(df)
+            and months.min() == _month_key(dates.min().year, dates.min().month)
+            and months.max() == _month_key(dates.max().year, dates.max().month))
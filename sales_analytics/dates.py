@@ -0,0 +1,87 @@
+"""
+Date parsing and calendar features shared by the pipeline and the dashboard.
+
+Order and ship dates repeat heavily (a few thousand distinct days over
+millions of rows), so columns are parsed once per distinct string with an
+explicit format and the results mapped back by code. Calendar features
+(Year, Month, Quarter, YearMonth, MonthStart) come from integer month
+arithmetic on datetime64 values instead of per-row accessors and string
+formatting.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Raw Superstore export (e.g. 11/8/2016) and the cleaned CSV (2016-11-08)
+RAW_DATE_FORMAT = '%m/%d/%Y'
+PROCESSED_DATE_FORMAT = '%Y-%m-%d'
+
+
+def parse_dates(values, date_format=None):
+    """
+    Parse a column of date strings, converting each distinct value only once.
+
+    When any value does not match `date_format`, the column falls back to
+    pandas' per-value format inference (format='mixed'), so an unexpected
+    layout, or several layouts in one extract, is parsed slowly rather than
+    rejected.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    try:
+        parsed = pd.to_datetime(uniques, format=date_format)
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(uniques, format='mixed')
+    result = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def _month_numbers(dates):
+    """Months since 1970-01 as int64, with a mask of missing dates"""
+    values = dates.to_numpy()
+    missing = np.isnat(values)
+    months = values.astype('datetime64[M]').astype(np.int64)
+    return months, missing
+
+
+def month_start(year, month, unit='us'):
+    """First day of each (year, month) as datetime64"""
+    months = (np.asarray(year, dtype=np.int64) - 1970) * 12 + np.asarray(month, dtype=np.int64) - 1
+    return months.astype('datetime64[M]').astype(f'datetime64[{unit}]')
+
+
+def date_features(dates):
+    """
+    Year, Month, Quarter, YearMonth and MonthStart of a datetime Series.
+
+    Integer features are int32 (float with NaN where the date is missing),
+    matching the pandas .dt accessors they replace.
+    """
+    months, missing = _month_numbers(dates)
+    year = months // 12 + 1970
+    month = months % 12 + 1
+    quarter = (month - 1) // 3 + 1
+
+    # Format each distinct month once
+    month_codes, unique_months = pd.factorize(months)
+    labels = np.array([f'{m // 12 + 1970:04d}-{m % 12 + 1:02d}' for m in unique_months], dtype=object)
+    year_month = labels[month_codes]
+
+    unit = np.datetime_data(dates.dtype)[0]
+    starts = months.astype('datetime64[M]').astype(f'datetime64[{unit}]')
+
+    features = {'Year': year, 'Month': month, 'Quarter': quarter}
+    if missing.any():
+        features = {name: np.where(missing, np.nan, values) for name, values in features.items()}
+        year_month = np.where(missing, np.nan, year_month)
+        starts[missing] = np.datetime64('NaT')
+    else:
+        features = {name: values.astype(np.int32) for name, values in features.items()}
+
+    index = dates.index
+    result = {name: pd.Series(values, index=index) for name, values in features.items()}
+    result['YearMonth'] = pd.Series(year_month, index=index, dtype='str')
+    result['MonthStart'] = pd.Series(starts, index=index)
+    return result
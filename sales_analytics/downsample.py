@@ -0,0 +1,69 @@
+"""
+Render-budget helpers for the dashboard's row-level charts.
+
+Plotly serializes every point it is given into the page, so passing all
+filtered rows to a histogram or scatter makes the payload grow with the
+table. Histograms are binned here with NumPy and only the bin counts are
+sent; scatters are cut down to at most `max_points` rows by keeping the most
+extreme points on each axis and sampling the rest proportionally within each
+stratum (e.g. Category), so the shape of the cloud and its outliers survive.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def histogram_bins(values, bins=50):
+    """Equal-width bins over the finite `values`: Left, Right, Center and Count per bin"""
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return pd.DataFrame({'Left': [], 'Right': [], 'Center': [], 'Count': []})
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({
+        'Left': edges[:-1],
+        'Right': edges[1:],
+        'Center': (edges[:-1] + edges[1:]) / 2,
+        'Count': counts,
+    })
+
+
+def _extremity(df, value_cols):
+    """How far each row sits from the middle of any value column, as a rank in [0, 0.5]"""
+    ranks = df[value_cols].rank(pct=True).to_numpy()
+    return np.nan_to_num(np.abs(ranks - 0.5), nan=0.5).max(axis=1)
+
+
+def sample_points(df, value_cols, by=None, max_points=5000, outlier_share=0.1, seed=0):
+    """
+    At most `max_points` rows of `df` for a scatter plot, in their original order.
+
+    The `outlier_share` of the budget goes to the rows most extreme in any of
+    `value_cols`; the rest is a random sample taking the same fraction of
+    every `by` group, with at least one row from each.
+    """
+    if len(df) <= max_points:
+        return df
+    extremity = _extremity(df, value_cols)
+    n_outliers = int(max_points * outlier_share)
+    outliers = np.argpartition(-extremity, n_outliers)[:n_outliers] if n_outliers else np.array([], dtype='int64')
+
+    rest = np.setdiff1d(np.arange(len(df)), outliers)
+    budget = max_points - n_outliers
+    codes = pd.factorize(df[by].iloc[rest])[0] if by else np.zeros(len(rest), dtype='int64')
+    sizes = np.bincount(codes + 1)[1:] if len(codes) else np.array([], dtype='int64')
+    # One row per group up front, the remaining budget shared in proportion to size
+    spare = max(budget - len(sizes), 0)
+    quotas = np.minimum(sizes, 1 + np.floor(sizes * spare / len(rest)).astype('int64'))
+
+    # Random order within each group; a row is kept when its place is inside the quota
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(rest)), codes))
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, sorted_codes, side='left')
+    place = np.arange(len(order)) - starts
+    valid = sorted_codes >= 0
+    sampled = rest[order[valid & (place < quotas[np.maximum(sorted_codes, 0)])]]
+
+    keep = np.sort(np.concatenate([outliers, sampled]))
+    return df.iloc[keep]
@@ -0,0 +1,134 @@
+"""
+Export targets for the pipeline's summary tables.
+
+Each target writes the same named tables in one format: Parquet and Feather
+files (one per table) are fast to write and read back with their dtypes, and
+the Excel workbook is streamed through openpyxl's write-only mode, which
+appends rows without building a styled cell object per value the way
+DataFrame.to_excel does. export_tables() runs the selected targets in
+parallel threads and reports each target's wall time.
+
+A per-table export replaces the previous one whole: files of tables it no
+longer includes (Anomalies, in a run that flags nothing) are removed, so
+readers of the directory never mix runs.
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def _remove_stale(tables, out_dir, extension):
+    """Remove <name>.<extension> files of tables a previous export wrote and this one does not"""
+    for filename in os.listdir(out_dir):
+        name, ext = os.path.splitext(filename)
+        if ext == extension and name not in tables:
+            os.remove(os.path.join(out_dir, filename))
+
+
+def write_parquet(tables, out_dir):
+    """One <name>.parquet file per table; other .parquet files in `out_dir` are removed"""
+    os.makedirs(out_dir, exist_ok=True)
+    _remove_stale(tables, out_dir, '.parquet')
+    for name, table in tables.items():
+        table.to_parquet(os.path.join(out_dir, f'{name}.parquet'), index=False)
+
+
+def write_feather(tables, out_dir):
+    """One <name>.feather file per table; other .feather files in `out_dir` are removed"""
+    os.makedirs(out_dir, exist_ok=True)
+    _remove_stale(tables, out_dir, '.feather')
+    for name, table in tables.items():
+        table.reset_index(drop=True).to_feather(os.path.join(out_dir, f'{name}.feather'))
+
+
+def _excel_value(value):
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def _excel_column(series):
+    """Python values of a column, converted once per column rather than per cell"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return [None if pd.isna(value) else value.to_pydatetime() for value in series]
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype='float64')
+        return [None if math.isnan(value) else value for value in values.tolist()]
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.astype(object).where(series.notna(), None).tolist()
+    return [_excel_value(value) for value in series.astype(object).where(series.notna(), None)]
+
+
+def write_excel(tables, path):
+    """One sheet per table, streamed row by row in openpyxl's write-only mode"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    workbook = Workbook(write_only=True)
+    # Same header look as DataFrame.to_excel
+    thin = Side(style='thin')
+    header_font = Font(bold=True)
+    header_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header_alignment = Alignment(horizontal='center', vertical='top')
+    for name, table in tables.items():
+        sheet = workbook.create_sheet(name)
+        header = []
+        for col in table.columns:
+            cell = WriteOnlyCell(sheet, value=str(col))
+            cell.font, cell.border, cell.alignment = header_font, header_border, header_alignment
+            header.append(cell)
+        sheet.append(header)
+        for row in zip(*(_excel_column(table[col]) for col in table.columns)):
+            sheet.append(row)
+    workbook.save(path)
+
+
+EXPORTERS = {
+    'parquet': write_parquet,
+    'feather': write_feather,
+    'excel': write_excel,
+}
+
+
+def export_tables(tables, targets, log=print):
+    """
+    Write `tables` ({name: DataFrame}) with every target in `targets`
+    ({format: path}) in parallel threads.
+
+    Returns {format: seconds}. A failing target does not stop the others;
+    its exception is raised once every target has finished.
+    """
+    def run(fmt, path):
+        start = time.perf_counter()
+        EXPORTERS[fmt](tables, path)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=len(targets) or 1) as pool:
+        futures = {fmt: pool.submit(run, fmt, path) for fmt, path in targets.items()}
+    timings = {}
+    errors = []
+    for fmt, future in futures.items():
+        try:
+            timings[fmt] = future.result()
+            log(f"Exported {len(tables)} tables as {fmt} to {targets[fmt]} in {timings[fmt]:.2f}s")
+        except Exception as e:
+            errors.append(e)
+            log(f"Export as {fmt} to {targets[fmt]} failed: {e}")
+    if errors:
+        raise errors[0]
+    return timings
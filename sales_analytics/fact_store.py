@@ -0,0 +1,214 @@
+"""
+Columnar fact store.
+
+The cleaned fact table is written as a Parquet dataset partitioned by
+Year/Region. Column types are stored with the data, so readers get datetimes
+and numbers back without re-parsing text, and can project only the columns
+they need. The star schema (star_schema.py) and the CSV written by the
+pipeline stay as fallbacks.
+"""
+
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from . import settings
+from .dates import PROCESSED_DATE_FORMAT, parse_dates
+from .publish import replace_directory, staging_path
+from .standardize import plain_strings
+from .star_schema import StarSchema, star_schema_exists
+
+PARTITION_COLS = ['Year', 'Region']
+DATE_COLS = ['Date', 'ShipDate', 'MonthStart']
+SCHEMA_FILE = '_common_metadata'
+# Rows per DataFrame when streaming the store
+BATCH_ROWS = 250_000
+
+
+def create_fact_store(df, path, partition_cols=PARTITION_COLS):
+    """Start a store at `path` (normally a staging path) with the rows of `df`; later rows are appended"""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+    table = pa.Table.from_pandas(plain_strings(df), preserve_index=False)
+    pq.write_to_dataset(table, root_path=path, partition_cols=partition_cols)
+    # Keep the full schema (including partition column types) next to the data
+    pq.write_metadata(table.schema, os.path.join(path, SCHEMA_FILE))
+
+
+def write_fact_store(df, path=settings.FACT_STORE_PATH, partition_cols=PARTITION_COLS):
+    """Write the cleaned fact table as a partitioned Parquet dataset, replacing any previous one"""
+    # Built aside and swapped in, so readers never see a missing or partial store
+    staging = staging_path(path)
+    create_fact_store(df, staging, partition_cols)
+    replace_directory(staging, path)
+
+
+def _partition_dir(key, partition_cols=PARTITION_COLS):
+    return os.path.join(*(f'{col}={value}' for col, value in zip(partition_cols, key)))
+
+
+def _partition_filter(partitions, partition_cols=PARTITION_COLS):
+    """Dataset expression matching any of the given partition key tuples"""
+    expression = None
+    for key in partitions:
+        term = None
+        for col, value in zip(partition_cols, key):
+            clause = ds.field(col) == value
+            term = clause if term is None else term & clause
+        expression = term if expression is None else expression | term
+    return expression
+
+
+def append_to_fact_store(df, path=settings.FACT_STORE_PATH, partition_cols=PARTITION_COLS):
+    """Add rows as new files in their partitions, leaving existing files untouched"""
+    schema = pq.read_schema(os.path.join(path, SCHEMA_FILE))
+    table = pa.Table.from_pandas(plain_strings(df[schema.names]), schema=schema, preserve_index=False)
+    pq.write_to_dataset(table, root_path=path, partition_cols=partition_cols,
+                        existing_data_behavior='overwrite_or_ignore')
+
+
+def rewrite_partitions(df, partitions, path=settings.FACT_STORE_PATH, partition_cols=PARTITION_COLS):
+    """
+    Replace the contents of the given partitions with the rows of `df`.
+
+    Only the listed partitions are touched; a partition left without rows is
+    removed.
+    """
+    partitions = set(partitions)
+    keys = set(df[partition_cols].drop_duplicates().itertuples(index=False, name=None)) if len(df) else set()
+    for key in partitions - keys:
+        shutil.rmtree(os.path.join(path, _partition_dir(key, partition_cols)), ignore_errors=True)
+    if len(df):
+        schema = pq.read_schema(os.path.join(path, SCHEMA_FILE))
+        table = pa.Table.from_pandas(plain_strings(df[schema.names]), schema=schema, preserve_index=False)
+        pq.write_to_dataset(table, root_path=path, partition_cols=partition_cols,
+                            existing_data_behavior='delete_matching')
+
+
+def stage_partition_changes(appended, replacements, path=settings.FACT_STORE_PATH, partition_cols=PARTITION_COLS):
+    """
+    Write an increment next to the store without touching it: `appended`
+    rows as new files of their partitions, and `replacements` as the whole
+    new contents of the partitions they fall in. Returns the staging path
+    for swap_partition_changes()
+    """
+    staging = staging_path(path)
+    shutil.rmtree(staging, ignore_errors=True)
+    schema = pq.read_schema(os.path.join(path, SCHEMA_FILE))
+    for name, df in (('append', appended), ('replace', replacements)):
+        os.makedirs(os.path.join(staging, name))
+        if len(df):
+            table = pa.Table.from_pandas(plain_strings(df[schema.names]), schema=schema, preserve_index=False)
+            pq.write_to_dataset(table, root_path=os.path.join(staging, name), partition_cols=partition_cols)
+    return staging
+
+
+def _leaf_dirs(root):
+    for directory, dirs, files in os.walk(root):
+        if files:
+            yield os.path.relpath(directory, root), files
+
+
+def swap_partition_changes(staging, partitions, path=settings.FACT_STORE_PATH, partition_cols=PARTITION_COLS):
+    """
+    Move a staged increment into the store with renames only: staged
+    replacements take the place of their partitions, the other `partitions`
+    are removed (no rows left), and appended files join their partitions
+    """
+    replace_root, append_root = os.path.join(staging, 'replace'), os.path.join(staging, 'append')
+    replaced = set()
+    for relative, files in _leaf_dirs(replace_root):
+        replace_directory(os.path.join(replace_root, relative), os.path.join(path, relative))
+        replaced.add(os.path.normpath(relative))
+    for key in partitions:
+        if os.path.normpath(_partition_dir(key, partition_cols)) not in replaced:
+            shutil.rmtree(os.path.join(path, _partition_dir(key, partition_cols)), ignore_errors=True)
+    for relative, files in _leaf_dirs(append_root):
+        os.makedirs(os.path.join(path, relative), exist_ok=True)
+        for name in files:
+            os.replace(os.path.join(append_root, relative, name), os.path.join(path, relative, name))
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def read_partitions(partitions, path=settings.FACT_STORE_PATH, columns=None, partition_cols=PARTITION_COLS):
+    """Rows of the given (Year, Region) partitions"""
+    row_filter = _partition_filter(partitions, partition_cols) if partitions else ds.scalar(False)
+    return read_fact_store(path, columns=columns, row_filter=row_filter)
+
+
+def fact_store_exists(path=settings.FACT_STORE_PATH):
+    return os.path.isfile(os.path.join(path, SCHEMA_FILE))
+
+
+def open_fact_dataset(path=settings.FACT_STORE_PATH):
+    """Open the Parquet store as a pyarrow dataset with the schema it was written with"""
+    schema = pq.read_schema(os.path.join(path, SCHEMA_FILE))
+    return ds.dataset(path, schema=schema, format='parquet', partitioning='hive')
+
+
+def read_fact_store(path=settings.FACT_STORE_PATH, columns=None, row_filter=None):
+    """Read the Parquet store, loading only `columns` (all if None) and rows matching `row_filter`"""
+    dataset = open_fact_dataset(path)
+    if columns is not None:
+        columns = [col for col in dataset.schema.names if col in columns]
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    return table.to_pandas()
+
+
+def iter_fact_batches(path=settings.FACT_STORE_PATH, columns=None, batch_rows=BATCH_ROWS):
+    """
+    The Parquet store as DataFrames of about `batch_rows` rows. Record
+    batches (one or more per partition file) are gathered until the budget
+    is reached, so small partitions do not each pay the conversion overhead.
+    """
+    dataset = open_fact_dataset(path)
+    if columns is not None:
+        columns = [col for col in dataset.schema.names if col in columns]
+    pending, rows = [], 0
+    for batch in dataset.to_batches(columns=columns):
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= batch_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def read_fact_csv(path=settings.FACT_CSV_PATH, columns=None):
+    """Read the cleaned CSV, parsing whichever date columns were requested"""
+    if columns is not None:
+        df = pd.read_csv(path, usecols=lambda col: col in columns)
+    else:
+        df = pd.read_csv(path)
+    for col in DATE_COLS:
+        if col in df.columns:
+            df[col] = parse_dates(df[col], PROCESSED_DATE_FORMAT)
+    return df
+
+
+def fact_source(store_path=settings.FACT_STORE_PATH, csv_path=settings.FACT_CSV_PATH,
+                star_path=settings.STAR_SCHEMA_PATH):
+    """Path load_fact_table() reads: the Parquet store, else the star schema, else the cleaned CSV"""
+    if fact_store_exists(store_path):
+        return store_path
+    if star_schema_exists(star_path):
+        return star_path
+    return csv_path
+
+
+def load_fact_table(columns=None, store_path=settings.FACT_STORE_PATH, csv_path=settings.FACT_CSV_PATH,
+                    star_path=settings.STAR_SCHEMA_PATH):
+    """Load the fact table from the Parquet store, falling back to the star schema, then the cleaned CSV"""
+    source = fact_source(store_path, csv_path, star_path)
+    if source == store_path:
+        return read_fact_store(store_path, columns=columns)
+    if source == star_path:
+        # Only the dimensions holding requested columns are read and joined
+        return StarSchema(star_path).load(columns)
+    return read_fact_csv(csv_path, columns=columns)
@@ -0,0 +1,128 @@
+"""
+Inverted indexes for the dashboard's sidebar filters.
+
+The fact table is sorted by date once at load time, so any date range is a
+contiguous block of row positions found with two binary searches. Dates held
+as ordered day categories (compact_frame) are searched by their codes, which
+rise with the date once rows are sorted. Each
+filterable dimension keeps a sorted row-position list per value. A filter
+combination restricts those lists to the date block and intersects them,
+smallest first, so the work grows with the selected slice rather than with
+the table.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+FILTER_DIMENSIONS = ['Region', 'Segment', 'Category']
+
+
+def sort_by_date(df, date_col='Date'):
+    """Return `df` ordered by `date_col` with a fresh RangeIndex, as FilterIndex expects"""
+    return df.sort_values(date_col, kind='stable').reset_index(drop=True)
+
+
+def _restrict(positions, lo, hi):
+    """Part of a sorted position list that falls inside [lo, hi)"""
+    start, stop = np.searchsorted(positions, [lo, hi])
+    return positions[start:stop]
+
+
+def _intersect(smaller, larger):
+    """Members of `smaller` also present in `larger` (both sorted, unique)"""
+    if len(smaller) == 0 or len(larger) == 0:
+        return smaller[:0]
+    idx = np.searchsorted(larger, smaller)
+    idx[idx == len(larger)] = len(larger) - 1
+    return smaller[larger[idx] == smaller]
+
+
+class FilterIndex:
+    """Date-sorted position index plus per-value row-position lists"""
+
+    def __init__(self, df, dimensions=FILTER_DIMENSIONS, date_col='Date'):
+        column = df[date_col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            self._days = column.cat.categories.to_numpy()
+            dates = column.cat.codes.to_numpy()
+            if (dates < 0).any():
+                # Missing dates sort last, as NaT does
+                dates = np.where(dates < 0, len(self._days), dates)
+        else:
+            self._days = None
+            dates = column.to_numpy()
+        if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+            raise ValueError(f"FilterIndex needs rows sorted by {date_col}; use sort_by_date() first")
+        self._dates = dates
+        self.row_count = len(df)
+        self.postings = {dim: self._build_postings(df[dim]) for dim in dimensions}
+
+    @staticmethod
+    def _build_postings(column):
+        codes, uniques = pd.factorize(column, sort=True)
+        # A stable sort groups positions by value while keeping each group ascending
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        starts = np.concatenate([[0], np.cumsum(counts)]) + (codes < 0).sum()
+        return {
+            value: order[starts[i]:starts[i + 1]]
+            for i, value in enumerate(uniques)
+        }
+
+    def values(self, dimension):
+        """Sorted distinct values of a filterable dimension"""
+        return list(self.postings[dimension])
+
+    def _date_at(self, position):
+        value = self._dates[position]
+        return pd.Timestamp(value if self._days is None else self._days[value]).date()
+
+    def _search(self, day):
+        """First position whose date is on or after `day`"""
+        if self._days is None:
+            return np.searchsorted(self._dates, np.datetime64(day).astype(self._dates.dtype), side='left')
+        code = np.searchsorted(self._days, np.datetime64(day).astype(self._days.dtype), side='left')
+        return np.searchsorted(self._dates, code, side='left')
+
+    def date_bounds(self):
+        return self._date_at(0), self._date_at(-1)
+
+    def date_block(self, start=None, end=None):
+        """Positions [lo, hi) of rows whose date falls within the inclusive day range"""
+        lo, hi = 0, self.row_count
+        if start is not None:
+            lo = self._search(start)
+        if end is not None:
+            hi = self._search(end + datetime.timedelta(days=1))
+        return int(lo), int(max(lo, hi))
+
+    def query(self, date_range=None, selections=None):
+        """
+        Row positions matching a date range and {dimension: value} selections.
+
+        Values of None or 'All' leave a dimension unfiltered. Returns a slice
+        when only the date range applies, otherwise a sorted position array;
+        either can be passed straight to `DataFrame.iloc`.
+        """
+        start, end = date_range if date_range else (None, None)
+        lo, hi = self.date_block(start, end)
+
+        lists = []
+        for dim, value in (selections or {}).items():
+            if value is None or value == 'All':
+                continue
+            positions = self.postings[dim].get(value)
+            if positions is None:
+                return np.empty(0, dtype=np.intp)
+            lists.append(_restrict(positions, lo, hi))
+
+        if not lists:
+            return slice(lo, hi)
+
+        lists.sort(key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            result = _intersect(result, other)
+        return result
@@ -0,0 +1,291 @@
+"""
+Incremental processing between full pipeline runs.
+
+A full run records a high-water mark (the latest order date processed) and
+persists order, customer and product totals next to the fact store. An
+incremental run then:
+
+1. keeps only input rows dated on or after the high-water mark (minus an
+   optional look-back window for late corrections),
+2. compares them by RowID with the stored rows of that window, and with
+   stored rows from before it whose date moved into it, to find new and
+   changed rows,
+3. stages new rows as files of their Year/Region partitions and the new
+   contents of the partitions that hold changed rows,
+4. rebuilds the cube cells of the affected months and applies the rows'
+   contribution to the entity totals (subtracting the old version of a
+   changed row before adding the new one),
+5. swaps the staged partitions into the store, writes the cube and saves
+   the state.
+
+Everything up to step 5 leaves the store, cube and state untouched. Step 5
+runs under a pending marker in the state directory, removed by save_state():
+a run that dies part-way through it leaves the marker behind, and the next
+run must be a full one (increment_pending()), since the store may already
+hold rows the state and cube do not count.
+
+The cost follows the size of the window and the affected months, not the
+whole history (plus one scan of the stored RowIDs).
+
+Only input rows inside the window are read, so rows deleted from the
+extract, or whose date moved to before the window, are not taken back; a
+full run picks them up.
+"""
+
+import json
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from . import settings
+from .anomalies import RunningStats
+from .cube import build_cube, merge_cubes, read_cube, write_cube
+from .fact_store import read_fact_store, read_partitions, stage_partition_changes, swap_partition_changes
+from .summaries import PRODUCT_KEYS, customer_totals, order_totals, product_totals
+
+STATE_FILE = 'state.json'
+PENDING_FILE = 'pending.json'
+ORDERS_FILE = 'order_totals.parquet'
+CUSTOMERS_FILE = 'customer_totals.parquet'
+PRODUCTS_FILE = 'product_totals.parquet'
+
+PARTITION_KEYS = ['Year', 'Region']
+MONTH_KEYS = ['Year', 'Month']
+
+
+def save_state(state_dir, high_water_mark, orders, customers, products, order_stats=None):
+    """
+    Persist the high-water mark, entity totals and running order-revenue
+    moments used by the next incremental run
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    orders.to_parquet(os.path.join(state_dir, ORDERS_FILE), index=False)
+    customers.to_parquet(os.path.join(state_dir, CUSTOMERS_FILE), index=False)
+    products.to_parquet(os.path.join(state_dir, PRODUCTS_FILE), index=False)
+    state = {'high_water_mark': pd.Timestamp(high_water_mark).isoformat()}
+    if order_stats is not None:
+        state['order_stats'] = order_stats.to_dict()
+    with open(os.path.join(state_dir, STATE_FILE), 'w') as f:
+        json.dump(state, f, indent=4)
+    # The state now matches the store and cube
+    pending_path = os.path.join(state_dir, PENDING_FILE)
+    if os.path.isfile(pending_path):
+        os.remove(pending_path)
+
+
+def increment_pending(state_dir):
+    """Whether an incremental run changed the store and died before saving its state"""
+    return os.path.isfile(os.path.join(state_dir, PENDING_FILE))
+
+
+def _mark_pending(state_dir, high_water_mark):
+    with open(os.path.join(state_dir, PENDING_FILE), 'w') as f:
+        json.dump({'high_water_mark': pd.Timestamp(high_water_mark).isoformat()}, f, indent=4)
+
+
+def load_state(state_dir):
+    """Saved state, or None when no full run has recorded one yet"""
+    state_path = os.path.join(state_dir, STATE_FILE)
+    if not os.path.isfile(state_path):
+        return None
+    with open(state_path) as f:
+        state = json.load(f)
+    return {
+        'high_water_mark': pd.Timestamp(state['high_water_mark']),
+        'orders': pd.read_parquet(os.path.join(state_dir, ORDERS_FILE)),
+        'customers': pd.read_parquet(os.path.join(state_dir, CUSTOMERS_FILE)),
+        'products': pd.read_parquet(os.path.join(state_dir, PRODUCTS_FILE)),
+        # States saved before order moments were kept get them from the totals
+        'order_stats': (RunningStats.from_dict(state['order_stats']) if 'order_stats' in state
+                        else RunningStats().update(pd.read_parquet(os.path.join(state_dir, ORDERS_FILE))['Revenue'])),
+    }
+
+
+def window_start(state, lookback_days=0):
+    """Earliest order date an incremental run looks at"""
+    return state['high_water_mark'].normalize() - pd.Timedelta(days=lookback_days)
+
+
+def _keys(df, cols):
+    return set(df[cols].drop_duplicates().itertuples(index=False, name=None))
+
+
+def _differs(left, right):
+    """Row mask: any column differs between two aligned frames (NaN equals NaN)"""
+    changed = pd.Series(False, index=left.index)
+    for col in left.columns:
+        a, b = left[col], right[col]
+        changed |= (a != b) & ~(a.isna() & b.isna())
+    return changed
+
+
+def split_changes(candidates, existing):
+    """
+    Compare candidate rows with stored rows by RowID.
+
+    Returns (new_rows, changed_rows, previous_versions): rows whose RowID is
+    unknown, rows whose values differ from the stored version, and those
+    stored versions.
+    """
+    existing = existing.set_index('RowID')
+    known = candidates['RowID'].isin(existing.index)
+    new_rows = candidates[~known]
+
+    matched = candidates[known].set_index('RowID')
+    stored = existing.loc[matched.index, matched.columns]
+    changed_ids = matched.index[_differs(matched, stored).to_numpy()]
+
+    changed_rows = candidates[candidates['RowID'].isin(changed_ids)]
+    previous_versions = existing.loc[changed_ids].reset_index()[candidates.columns]
+    return new_rows, changed_rows, previous_versions
+
+
+def moved_into_window(candidates, existing, store_path, window_filter):
+    """
+    Stored rows from before the window whose RowID is among the candidates
+    (their date moved into the window), with the other stored rows of their
+    orders so those orders' totals can be recomputed
+    """
+    stored_ids = read_fact_store(store_path, columns=['RowID'])['RowID']
+    moved = candidates['RowID'].isin(stored_ids) & ~candidates['RowID'].isin(existing['RowID'])
+    if not moved.any():
+        return existing.iloc[0:0]
+    ids = ds.field('RowID').isin(candidates.loc[moved, 'RowID'].tolist())
+    orders = read_fact_store(store_path, columns=['OrderID'], row_filter=ids)['OrderID'].unique().tolist()
+    return read_fact_store(store_path, row_filter=(ids | ds.field('OrderID').isin(orders)) & ~window_filter)
+
+
+def _month_filter(months):
+    expression = None
+    for year, month in months:
+        term = (ds.field('Year') == year) & (ds.field('Month') == month)
+        expression = term if expression is None else expression | term
+    return expression
+
+
+def refresh_cube_months(cube, months, store_path, delta):
+    """
+    Rebuild the cube cells of the given (Year, Month) pairs from their rows
+    once `delta` is applied: the stored rows it does not replace, plus its own
+    """
+    keys = pd.MultiIndex.from_frame(cube[MONTH_KEYS])
+    kept = cube[~keys.isin(list(months))]
+    stored = read_fact_store(store_path, row_filter=_month_filter(months))
+    rows = pd.concat([stored[~stored['RowID'].isin(delta['RowID'])], delta], ignore_index=True)
+    return merge_cubes([kept, build_cube(rows)])
+
+
+def _apply_totals(totals, added, removed, keys, measures):
+    """Add the contribution of `added` rows and subtract that of `removed` rows"""
+    parts = [totals[keys + measures]]
+    if len(added):
+        parts.append(added[keys + measures])
+    if len(removed):
+        negated = removed[keys + measures].copy()
+        negated[measures] = -negated[measures]
+        parts.append(negated)
+    merged = pd.concat(parts, ignore_index=True).groupby(keys, as_index=False)[measures].sum()
+    return merged[merged['RowCount'] > 0].reset_index(drop=True)
+
+
+def _order_pairs(rows, orders):
+    """Distinct (customer, order) pairs per customer among the given orders"""
+    pairs = rows.loc[rows['OrderID'].isin(orders), ['CustomerName', 'OrderID']].drop_duplicates()
+    return pairs.groupby('CustomerName').size()
+
+
+def apply_increment(df_clean, store_path=settings.FACT_STORE_PATH, cube_path=settings.CUBE_PATH,
+                    state_dir=settings.INCREMENTAL_STATE_DIR, lookback_days=0, log=print):
+    """
+    Merge new and changed rows of `df_clean` into the store, cube and totals.
+
+    Returns None when nothing changed, otherwise a dict with the refreshed
+    cube, order/customer/product totals, the new and changed rows (delta)
+    and row counts.
+    """
+    state = load_state(state_dir)
+    if state is None:
+        raise FileNotFoundError(f"No incremental state in {state_dir}; run a full build first")
+    if increment_pending(state_dir):
+        raise RuntimeError(f"An incremental run did not finish updating {store_path}; run a full build first")
+
+    cutoff = window_start(state, lookback_days)
+    candidates = df_clean[df_clean['Date'] >= cutoff]
+    log(f"Rows on or after {cutoff.date()}: {len(candidates)} of {len(df_clean)}")
+
+    window_filter = (ds.field('Year') >= cutoff.year) & (ds.field('Date') >= cutoff)
+    existing = read_fact_store(store_path, row_filter=window_filter)
+    # A stored row whose date moved into the window is a change, not a new row
+    moved = moved_into_window(candidates, existing, store_path, window_filter)
+    if len(moved):
+        log(f"Stored rows dated before the window pulled in by moved rows: {len(moved)}")
+        existing = pd.concat([existing, moved], ignore_index=True)
+    new_rows, changed_rows, previous = split_changes(candidates, existing)
+    log(f"New rows: {len(new_rows)}, changed rows: {len(changed_rows)}")
+    if new_rows.empty and changed_rows.empty:
+        return None
+
+    # Fact store: appends for new rows, partition rewrites where rows changed, staged aside
+    delta = pd.concat([new_rows, changed_rows], ignore_index=True)
+    rewritten = _keys(changed_rows, PARTITION_KEYS) | _keys(previous, PARTITION_KEYS)
+    if rewritten:
+        partition_rows = read_partitions(rewritten, store_path)
+        partition_rows = partition_rows[~partition_rows['RowID'].isin(set(changed_rows['RowID']))]
+        in_rewritten = pd.MultiIndex.from_frame(delta[PARTITION_KEYS]).isin(list(rewritten))
+        replacements = pd.concat([partition_rows, delta[in_rewritten]], ignore_index=True)
+        appended = delta[~in_rewritten]
+    else:
+        replacements, appended = new_rows.iloc[0:0], new_rows
+    staging = stage_partition_changes(appended, replacements, store_path)
+
+    # Cube cells of every affected month
+    months = _keys(delta, MONTH_KEYS) | _keys(previous, MONTH_KEYS)
+    cube = refresh_cube_months(read_cube(cube_path), months, store_path, delta)
+
+    # Entity totals: add new contributions, take back the old versions of changed rows
+    # Keep extract (RowID) order so 'first' picks the same row as a full run
+    window_after = pd.concat([existing[~existing['RowID'].isin(set(changed_rows['RowID']))], delta],
+                             ignore_index=True).sort_values('RowID', kind='stable')
+    affected_orders = set(delta['OrderID']) | set(previous['OrderID'])
+
+    products = _apply_totals(state['products'], product_totals(delta), product_totals(previous),
+                             PRODUCT_KEYS, ['Revenue', 'Quantity', 'Profit', 'RowCount'])
+
+    customers = _apply_totals(state['customers'], customer_totals(delta), customer_totals(previous),
+                              ['CustomerName'], ['Revenue', 'Profit', 'RowCount'])
+    order_delta = (_order_pairs(window_after, affected_orders)
+                   .sub(_order_pairs(existing, affected_orders), fill_value=0))
+    customers = customers.merge(state['customers'][['CustomerName', 'OrderCount']], on='CustomerName', how='left')
+    customers['OrderCount'] = (customers['OrderCount'].fillna(0) +
+                               customers['CustomerName'].map(order_delta).fillna(0)).astype('int64')
+    customers = customers[['CustomerName', 'Revenue', 'OrderCount', 'Profit', 'RowCount']]
+
+    orders = state['orders']
+    replaced = orders['OrderID'].isin(affected_orders)
+    affected_totals = order_totals(window_after[window_after['OrderID'].isin(affected_orders)])
+    # Running order-revenue moments: take back the old totals, add the new ones
+    order_stats = state['order_stats'].remove(orders.loc[replaced, 'Revenue']).update(affected_totals['Revenue'])
+    orders = pd.concat([orders[~replaced], affected_totals],
+                       ignore_index=True).sort_values('OrderID').reset_index(drop=True)
+
+    # Only renames and the cube and state writes from here on; a crash leaves the pending marker
+    high_water_mark = max(state['high_water_mark'], delta['Date'].max())
+    _mark_pending(state_dir, high_water_mark)
+    swap_partition_changes(staging, rewritten, store_path)
+    log(f"Partitions appended: {len(_keys(appended, PARTITION_KEYS))}, rewritten: {len(rewritten)}")
+    write_cube(cube, cube_path)
+    log(f"Cube months refreshed: {len(months)}")
+    save_state(state_dir, high_water_mark, orders, customers, products, order_stats)
+    log(f"High-water mark: {high_water_mark.date()}")
+
+    return {
+        'cube': cube,
+        'orders': orders,
+        'customers': customers,
+        'products': products,
+        'order_stats': order_stats,
+        'delta': delta,
+        'new_rows': len(new_rows),
+        'changed_rows': len(changed_rows),
+    }
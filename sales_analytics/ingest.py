@@ -0,0 +1,388 @@
+"""
+Streaming ingestion of the raw Superstore extract.
+
+The extract is read in chunks of `chunksize` rows (or in one piece when no
+chunk size is given). Its encoding is detected once, from samples at the
+start and end of the file, instead of re-reading the whole file after each
+decode error. Every chunk goes through the cleaning steps, is appended to
+the cleaned CSV and the fact store, and is folded into running aggregates
+(cube cells, order/customer/product totals) and quality statistics. Memory
+is bounded by the chunk size and the size of the aggregates, not by the
+size of the input.
+
+Cleaning, storing and aggregating a chunk is independent of the other
+chunks, so with `workers` > 1 chunks are handed to a process pool and only
+reading, the CSV write and merging the partial aggregates stay serial.
+"""
+
+import codecs
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .cleaning import CLEANING_STEPS, clean_frame
+from .cube import build_cube, merge_cubes
+from .fact_store import append_to_fact_store, create_fact_store
+from .publish import replace_directory, staging_path
+from .quality import QualityStats
+from .standardize import plain_strings
+from .summaries import PRODUCT_KEYS, product_totals
+
+# Tried in this order; latin1 decodes any byte sequence, so it always matches
+ENCODINGS = ['utf-8', 'latin1', 'cp1252']
+SAMPLE_BYTES = 1 << 20
+REPLACEMENT_CHARACTER = '\ufffd'
+PARALLEL_CHUNKSIZE = 50000
+WORKER_STAGES = ['clean', 'store', 'render_csv', 'aggregate']
+
+
+def _decodes(sample, encoding, final):
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_encoding(path, sample_bytes=SAMPLE_BYTES):
+    """First encoding in ENCODINGS that decodes the head and tail samples of the file"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(sample_bytes)
+        tail = b''
+        if size > sample_bytes:
+            f.seek(max(size - sample_bytes, sample_bytes))
+            tail = f.read()
+    # Skip the continuation bytes of a UTF-8 character cut off by the tail sample
+    start = 0
+    while start < min(3, len(tail)) and 0x80 <= tail[start] < 0xC0:
+        start += 1
+    tail = tail[start:]
+    for encoding in ENCODINGS:
+        if _decodes(head, encoding, final=size <= sample_bytes) and _decodes(tail, encoding, final=True):
+            return encoding
+    return ENCODINGS[-1]
+
+
+def iter_raw_chunks(path, chunksize=None, encoding=None):
+    """
+    Raw extract as DataFrames of at most `chunksize` rows (one frame if None).
+
+    Bytes that do not decode in the detected encoding (outside the sampled
+    regions) are replaced with U+FFFD rather than aborting the read;
+    count_replacements() finds them.
+    """
+    encoding = encoding or detect_encoding(path)
+    if chunksize is None:
+        yield pd.read_csv(path, encoding=encoding, encoding_errors='replace')
+        return
+    with pd.read_csv(path, encoding=encoding, encoding_errors='replace', chunksize=chunksize) as reader:
+        yield from reader
+
+
+def count_replacements(chunk, encoding=None):
+    """U+FFFD characters in the text columns of a raw chunk: bytes that did not decode"""
+    if encoding and codecs.lookup(encoding).name == 'iso8859-1':
+        # Every byte is a latin1 character, so nothing was replaced
+        return 0
+    total = 0
+    for col in chunk.columns:
+        values = chunk[col]
+        if pd.api.types.is_string_dtype(values) or pd.api.types.is_object_dtype(values):
+            values = values.astype('str')
+            if values.str.contains(REPLACEMENT_CHARACTER, regex=False).any():
+                total += int(values.str.count(REPLACEMENT_CHARACTER).sum())
+    return total
+
+
+class _MergeBuffer:
+    """
+    Accumulates partial aggregates and merges them in geometrically growing
+    batches, so the total merge work stays linear in the number of partials.
+    """
+
+    def __init__(self, merge):
+        self._merge = merge
+        self._merged = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def add(self, part):
+        self._pending.append(part)
+        self._pending_rows += len(part)
+        if self._merged is None or self._pending_rows >= len(self._merged):
+            self._flush()
+
+    def _flush(self):
+        parts = ([self._merged] if self._merged is not None else []) + self._pending
+        if len(parts) > 1:
+            self._merged = self._merge(parts)
+        elif parts:
+            self._merged = parts[0]
+        self._pending = []
+        self._pending_rows = 0
+
+    def result(self):
+        self._flush()
+        return self._merged
+
+
+def _merge_orders(parts):
+    # Parts arrive in file order, so 'first' keeps the first row of each order
+    return pd.concat(parts, ignore_index=True).groupby('OrderID').agg({
+        'Date': 'first',
+        'Region': 'first',
+        'Revenue': 'sum'
+    }).reset_index()
+
+
+def _merge_customer_orders(parts):
+    return pd.concat(parts, ignore_index=True).groupby(['CustomerName', 'OrderID'], as_index=False).sum()
+
+
+def _merge_products(parts):
+    return pd.concat(parts, ignore_index=True).groupby(PRODUCT_KEYS, as_index=False).sum()
+
+
+class ChunkAggregates:
+    """
+    Mergeable running aggregates of cleaned fact rows.
+
+    Customer totals are kept at customer x order grain until the end, since
+    distinct order counts cannot be summed across chunks.
+    """
+
+    def __init__(self):
+        self._cube = _MergeBuffer(merge_cubes)
+        self._orders = _MergeBuffer(_merge_orders)
+        self._customer_orders = _MergeBuffer(_merge_customer_orders)
+        self._products = _MergeBuffer(_merge_products)
+
+    def add(self, df):
+        self._cube.add(build_cube(df))
+        self._orders.add(_merge_orders([df[['OrderID', 'Date', 'Region', 'Revenue']]]))
+        pairs = df[['CustomerName', 'OrderID', 'Revenue', 'Profit']].assign(RowCount=1)
+        self._customer_orders.add(_merge_customer_orders([pairs]))
+        self._products.add(product_totals(df))
+        return self
+
+    def merge(self, other):
+        self._cube.add(other.cube())
+        self._orders.add(other.orders())
+        self._customer_orders.add(other._customer_orders.result())
+        self._products.add(other.products())
+        return self
+
+    def cube(self):
+        return self._cube.result()
+
+    def orders(self):
+        """Per-order totals (as summaries.order_totals)"""
+        return self._orders.result()
+
+    def customers(self):
+        """Per-customer totals (as summaries.customer_totals)"""
+        return self._customer_orders.result().groupby('CustomerName').agg(
+            Revenue=('Revenue', 'sum'),
+            OrderCount=('OrderID', 'size'),
+            Profit=('Profit', 'sum'),
+            RowCount=('RowCount', 'sum'),
+        ).reset_index()
+
+    def products(self):
+        """Per-product totals (as summaries.product_totals)"""
+        return self._products.result()
+
+
+def _quiet(message):
+    pass
+
+
+def process_chunk(chunk, store_path, sample_rows=1000, first=False, log=_quiet, encoding=None):
+    """
+    Clean one raw chunk, add it to the fact store and aggregate it.
+
+    In parallel mode this runs in a worker process, so it hands back what the
+    caller needs to finish the chunk in file order: (csv_text, aggregates,
+    quality, sample, timings). The first chunk creates the store and carries
+    the CSV header. `encoding` is the one the chunk was decoded with, for
+    counting undecodable bytes.
+    """
+    timings = {}
+    steps = {}
+    start = time.perf_counter()
+    replacements = count_replacements(chunk, encoding)
+    df_clean = clean_frame(chunk, log=log, timings=steps)
+    timings['clean'] = time.perf_counter() - start
+    timings.update({f'clean.{step}': seconds for step, seconds in steps.items()})
+
+    start = time.perf_counter()
+    if first:
+        create_fact_store(df_clean, store_path)
+    else:
+        append_to_fact_store(df_clean, store_path)
+    timings['store'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    csv_text = df_clean.to_csv(header=first, index=False)
+    timings['render_csv'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    aggregates = ChunkAggregates().add(df_clean)
+    quality = QualityStats().add(df_clean)
+    quality.replaced_characters += replacements
+    timings['aggregate'] = time.perf_counter() - start
+    return csv_text, aggregates, quality, df_clean.head(sample_rows), timings
+
+
+def _timed(iterable, timings, key):
+    """Yield from `iterable`, adding the time spent producing items to timings[key]"""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings[key] += time.perf_counter() - start
+        yield item
+
+
+def ingest_extract(raw_path, csv_path, store_path, chunksize=None, workers=1, sample_rows=1000, log=print):
+    """
+    Clean the raw extract chunk by chunk, writing the cleaned CSV and fact store.
+
+    With workers > 1 the chunks after the first are cleaned, stored and
+    aggregated in a process pool while the main process reads ahead; the
+    partial aggregates are merged in file order. Parallel runs default to
+    PARALLEL_CHUNKSIZE rows per chunk.
+
+    Returns (aggregates, quality, sample, timings): the ChunkAggregates and
+    QualityStats of all rows, the first `sample_rows` cleaned rows, and the
+    run's timings in seconds (for the scaling report).
+    """
+    started = time.perf_counter()
+    if workers > 1 and chunksize is None:
+        chunksize = PARALLEL_CHUNKSIZE
+
+    log("Loading data...")
+    encoding = detect_encoding(raw_path)
+    log(f"Detected encoding: {encoding}")
+
+    timings = {'read': 0.0, 'write_csv': 0.0, 'merge': 0.0}
+    timings.update({stage: 0.0 for stage in WORKER_STAGES})
+    timings.update({f'clean.{step}': 0.0 for step, _, _ in CLEANING_STEPS})
+    aggregates = quality = None
+    sample = []
+    chunk_count = 0
+    # The CSV and store are written aside and swapped in once every chunk is in
+    staged_csv, staged_store = staging_path(csv_path), staging_path(store_path)
+
+    with open(staged_csv, 'w', newline='', encoding='utf-8') as csv_file:
+        def finish(result):
+            nonlocal aggregates, quality, chunk_count
+            csv_text, chunk_aggregates, chunk_quality, chunk_sample, chunk_timings = result
+            for stage, seconds in chunk_timings.items():
+                timings[stage] += seconds
+
+            start = time.perf_counter()
+            csv_file.write(csv_text)
+            timings['write_csv'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            if aggregates is None:
+                aggregates, quality = chunk_aggregates, chunk_quality
+            else:
+                aggregates.merge(chunk_aggregates)
+                quality.merge(chunk_quality)
+            timings['merge'] += time.perf_counter() - start
+
+            sampled = sum(len(part) for part in sample)
+            if sampled < sample_rows:
+                # Categories differ between chunks, so the sample keeps plain strings
+                sample.append(plain_strings(chunk_sample.head(sample_rows - sampled)))
+            chunk_count += 1
+            if chunksize is not None:
+                log(f"Processed chunk {chunk_count}: {quality.row_count} rows so far")
+
+        chunks = _timed(iter_raw_chunks(raw_path, chunksize, encoding), timings, 'read')
+        first_chunk = next(chunks)
+        # Print original column names for debugging
+        log(f"Original columns: {first_chunk.columns.tolist()}")
+        # The first chunk creates the store (and its schema) before any worker appends to it
+        finish(process_chunk(first_chunk, staged_store, sample_rows, first=True, log=log, encoding=encoding))
+
+        if workers > 1:
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for chunk in chunks:
+                    pending.append(pool.submit(process_chunk, chunk, staged_store, sample_rows, encoding=encoding))
+                    # Bound the chunks held in memory while workers catch up
+                    if len(pending) >= 2 * workers:
+                        finish(pending.popleft().result())
+                while pending:
+                    finish(pending.popleft().result())
+        else:
+            for chunk in chunks:
+                finish(process_chunk(chunk, staged_store, sample_rows, encoding=encoding))
+    replace_directory(staged_store, store_path)
+    os.replace(staged_csv, csv_path)
+    if quality.replaced_characters:
+        log(f"Warning: {quality.replaced_characters} characters did not decode as {encoding} "
+            f"and were replaced with U+FFFD; see validity_checks in the quality report")
+
+    timings = {
+        'workers': workers,
+        'chunksize': chunksize,
+        'chunks': chunk_count,
+        'rows': quality.row_count,
+        'wall_seconds': time.perf_counter() - started,
+        'main_seconds': {key: timings[key] for key in ['read', 'write_csv', 'merge']},
+        'worker_seconds': {stage: timings[stage] for stage in WORKER_STAGES},
+        'clean_seconds': {step: timings[f'clean.{step}'] for step, _, _ in CLEANING_STEPS},
+    }
+    return aggregates, quality, pd.concat(sample, ignore_index=True), timings
+
+
+def update_scaling_report(path, raw_path, timings):
+    """
+    Record a run's ingestion timings in the JSON scaling report at `path`.
+
+    Runs are keyed by worker count, and the report starts over when the input
+    file changes, so running the pipeline with --workers 1, 2, 4, ... builds
+    a speedup table for one extract. Speedup and efficiency are relative to
+    the single-worker run, once one has been recorded.
+    """
+    source = {
+        'path': os.path.abspath(raw_path),
+        'bytes': os.path.getsize(raw_path),
+        'modified': os.path.getmtime(raw_path),
+        'rows': timings['rows'],
+    }
+    report = None
+    if os.path.isfile(path):
+        with open(path) as f:
+            report = json.load(f)
+    if not report or report.get('input') != source:
+        report = {'input': source, 'cpu_count': os.cpu_count(), 'runs': {}}
+
+    run = dict(timings)
+    run['rows_per_second'] = timings['rows'] / timings['wall_seconds']
+    report['runs'][str(timings['workers'])] = run
+
+    baseline = report['runs'].get('1')
+    for run in report['runs'].values():
+        if baseline:
+            run['speedup'] = baseline['wall_seconds'] / run['wall_seconds']
+            run['efficiency'] = run['speedup'] / run['workers']
+    report['runs'] = dict(sorted(report['runs'].items(), key=lambda item: int(item[0])))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+    return report
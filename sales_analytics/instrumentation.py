@@ -0,0 +1,254 @@
+"""
+Timers and memory counters for dashboard reruns.
+
+A RerunProfile is activated for the duration of one script run. Code wraps
+its steps in stage(name) (loading, filtering, KPIs, each dashboard section)
+and reports finer timings into the innermost open stage with add(): panel
+aggregations as 'compute' and chart serialization as 'serialize'. The rest
+of a stage's wall time is figure construction and other Streamlit calls.
+Memory is sampled as the process RSS when a stage starts and ends, so it
+includes what other sessions allocate meanwhile. Where the RSS cannot be read
+(Windows without psutil) it is recorded as None and shown as n/a.
+
+Helpers are no-ops when no profile is active, so instrumented code runs
+unchanged outside the dashboard (tests, the pipeline).
+
+RerunMetrics collects finished reruns for the whole server process: each is
+appended to a JSON lines log, and p50/p95 latencies over the last `window`
+reruns are rewritten to a Prometheus text file for node_exporter's textfile
+collector or any scraper that reads files.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+_local = threading.local()
+
+
+def rss_bytes():
+    """
+    Current resident set size of the process: from /proc, else psutil when it
+    is installed, else the peak RSS. None when none of them is available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RerunProfile:
+    """Per-stage wall time, finer-grained timings and RSS change of one rerun"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self._open = []
+        self._timing = set()
+        self.seconds = None
+
+    @contextmanager
+    def stage(self, name):
+        record = self.stages.setdefault(name, {
+            'seconds': 0.0, 'rss_delta_bytes': 0, 'parts': defaultdict(float), 'hits': 0, 'misses': 0
+        })
+        self._open.append(name)
+        rss = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] += time.perf_counter() - start
+            after = rss_bytes()
+            if rss is None or after is None or record['rss_delta_bytes'] is None:
+                record['rss_delta_bytes'] = None
+            else:
+                record['rss_delta_bytes'] += after - rss
+            self._open.pop()
+
+    def add(self, part, seconds, hit=None):
+        """Count `seconds` of `part` in the innermost open stage; `hit` tallies cache lookups"""
+        if not self._open:
+            return
+        record = self.stages[self._open[-1]]
+        record['parts'][part] += seconds
+        if hit is not None:
+            record['hits' if hit else 'misses'] += 1
+
+    def finish(self):
+        """The rerun as a JSON-ready record"""
+        self.seconds = time.perf_counter() - self._start
+        return {
+            'timestamp': round(self.started, 3),
+            'seconds': round(self.seconds, 6),
+            'rss_bytes': rss_bytes(),
+            'stages': {
+                name: {
+                    'seconds': round(record['seconds'], 6),
+                    'rss_delta_bytes': None if record['rss_delta_bytes'] is None else int(record['rss_delta_bytes']),
+                    'parts': {part: round(seconds, 6) for part, seconds in record['parts'].items()},
+                    'hits': record['hits'],
+                    'misses': record['misses'],
+                }
+                for name, record in self.stages.items()
+            },
+        }
+
+    @contextmanager
+    def activate(self):
+        """Make this the profile stage() and add() report to on this thread"""
+        previous = getattr(_local, 'profile', None)
+        _local.profile = self
+        try:
+            yield self
+        finally:
+            _local.profile = previous
+
+
+def active_profile():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the active profile, if there is one"""
+    profile = active_profile()
+    if profile is None:
+        yield None
+        return
+    with profile.stage(name) as record:
+        yield record
+
+
+@contextmanager
+def timed(part):
+    """
+    Add the block's wall time to `part` of the innermost stage of the active
+    profile. The block may set outcome['hit'] to tally a cache lookup; a
+    block nested in another of the same part is not counted twice.
+    """
+    profile = active_profile()
+    if profile is None or part in profile._timing:
+        yield {}
+        return
+    profile._timing.add(part)
+    outcome = {}
+    start = time.perf_counter()
+    try:
+        yield outcome
+    finally:
+        profile._timing.discard(part)
+        profile.add(part, time.perf_counter() - start, outcome.get('hit'))
+
+
+def stage_table(record):
+    """Rows of (stage, total, compute, serialize, other, RSS change or n/a, hits, misses) for a finished rerun"""
+    rows = []
+    for name, stage_record in record['stages'].items():
+        parts = stage_record['parts']
+        compute = parts.get('compute', 0.0)
+        serialize = parts.get('serialize', 0.0)
+        rows.append({
+            'Stage': name,
+            'Total ms': stage_record['seconds'] * 1000,
+            'Compute ms': compute * 1000,
+            'Serialize ms': serialize * 1000,
+            'Other ms': max(stage_record['seconds'] - compute - serialize, 0.0) * 1000,
+            'RSS Δ MB': 'n/a' if stage_record['rss_delta_bytes'] is None else stage_record['rss_delta_bytes'] / 1e6,
+            'Cache hits': stage_record['hits'],
+            'Cache misses': stage_record['misses'],
+        })
+    return rows
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class RerunMetrics:
+    """
+    Process-wide collector of finished reruns: JSON lines log, rolling
+    percentiles and a Prometheus text file. Paths left empty are not written.
+    """
+
+    QUANTILES = (0.5, 0.95)
+
+    def __init__(self, log_path='', prometheus_path='', window=500):
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self._reruns = deque(maxlen=window)
+        self._stages = defaultdict(lambda: deque(maxlen=window))
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, rerun):
+        with self._lock:
+            self._reruns.append(rerun['seconds'])
+            for name, stage_record in rerun['stages'].items():
+                self._stages[name].append(stage_record['seconds'])
+            self._count += 1
+            self._sum += rerun['seconds']
+            if self.log_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(rerun) + '\n')
+            if self.prometheus_path:
+                self._write_prometheus()
+
+    def percentiles(self):
+        """{'rerun' and each stage: {quantile: seconds}} over the recent window"""
+        with self._lock:
+            return self._percentiles()
+
+    def _percentiles(self):
+        with_values = {'rerun': self._reruns, **self._stages}
+        return {
+            name: {q: float(np.quantile(np.asarray(values), q)) for q in self.QUANTILES}
+            for name, values in with_values.items() if values
+        }
+
+    def _write_prometheus(self):
+        percentiles = self._percentiles()
+        lines = [
+            '# HELP dashboard_rerun_seconds Wall time of dashboard script reruns',
+            '# TYPE dashboard_rerun_seconds summary',
+        ]
+        lines += [f'dashboard_rerun_seconds{{quantile="{q}"}} {value:.6f}'
+                  for q, value in percentiles.pop('rerun', {}).items()]
+        lines += [f'dashboard_rerun_seconds_sum {self._sum:.6f}', f'dashboard_rerun_seconds_count {self._count}']
+        lines += [
+            '# HELP dashboard_stage_seconds Wall time of dashboard rerun stages',
+            '# TYPE dashboard_stage_seconds gauge',
+        ]
+        lines += [f'dashboard_stage_seconds{{stage="{_label(name)}",quantile="{q}"}} {value:.6f}'
+                  for name, quantiles in percentiles.items() for q, value in quantiles.items()]
+        # Written aside and renamed, so scrapers never read a partial file
+        os.makedirs(os.path.dirname(os.path.abspath(self.prometheus_path)), exist_ok=True)
+        temp_path = f'{self.prometheus_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, self.prometheus_path)
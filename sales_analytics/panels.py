@@ -0,0 +1,118 @@
+"""
+Dashboard panel queries.
+
+Every aggregate the dashboard draws is a named panel query over the active
+filters. PandasPanels is the reference implementation: additive panels roll
+up the cube cells for the filters, row-level panels aggregate the filtered
+in-memory rows. SQLPanels (sql_backend.py) answers the same panels with the
+same columns by pushing the queries down to the Parquet store.
+
+Both take their inputs lazily, so a panel that needs only cube cells never
+builds the filtered rows and vice versa. The time-intelligence panel ignores
+the date range: its prior periods usually lie outside it.
+"""
+
+import pandas as pd
+
+from . import settings
+from .cube import correlation_matrix, distinct_count, grand_totals, rollup
+from .dates import month_start
+from .downsample import histogram_bins, sample_points
+from .time_intelligence import month_span, period_measures
+from .topk import top_k
+
+NUMERIC_COLS = ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']
+SCATTER_COLS = ['Revenue', 'Profit', 'Category', 'Product', 'Quantity']
+CATEGORICAL_SUMMARY = {
+    'Regions': 'Region',
+    'Segments': 'Segment',
+    'Categories': 'Category',
+    'Subcategories': 'SubCategory',
+    'Products': 'Product',
+    'Customers': 'CustomerID',
+}
+TOP_N = 10
+HISTOGRAM_BINS = 50
+
+
+class PandasPanels:
+    """
+    Panels from cube cells and filtered rows; `data` provides .cells,
+    .filtered_df, .history_cells (all dates) and .cube
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def totals(self):
+        return grand_totals(self.data.cells)
+
+    def orders(self):
+        return distinct_count(self.data.cells, 'OrderID')
+
+    def monthly(self):
+        monthly = rollup(self.data.cells, ['Year', 'Month'])
+        monthly['Date'] = month_start(monthly['Year'], monthly['Month'])
+        return monthly
+
+    def region(self):
+        return rollup(self.data.cells, 'Region')
+
+    def category(self):
+        return rollup(self.data.cells, 'Category')
+
+    def subcategory(self):
+        return rollup(self.data.cells, ['Category', 'SubCategory'])
+
+    def segment(self):
+        # Distinct orders/customers come from merging the cells' sketches
+        segments = rollup(self.data.cells, 'Segment', distinct=['OrderID', 'CustomerID'])
+        segments['Avg_Order_Value'] = segments['Revenue'] / segments['OrderID']
+        return segments
+
+    def quarterly(self):
+        return rollup(self.data.cells, 'Quarter')
+
+    def correlation(self):
+        return correlation_matrix(self.data.cells, NUMERIC_COLS)
+
+    def time_intelligence(self):
+        # Dense over every month of the data, so each month has its prior periods
+        return period_measures(rollup(self.data.history_cells, ['Year', 'Month']), months=month_span(self.data.cube))
+
+    def profit_bins(self):
+        return histogram_bins(self.data.filtered_df['Profit'], bins=HISTOGRAM_BINS)
+
+    def scatter_points(self):
+        # Extreme points are always kept and the rest sampled evenly within each category
+        return sample_points(self.data.filtered_df[SCATTER_COLS], ['Revenue', 'Profit'], by='Category',
+                             max_points=settings.MAX_PLOT_POINTS)
+
+    def top_products(self):
+        return top_k(self.data.filtered_df.groupby('Product', observed=True).agg({
+            'Revenue': 'sum',
+            'Quantity': 'sum',
+            'Profit': 'sum'
+        }).reset_index(), 'Revenue', TOP_N)
+
+    def top_customers(self):
+        # Distinct orders are counted for the leaders only, not every customer
+        rows = self.data.filtered_df
+        totals = rows.groupby('CustomerName', observed=True)[['Revenue', 'Profit']].sum().reset_index()
+        leaders = top_k(totals, 'Revenue', TOP_N)
+        leader_rows = rows[rows['CustomerName'].isin(leaders['CustomerName'])]
+        orders = leader_rows.groupby('CustomerName', observed=True)['OrderID'].nunique()
+        leaders.insert(2, 'OrderID', leaders['CustomerName'].map(orders).to_numpy())
+        return leaders
+
+    def numeric_summary(self):
+        return self.data.filtered_df[NUMERIC_COLS].describe()
+
+    def categorical_summary(self):
+        cells, rows = self.data.cells, self.data.filtered_df
+        counts = {
+            label: distinct_count(cells, col) if col == 'CustomerID'
+            else (cells if col in cells.columns else rows)[col].nunique()
+            for label, col in CATEGORICAL_SUMMARY.items()
+        }
+        return pd.DataFrame({'Unique Count': list(counts.values())}, index=list(counts))
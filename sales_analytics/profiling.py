@@ -0,0 +1,142 @@
+"""
+Stage profiling for the summary pipeline.
+
+StageProfiler times named pipeline stages: wall time, CPU time of the
+process and of finished worker processes, growth of the peak RSS and row
+counts in and out. One stage can additionally be run under cProfile; its
+stats are dumped as a .prof file (for snakeviz, or flameprof/gprof2dot to
+draw a flame graph) and as a text summary of the hottest functions. The
+stage records, with the run's totals, make up the JSON run report.
+
+Peak RSS comes from the Unix-only resource module; on Windows the peak
+figures are recorded as None (null in the report) and shown as n/a.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .instrumentation import rss_bytes
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+PROFILE_TOP_FUNCTIONS = 30
+
+
+def peak_rss_bytes(who='self'):
+    """Peak RSS of this process ('self') or its largest finished child ('children'); None without resource"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if who == 'children' else resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _mb(value):
+    return None if value is None else value / 1e6
+
+
+def _mb_delta(after, before):
+    return None if after is None or before is None else (after - before) / 1e6
+
+
+def _format_mb(value, spec):
+    return 'n/a' if value is None else format(value, spec)
+
+
+def cpu_seconds():
+    """User + system CPU time of this process and its finished children"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class StageProfiler:
+    """Records named stages of one pipeline run; `profile_stage` runs under cProfile"""
+
+    def __init__(self, profile_stage=None, profile_dir=None, log=print):
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir
+        self.log = log
+        self.stages = []
+        self.profile_paths = None
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._cpu = cpu_seconds()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Time the block as stage `name`. The block may set record['rows_out']
+        and record['breakdown'] ({step: seconds}) on the yielded record.
+        """
+        record = {'name': name, 'rows_in': rows_in, 'rows_out': None}
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        peak, child_peak, rss = peak_rss_bytes(), peak_rss_bytes('children'), rss_bytes()
+        cpu = cpu_seconds()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record.update({
+                'wall_seconds': time.perf_counter() - start,
+                'cpu_seconds': cpu_seconds() - cpu,
+                'peak_rss_delta_mb': _mb_delta(peak_rss_bytes(), peak),
+                'peak_child_rss_delta_mb': _mb_delta(peak_rss_bytes('children'), child_peak),
+                'rss_delta_mb': _mb_delta(rss_bytes(), rss),
+            })
+            self.stages.append(record)
+            if profiler:
+                self.profile_paths = self._dump_profile(profiler, name)
+
+    def _dump_profile(self, profiler, name):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        prof_path = os.path.join(self.profile_dir, f'{name}.prof')
+        text_path = os.path.join(self.profile_dir, f'{name}.txt')
+        profiler.dump_stats(prof_path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(text_path, 'w') as f:
+            f.write(summary.getvalue())
+        self.log(f"Profile of stage '{name}' saved to {prof_path} and {text_path}")
+        return {'prof': prof_path, 'summary': text_path}
+
+    def report(self, **run):
+        """The run report: `run` details, totals and every stage in order"""
+        wall = time.perf_counter() - self._start
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            **run,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu_seconds() - self._cpu,
+            'peak_rss_mb': _mb(peak_rss_bytes()),
+            'peak_child_rss_mb': _mb(peak_rss_bytes('children')),
+            'profile': self.profile_paths,
+            'stages': [dict(stage, wall_share=stage['wall_seconds'] / wall if wall else None)
+                       for stage in self.stages],
+        }
+
+    def write_report(self, path, **run):
+        report = self.report(**run)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def summary(self, top=5):
+        """Lines naming the stages with the most wall time"""
+        ranked = sorted(self.stages, key=lambda stage: -stage['wall_seconds'])[:top]
+        return [f"{stage['name']:<20} {stage['wall_seconds']:>8.2f}s wall {stage['cpu_seconds']:>8.2f}s CPU "
+                f"{_format_mb(stage['peak_rss_delta_mb'], '>+8.1f'):>8} MB peak" for stage in ranked]
@@ -0,0 +1,56 @@
+"""
+Publishing pipeline outputs without exposing half-written files.
+
+Outputs are written to a staging path next to their final location and
+swapped in once complete, so a dashboard reading them meanwhile sees the
+previous version, never a partial one.
+
+A run publishes several outputs one after the other (fact store, star
+schema, cube), so after swapping them in it writes a manifest as its last
+step. Readers version the data on the manifest alone: a run still in
+progress leaves it untouched, and the next version appears only once every
+output of the run is in place.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+
+def staging_path(path):
+    return path + '.tmp'
+
+
+def replace_directory(staging, path):
+    """
+    Swap the finished `staging` directory in at `path`.
+
+    The old directory is renamed aside first and removed after the swap, so
+    `path` is missing only between two renames rather than while the old
+    tree is deleted.
+    """
+    retired = path + '.old'
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.isdir(path):
+        os.replace(path, retired)
+    os.replace(staging, path)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def write_manifest(path, **details):
+    """Record a finished run at `path`, replacing the previous manifest atomically"""
+    manifest = {'published': datetime.now().isoformat(timespec='microseconds'), **details}
+    staging = staging_path(path)
+    with open(staging, 'w') as f:
+        json.dump(manifest, f, indent=4, default=str)
+    os.replace(staging, path)
+    return manifest
+
+
+def read_manifest(path):
+    """The manifest at `path`, or None when no run has published one"""
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,124 @@
+"""
+Data quality statistics of the cleaned fact table.
+
+QualityStats collects the figures of data_quality_report.json one chunk at a
+time, and two collectors can be merged, so the report is produced in the same
+single read of the extract that cleans it, even when streaming an extract
+that does not fit in memory. Each chunk is profiled with column-wise
+reductions (one null mask for every column, one pass per measure), and
+medians come from a mergeable quantile sketch whose size is bounded however
+many rows are read.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .quantiles import QuantileSketch, add_counts
+from .sketches import ExactDistinct, hash_ids
+
+NUMERIC_STATS_COLS = ['Revenue', 'Quantity']
+CATEGORICAL_COUNT_COLS = ['Region', 'Category', 'Segment']
+
+
+class QualityStats:
+    """Mergeable collector of the data quality report figures"""
+
+    def __init__(self):
+        self.row_count = 0
+        self.null_counts = {}
+        self.order_ids = ExactDistinct()
+        self.date_min = None
+        self.date_max = None
+        self.numeric = {}
+        self.categorical = {}
+        self.invalid_dates = 0
+        # Undecodable bytes of the raw extract, counted by the reader
+        self.replaced_characters = 0
+
+    def add(self, df):
+        self.row_count += len(df)
+        null_counts = df.isnull().sum()
+        for col, nulls in zip(null_counts.index, null_counts.to_numpy()):
+            self.null_counts[col] = self.null_counts[col] + nulls if col in self.null_counts else nulls
+        self.order_ids.add_hashes(hash_ids(df['OrderID']))
+        self._add_dates(df['Date'].min(), df['Date'].max())
+        # Unparseable dates are NaT after cleaning
+        self.invalid_dates += int(df['Date'].isnull().sum())
+
+        for col in NUMERIC_STATS_COLS:
+            values = df[col]
+            self._add_numeric(col, {
+                'min': values.min(),
+                'max': values.max(),
+                'sum': values.sum(),
+                'count': values.count(),
+                'non_positive': int((values <= 0).sum()),
+                'sketch': QuantileSketch().add(values),
+            })
+        for col in CATEGORICAL_COUNT_COLS:
+            self.categorical[col] = add_counts(self.categorical.get(col), df[col].value_counts(sort=False))
+        return self
+
+    def merge(self, other):
+        self.row_count += other.row_count
+        for col, nulls in other.null_counts.items():
+            self.null_counts[col] = self.null_counts[col] + nulls if col in self.null_counts else nulls
+        self.order_ids.merge(other.order_ids)
+        self._add_dates(other.date_min, other.date_max)
+        self.invalid_dates += other.invalid_dates
+        self.replaced_characters += other.replaced_characters
+        for col, stats in other.numeric.items():
+            self._add_numeric(col, stats)
+        for col, counts in other.categorical.items():
+            self.categorical[col] = add_counts(self.categorical.get(col), counts)
+        return self
+
+    def _add_dates(self, date_min, date_max):
+        if date_min is None or pd.isna(date_min):
+            return
+        self.date_min = date_min if self.date_min is None else min(self.date_min, date_min)
+        self.date_max = date_max if self.date_max is None else max(self.date_max, date_max)
+
+    def _add_numeric(self, col, stats):
+        current = self.numeric.get(col)
+        if current is None:
+            self.numeric[col] = dict(stats)
+            return
+        current['min'] = min(current['min'], stats['min'])
+        current['max'] = max(current['max'], stats['max'])
+        current['sum'] = current['sum'] + stats['sum']
+        current['count'] = current['count'] + stats['count']
+        current['non_positive'] = current['non_positive'] + stats['non_positive']
+        current['sketch'] = current['sketch'].merge(stats['sketch'])
+
+    def report(self):
+        """The data quality report dict (same layout as data_quality_report.json)"""
+        numeric_stats = {}
+        for col in NUMERIC_STATS_COLS:
+            stats = self.numeric[col]
+            numeric_stats[col] = {
+                "min": stats['min'],
+                "max": stats['max'],
+                "mean": stats['sum'] / stats['count'] if stats['count'] else np.nan,
+                "median": stats['sketch'].median()
+            }
+        return {
+            "row_count": self.row_count,
+            "null_counts": dict(self.null_counts),
+            "duplicate_order_ids": np.int64(self.row_count - self.order_ids.count()),
+            "date_range": {
+                "min_date": self.date_min.strftime('%Y-%m-%d'),
+                "max_date": self.date_max.strftime('%Y-%m-%d')
+            },
+            "numeric_stats": numeric_stats,
+            "categorical_counts": {
+                col: self.categorical[col].sort_values(ascending=False, kind='stable').to_dict()
+                for col in CATEGORICAL_COUNT_COLS
+            },
+            "validity_checks": {
+                "invalid_dates": self.invalid_dates,
+                "non_positive_quantity": self.numeric['Quantity']['non_positive'],
+                "non_positive_revenue": self.numeric['Revenue']['non_positive'],
+                "undecodable_characters": self.replaced_characters,
+            }
+        }
@@ -0,0 +1,104 @@
+"""
+Mergeable quantile sketch for streaming medians.
+
+QuantileSketch keeps exact per-value counts while a column has at most
+`exact_limit` distinct values, which covers integer-like columns and modest
+extracts with exact results. Past that it switches to DDSketch-style
+logarithmic buckets: every value is replaced by its bucket's representative,
+which lies within `relative_error` of the value, so the sketch size depends
+on the value range rather than the row count. Bucket counts add up under
+merging, so chunked and whole-file profiling give the same answer.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+
+
+def add_counts(left, right):
+    if left is None:
+        return right
+    return pd.concat([left, right]).groupby(level=0, sort=False).sum()
+
+
+def median_from_counts(counts):
+    """Median of the values described by a value -> count Series"""
+    counts = counts.sort_index()
+    n = counts.sum()
+    if n == 0:
+        return np.nan
+    cumulative = counts.to_numpy().cumsum()
+    values = counts.index.to_numpy(dtype=np.float64)
+    upper = values[np.searchsorted(cumulative, n // 2 + 1)]
+    if n % 2:
+        return upper
+    lower = values[np.searchsorted(cumulative, n // 2)]
+    return (lower + upper) / 2
+
+
+class QuantileSketch:
+    """Exact value counts up to `exact_limit` distinct values, log-bucketed counts beyond"""
+
+    def __init__(self, relative_error=None, exact_limit=None):
+        self.relative_error = relative_error or settings.QUANTILE_RELATIVE_ERROR
+        self.exact_limit = exact_limit or settings.QUANTILE_EXACT_LIMIT
+        self.gamma = (1 + self.relative_error) / (1 - self.relative_error)
+        self.counts = None
+        self.approximate = False
+
+    def _bucket(self, values):
+        """Bucket representative of each value: within relative_error of it, sign kept, 0 stays 0"""
+        values = np.asarray(values, dtype='float64')
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore'):
+            keys = np.ceil(np.log(magnitude) / math.log(self.gamma))
+        representative = 2 * np.power(self.gamma, keys) / (self.gamma + 1)
+        return np.where(magnitude > 0, np.sign(values) * representative, 0.0)
+
+    def _to_buckets(self, counts):
+        return counts.groupby(self._bucket(counts.index), sort=False).sum()
+
+    def _compact(self):
+        if not self.approximate and len(self.counts) > self.exact_limit:
+            self.counts = self._to_buckets(self.counts)
+            self.approximate = True
+
+    def add(self, values):
+        values = pd.Series(values).dropna()
+        if self.approximate:
+            values = pd.Series(self._bucket(values))
+        self.counts = add_counts(self.counts, values.value_counts(sort=False))
+        self._compact()
+        return self
+
+    def remove(self, values):
+        """Take back values previously passed to add(); values not held are ignored"""
+        values = pd.Series(values).dropna()
+        if self.counts is None or values.empty:
+            return self
+        if self.approximate:
+            values = pd.Series(self._bucket(values))
+        counts = self.counts.sub(values.value_counts(sort=False), fill_value=0)
+        self.counts = counts[counts > 0].astype('int64')
+        return self
+
+    def merge(self, other):
+        if other.counts is None:
+            return self
+        counts = other.counts
+        if self.approximate and not other.approximate:
+            counts = self._to_buckets(counts)
+        elif other.approximate and not self.approximate and self.counts is not None:
+            self.counts = self._to_buckets(self.counts)
+        self.approximate = self.approximate or other.approximate
+        self.counts = add_counts(self.counts, counts)
+        self._compact()
+        return self
+
+    def median(self):
+        if self.counts is None:
+            return np.nan
+        return median_from_counts(self.counts)
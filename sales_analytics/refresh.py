@@ -0,0 +1,141 @@
+"""
+Background refresh of the dashboard's in-memory data.
+
+A dashboard process holds one Snapshot: the loaded rows, indexes and cube of
+one version of the processed data. A watcher thread polls the version (a
+fingerprint of the manifest the pipeline writes once all its outputs are in
+place) every REFRESH_INTERVAL_SECONDS. When it
+changes, the new structures are built on the watcher thread while sessions
+keep reading the old snapshot, then the new one is published by a single
+reference swap. A rerun reads the snapshot once and uses it throughout, so it
+never mixes versions and never waits for a reload; only the very first load,
+with nothing to serve yet, runs on the caller's thread.
+
+A new version is loaded once two consecutive polls agree on it, so data
+published without a manifest (fingerprinted file by file) is not picked up
+while a run is still writing it. A build that
+fails leaves the old snapshot in place and is retried when the version
+changes again. While a build runs both versions are held in memory.
+"""
+
+import threading
+import time
+
+from . import settings
+
+
+class Snapshot:
+    """One loaded version of the data; never modified once published"""
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self.loaded_at = time.time()
+
+
+class BackgroundRefresher:
+    """
+    Current Snapshot of a data source, rebuilt on a watcher thread when its
+    version changes.
+
+    `version()` must be cheap; `build(version)` returns everything readers
+    need for that version. With `interval` <= 0 there is no watcher and every
+    current() call checks the version and loads on the caller's thread.
+    """
+
+    def __init__(self, version, build, interval=settings.REFRESH_INTERVAL_SECONDS):
+        self.version = version
+        self.build = build
+        self.interval = interval
+        self._snapshot = None
+        self._pending = None
+        self._failed = None
+        # Held while building, so one version is loaded at a time
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.building = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_check = None
+
+    def current(self):
+        """The published snapshot; the first call loads it and starts the watcher"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    version = self.version()
+                    self._publish(version, self.build(version))
+                self._start()
+            return self._snapshot
+        if self.interval <= 0:
+            self.check(settle=False)
+        return self._snapshot
+
+    def check(self, settle=True):
+        """
+        Poll the version once and load it if it changed; True when a new
+        snapshot was published. With `settle`, a new version is only loaded
+        once a second poll sees it unchanged.
+        """
+        version = self.version()
+        self.last_check = time.time()
+        if self._snapshot is not None and version == self._snapshot.version:
+            self._pending = None
+            return False
+        if version == self._failed or (settle and version != self._pending):
+            self._pending = version
+            return False
+        with self._lock:
+            self.building = version
+            try:
+                data = self.build(version)
+            except Exception as e:
+                self._failed = version
+                self.failures += 1
+                self.last_error = f'{type(e).__name__}: {e}'
+                return False
+            finally:
+                self.building = None
+            self._publish(version, data)
+        return True
+
+    def _publish(self, version, data):
+        # Readers holding the old snapshot keep it until their rerun ends
+        self._snapshot = Snapshot(version, data)
+        self._pending = self._failed = None
+        self.last_error = None
+        self.refreshes += 1
+
+    def _start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='data-refresh', daemon=True)
+            self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # The version itself could not be read (e.g. files being replaced); poll again
+                self.last_error = f'{type(e).__name__}: {e}'
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version if snapshot else None,
+            'loaded_at': snapshot.loaded_at if snapshot else None,
+            'last_check': self.last_check,
+            'building': self.building,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,76 @@
+"""
+Project paths and tunable settings.
+
+Every setting can be overridden with an environment variable of the same name,
+so deployments can point the dashboard at a different data location without
+code changes.
+"""
+
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(name, default):
+    return os.environ.get(name, default)
+
+
+# Processed data locations
+PROCESSED_DATA_DIR = _env('PROCESSED_DATA_DIR', os.path.join(PROJECT_ROOT, 'data', 'processed'))
+FACT_CSV_PATH = _env('FACT_CSV_PATH', os.path.join(PROCESSED_DATA_DIR, 'FactSales_clean.csv'))
+FACT_STORE_PATH = _env('FACT_STORE_PATH', os.path.join(PROCESSED_DATA_DIR, 'FactSales_parquet'))
+CUBE_PATH = _env('CUBE_PATH', os.path.join(PROCESSED_DATA_DIR, 'SalesCube.parquet'))
+# Narrow FactSales with integer keys plus the Dim* tables
+STAR_SCHEMA_PATH = _env('STAR_SCHEMA_PATH', os.path.join(PROCESSED_DATA_DIR, 'star'))
+# Written by the pipeline after all the above; the dashboard versions the data on it
+MANIFEST_PATH = _env('MANIFEST_PATH', os.path.join(PROCESSED_DATA_DIR, 'manifest.json'))
+
+# Distinct-count sketches stored per cube cell: 'exact' or 'hll'
+DISTINCT_SKETCH_MODE = _env('DISTINCT_SKETCH_MODE', 'exact')
+HLL_RELATIVE_ERROR = float(_env('HLL_RELATIVE_ERROR', '0.01'))
+
+# High-water mark and entity totals kept for incremental pipeline runs
+INCREMENTAL_STATE_DIR = _env('INCREMENTAL_STATE_DIR', os.path.join(PROCESSED_DATA_DIR, 'incremental'))
+
+# Memory-mapped copy of the dashboard's fact table, shared by every session
+# and server process on the host (e.g. /dev/shm/sales_analytics)
+SHARED_CACHE_DIR = _env('SHARED_CACHE_DIR', os.path.join(PROCESSED_DATA_DIR, 'cache'))
+
+# Seconds between checks for newly published data; the dashboard loads a new
+# version in the background and swaps it in (0: check and load on each rerun)
+REFRESH_INTERVAL_SECONDS = float(_env('REFRESH_INTERVAL_SECONDS', '5'))
+
+# Memory budget for memoized dashboard panel aggregates (per server process)
+AGG_CACHE_MAX_MB = float(_env('AGG_CACHE_MAX_MB', '64'))
+
+# Most rows sent to the browser by a row-level scatter; larger selections are sampled
+MAX_PLOT_POINTS = int(_env('MAX_PLOT_POINTS', '5000'))
+
+# Detector for order-level revenue anomalies: 'zscore' or 'mad'
+ORDER_ANOMALY_DETECTOR = _env('ORDER_ANOMALY_DETECTOR', 'zscore')
+
+# Formats the pipeline writes the summary tables in (comma-separated):
+# 'parquet', 'feather' and/or 'excel' (Summary_Tables.xlsx)
+EXPORT_FORMATS = _env('EXPORT_FORMATS', 'parquet')
+
+# Quality report medians: exact value counts up to this many distinct values,
+# then log-bucketed counts within this relative error of each value
+QUANTILE_EXACT_LIMIT = int(_env('QUANTILE_EXACT_LIMIT', '100000'))
+QUANTILE_RELATIVE_ERROR = float(_env('QUANTILE_RELATIVE_ERROR', '0.001'))
+
+# Dashboard rerun instrumentation: a sidebar panel of per-stage timings for
+# the current rerun ('1' to show), a JSON lines log of every rerun and a
+# Prometheus text file of p50/p95 latencies over the last RERUN_METRICS_WINDOW
+# reruns (empty paths are not written)
+SHOW_RERUN_TIMINGS = _env('SHOW_RERUN_TIMINGS', '0') == '1'
+RERUN_METRICS_LOG = _env('RERUN_METRICS_LOG', '')
+RERUN_METRICS_PROMETHEUS = _env('RERUN_METRICS_PROMETHEUS', '')
+RERUN_METRICS_WINDOW = int(_env('RERUN_METRICS_WINDOW', '500'))
+
+# Backend answering the dashboard panels: 'pandas' (in-memory rows and cube,
+# the reference) or 'sql' (DuckDB queries pushed down to the fact store)
+QUERY_BACKEND = _env('QUERY_BACKEND', 'pandas')
+
+# JSON file of canonicalization rules for the categorical columns (aliases,
+# case, Unicode form; see standardize.py); empty: strip and title-case
+STANDARDIZATION_RULES = _env('STANDARDIZATION_RULES', '')
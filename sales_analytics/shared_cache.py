@@ -0,0 +1,141 @@
+"""
+Host-wide, read-only cache of the dashboard's fact table.
+
+The first dashboard process that needs a given version of the data writes
+the loaded, compacted frame to an uncompressed Arrow IPC file. Every session
+and every server process on the host then memory-maps that file: column
+buffers come back as read-only views on the mapped pages, so the OS page
+cache holds one copy of the data however many replicas run. Point
+SHARED_CACHE_DIR at /dev/shm to keep the pages in shared memory.
+
+The cache file is named after a fingerprint of the source files (relative
+paths, sizes and modification times) and the loaded columns. When the
+pipeline publishes new data the fingerprint changes, and the next rerun
+maps a freshly written file. Each file's modification time is set to that
+of the source data it was built from, so files are ordered by data version
+rather than by when a process got round to writing them: publishing removes
+the files of older versions and leaves a newer one another process has
+already published in place.
+
+Versions are fingerprinted from whatever paths the caller passes; the
+dashboard passes the pipeline's manifest, a single file written last, so a
+version check is one stat rather than a walk over the fact store.
+"""
+
+import hashlib
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from . import settings
+
+CACHE_PREFIX = 'facts-'
+CACHE_SUFFIX = '.arrow'
+REPORT_METADATA_KEY = b'memory_report'
+
+
+def _source_files(path):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+    elif os.path.exists(path):
+        yield path
+
+
+def fingerprint(paths, extra=()):
+    """Short hash of the files under `paths` (names, sizes, mtimes) and any `extra` values"""
+    digest = hashlib.sha1()
+    for path in paths:
+        for file_path in _source_files(path):
+            stat = os.stat(file_path)
+            digest.update(f'{os.path.relpath(file_path, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    for item in extra:
+        digest.update(f'{item}\n'.encode())
+    return digest.hexdigest()[:16]
+
+
+def source_mtime(paths):
+    """Newest modification time (ns) of the files under `paths`, or None when there are none"""
+    times = [os.stat(file_path).st_mtime_ns for path in paths for file_path in _source_files(path)]
+    return max(times, default=None)
+
+
+def cache_path(key, cache_dir=settings.SHARED_CACHE_DIR):
+    return os.path.join(cache_dir, f'{CACHE_PREFIX}{key}{CACHE_SUFFIX}')
+
+
+def publish(df, report, key, cache_dir=settings.SHARED_CACHE_DIR, version_time=None):
+    """
+    Write `df` and its memory report as the cache file for `key`, replacing it
+    atomically. `version_time` (ns, see source_mtime) becomes the file's
+    modification time; cache files with an older one are removed
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[REPORT_METADATA_KEY] = report.to_json(orient='table').encode()
+    table = table.replace_schema_metadata(metadata)
+
+    path = cache_path(key, cache_dir)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with pa.OSFile(temp_path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    if version_time is not None:
+        os.utime(temp_path, ns=(version_time, version_time))
+    os.replace(temp_path, path)
+    _remove_stale(cache_dir, keep=path)
+    return path
+
+
+def _remove_stale(cache_dir, keep):
+    """
+    Remove cache files of versions older than `keep`'s. Newer ones are left
+    alone: another process has already published a later version
+    """
+    kept_mtime = os.stat(keep).st_mtime_ns
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not (name.startswith(CACHE_PREFIX) and name.endswith(CACHE_SUFFIX)) or path == keep:
+            continue
+        try:
+            if os.stat(path).st_mtime_ns < kept_mtime:
+                # Processes still mapping the old file keep their pages until they let go
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def open_cached(key, cache_dir=settings.SHARED_CACHE_DIR):
+    """Memory-mapped (df, report) for `key`, or None when it has not been published yet"""
+    path = cache_path(key, cache_dir)
+    if not os.path.isfile(path):
+        return None
+    table = ipc.open_file(pa.memory_map(path)).read_all()
+    report = pd.read_json(io.StringIO(table.schema.metadata[REPORT_METADATA_KEY].decode()), orient='table')
+    # split_blocks keeps each column a view on its own mapped buffer
+    return table.to_pandas(split_blocks=True), report
+
+
+def load_shared(key, build, cache_dir=settings.SHARED_CACHE_DIR, version_time=None):
+    """
+    Mapped (df, report) for `key`, calling build() and publishing its result
+    the first time the key is seen on this host.
+
+    When the cache directory cannot be written, the built frame is returned
+    unshared.
+    """
+    cached = open_cached(key, cache_dir)
+    if cached is not None:
+        return cached
+    df, report = build()
+    try:
+        publish(df, report, key, cache_dir, version_time)
+    except OSError:
+        return df, report
+    return open_cached(key, cache_dir)
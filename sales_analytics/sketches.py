@@ -0,0 +1,254 @@
+"""
+Mergeable distinct-count sketches.
+
+Distinct counts (orders, customers) cannot be summed across cube cells, but
+they can be merged. Two interchangeable sketch types are provided:
+
+- exact: the sorted set of 64-bit hashes of the IDs. Merging is a set union,
+  so counts are exact (barring a 64-bit hash collision).
+- hll: a HyperLogLog with 2**precision registers. Merging takes the register
+  maximum and the relative error is about 1.04 / sqrt(2**precision), whatever
+  the number of IDs.
+
+Sketches are serialized to bytes with a one-byte type tag, so a cube column
+can be merged without knowing which mode built it. Small HyperLogLogs are
+stored sparsely as (register, rank) pairs. Sketches of different kinds or
+precisions (e.g. a cube built in exact mode refreshed by an hll run) merge
+into a HyperLogLog at the lowest precision involved: exact sets are added to
+it and finer HyperLogLogs are folded down to it.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+
+EXACT = 'exact'
+HLL = 'hll'
+
+_EXACT_TAG = b'E'
+_HLL_DENSE_TAG = b'H'
+_HLL_SPARSE_TAG = b'S'
+
+
+def hash_ids(values):
+    """Stable 64-bit hashes of ID values (categoricals hash each category once)"""
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        category_hashes = pd.util.hash_array(np.asarray(values.categories, dtype=object))
+        return category_hashes[values.codes]
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def precision_for_error(relative_error):
+    """Smallest HyperLogLog precision whose standard error is at most `relative_error`"""
+    precision = math.ceil(2 * math.log2(1.04 / relative_error))
+    return min(max(precision, 4), 18)
+
+
+def _leading_zeros(words):
+    """Count of leading zero bits in each uint64 word"""
+    high = (words >> np.uint64(32)).astype(np.float64)
+    low = (words & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        zeros = np.where(high > 0, 31 - np.floor(np.log2(high)), 63 - np.floor(np.log2(low)))
+    zeros[words == 0] = 64
+    return zeros.astype(np.int64)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes"""
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / empty)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        nonzero = np.flatnonzero(self.registers).astype(np.uint32)
+        header = bytes([self.precision])
+        if len(nonzero) * 5 < len(self.registers):
+            return _HLL_SPARSE_TAG + header + nonzero.tobytes() + self.registers[nonzero].tobytes()
+        return _HLL_DENSE_TAG + header + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        sketch = cls(blob[1])
+        index, rank = _hll_pairs(blob)
+        sketch.registers[index] = rank
+        return sketch
+
+
+class ExactDistinct:
+    """Exact distinct counter holding the sorted unique ID hashes"""
+
+    def __init__(self, hashes=None):
+        if hashes is None:
+            hashes = np.empty(0, dtype=np.uint64)
+        self.hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+
+    def add_hashes(self, hashes):
+        self.hashes = np.union1d(self.hashes, np.asarray(hashes, dtype=np.uint64))
+        return self
+
+    def merge(self, other):
+        self.hashes = np.union1d(self.hashes, other.hashes)
+        return self
+
+    def count(self):
+        return len(self.hashes)
+
+    def to_bytes(self):
+        return _EXACT_TAG + self.hashes.tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        sketch = cls()
+        sketch.hashes = np.frombuffer(blob[1:], dtype=np.uint64)
+        return sketch
+
+
+def _hll_pairs(blob):
+    """(register index, rank) arrays stored in a serialized HyperLogLog"""
+    precision = blob[1]
+    body = blob[2:]
+    if blob[:1] == _HLL_SPARSE_TAG:
+        n = len(body) // 5
+        index = np.frombuffer(body[:4 * n], dtype=np.uint32).astype(np.int64)
+        rank = np.frombuffer(body[4 * n:], dtype=np.uint8)
+        return index, rank
+    return np.arange(1 << precision), np.frombuffer(body, dtype=np.uint8)
+
+
+def new_sketch(mode=None, relative_error=None):
+    mode = mode or settings.DISTINCT_SKETCH_MODE
+    if mode == EXACT:
+        return ExactDistinct()
+    if mode == HLL:
+        return HyperLogLog(precision_for_error(relative_error or settings.HLL_RELATIVE_ERROR))
+    raise ValueError(f"Unknown distinct sketch mode: {mode!r}")
+
+
+def sketch_from_hashes(hashes, mode=None, relative_error=None):
+    return new_sketch(mode, relative_error).add_hashes(hashes)
+
+
+def sketch_groups(hashes, groups, group_count, mode=None, relative_error=None):
+    """Serialized sketch of the hashes of each group id in range(group_count)"""
+    mode = mode or settings.DISTINCT_SKETCH_MODE
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    groups = np.asarray(groups, dtype=np.int64)
+    if mode == EXACT:
+        # One sort by (group, hash) dedupes every group at once
+        order = np.lexsort((hashes, groups))
+        hashes, groups = hashes[order], groups[order]
+        keep = np.ones(len(hashes), dtype=bool)
+        keep[1:] = (hashes[1:] != hashes[:-1]) | (groups[1:] != groups[:-1])
+        hashes, groups = hashes[keep], groups[keep]
+        bounds = np.searchsorted(groups, np.arange(group_count + 1))
+        return [_EXACT_TAG + hashes[bounds[i]:bounds[i + 1]].tobytes() for i in range(group_count)]
+
+    order = np.argsort(groups, kind='stable')
+    bounds = np.searchsorted(groups[order], np.arange(group_count + 1))
+    hashes = hashes[order]
+    return [
+        sketch_from_hashes(hashes[bounds[i]:bounds[i + 1]], mode, relative_error).to_bytes()
+        for i in range(group_count)
+    ]
+
+
+def _fold_pairs(index, rank, precision, target):
+    """
+    (register, rank) pairs of a HyperLogLog at `precision` as registers of
+    one at the lower `target` precision: the index bits dropped from the
+    register number become the leading bits of the ranked hash suffix
+    """
+    keep = rank > 0
+    index, rank = index[keep], rank[keep].astype(np.int64)
+    shift = precision - target
+    if shift == 0:
+        return index, rank
+    low = index & ((1 << shift) - 1)
+    with np.errstate(divide='ignore'):
+        low_rank = shift - np.floor(np.log2(np.maximum(low, 1))).astype(np.int64)
+    return index >> shift, np.where(low > 0, low_rank, rank + shift)
+
+
+def _check_tags(blobs):
+    for blob in blobs:
+        if blob[:1] not in (_EXACT_TAG, _HLL_DENSE_TAG, _HLL_SPARSE_TAG):
+            raise ValueError(f"not a serialized distinct-count sketch (tag {blob[:1]!r})")
+
+
+def merge_blob_groups(blobs, groups, group_count):
+    """Merge serialized sketches by group id: one merged blob per id in range(group_count)"""
+    blobs = list(blobs)
+    groups = np.asarray(groups, dtype=np.int64)
+    if not blobs:
+        return [ExactDistinct().to_bytes()] * group_count
+    _check_tags(blobs)
+    if all(blob[:1] == _EXACT_TAG for blob in blobs):
+        arrays = [np.frombuffer(blob, dtype=np.uint64, offset=1) for blob in blobs]
+        owners = np.repeat(groups, [len(array) for array in arrays])
+        return sketch_groups(np.concatenate(arrays), owners, group_count, EXACT)
+
+    order = np.argsort(groups, kind='stable')
+    bounds = np.searchsorted(groups[order], np.arange(group_count + 1))
+    return [
+        merge_blobs([blobs[j] for j in order[bounds[i]:bounds[i + 1]]]).to_bytes()
+        for i in range(group_count)
+    ]
+
+
+def merge_blobs(blobs):
+    """
+    Merge serialized sketches into one sketch object: exact when every input
+    is exact, else a HyperLogLog at the lowest precision among the inputs
+    """
+    blobs = [blob for blob in blobs if blob is not None]
+    if not blobs:
+        return ExactDistinct()
+    _check_tags(blobs)
+    exact = [np.frombuffer(blob[1:], dtype=np.uint64) for blob in blobs if blob[:1] == _EXACT_TAG]
+    hll = [blob for blob in blobs if blob[:1] != _EXACT_TAG]
+    if not hll:
+        return ExactDistinct(np.concatenate(exact))
+
+    precision = min(blob[1] for blob in hll)
+    merged = HyperLogLog(precision)
+    pairs = [_fold_pairs(*_hll_pairs(blob), blob[1], precision) for blob in hll]
+    index = np.concatenate([p[0] for p in pairs])
+    rank = np.concatenate([p[1] for p in pairs])
+    np.maximum.at(merged.registers, index, rank.astype(np.uint8))
+    for hashes in exact:
+        merged.add_hashes(hashes)
+    return merged
+
+
+def count_blobs(blobs):
+    """Distinct count across serialized sketches"""
+    return merge_blobs(blobs).count()
@@ -0,0 +1,293 @@
+"""
+SQL backend for the dashboard panels, run by DuckDB over the fact store.
+
+Instead of holding the fact table in pandas, every panel is a SQL query
+against the fact data load_fact_table() would read (fact_source()): the
+Parquet store, else the star schema, else the cleaned CSV. The star schema
+is read through a SELECT joining FactSales to its dimensions.
+
+SQLEngine copies that data into a DuckDB table when it is built, once per
+published data version, so a pipeline run rewriting partitions in place or
+not yet published never shows through half-applied. The table is held in
+DuckDB's compressed columnar format and ordered by Date, so the Date
+predicates skip row groups by their min/max, and only the aggregated result
+of a query is returned to Python.
+
+SQLPanels returns the same columns as panels.PandasPanels, which stays the
+reference implementation. duckdb is only needed when QUERY_BACKEND is 'sql'.
+"""
+
+import datetime
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+from .dates import month_start
+from .fact_store import fact_source
+from .panels import CATEGORICAL_SUMMARY, HISTOGRAM_BINS, NUMERIC_COLS, SCATTER_COLS, TOP_N
+from .star_schema import CLEAN_COLUMNS, DIMENSIONS, FACT_FILE, column_sources
+from .time_intelligence import TIME_MEASURES, period_measures
+
+FILTER_DIMENSIONS = ['Region', 'Segment', 'Category']
+MEASURE_SUMS = 'sum(Revenue) AS Revenue, sum(Profit) AS Profit, sum(Quantity) AS Quantity, count(*) AS RowCount'
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _parquet(path):
+    return f'read_parquet({_literal(path)})'
+
+
+def star_schema_sql(path):
+    """
+    SELECT over the star schema at `path` giving the cleaned fact-table
+    columns: FactSales joined to each dimension one of its keys points into
+    """
+    joins = {}
+    columns = []
+    for col, source in column_sources().items():
+        if source is None:
+            continue
+        name, key, dimension_col = source
+        # One join per fact key; the order and ship dates join DimDate separately
+        alias = joins.setdefault(key, (name, f'k{len(joins)}'))[1]
+        columns.append((col, f'{alias}.{_quote(dimension_col)}'))
+    selected = dict(columns)
+    select = ', '.join(f'{selected[col]} AS {_quote(col)}' if col in selected else f'f.{_quote(col)}'
+                       for col in CLEAN_COLUMNS)
+    sql = f'SELECT {select} FROM {_parquet(os.path.join(path, FACT_FILE))} AS f'
+    for key, (name, alias) in joins.items():
+        dimension_key = DIMENSIONS[name][0] if name in DIMENSIONS else 'DateKey'
+        sql += (f' LEFT JOIN {_parquet(os.path.join(path, name + ".parquet"))} AS {alias}'
+                f' ON f.{_quote(key)} = {alias}.{_quote(dimension_key)}')
+    return sql
+
+
+class SQLEngine:
+    """
+    DuckDB snapshot of the fact data; also answers the filter widgets'
+    questions (date bounds, distinct values) like FilterIndex does for
+    in-memory rows.
+    """
+
+    def __init__(self, store_path=settings.FACT_STORE_PATH, csv_path=settings.FACT_CSV_PATH,
+                 star_path=settings.STAR_SCHEMA_PATH):
+        import duckdb
+
+        self._connection = duckdb.connect()
+        self._lock = threading.Lock()
+        self.source = fact_source(store_path, csv_path, star_path)
+        if self.source == store_path:
+            pattern = _literal(os.path.join(store_path, '**', '*.parquet'))
+            view = f'SELECT * FROM read_parquet({pattern}, hive_partitioning = true)'
+        elif self.source == star_path:
+            view = star_schema_sql(star_path)
+        else:
+            view = f'SELECT * FROM read_csv({_literal(csv_path)}, header = true)'
+        # A copy, not a view: later changes to the files are not seen until the next engine
+        self._connection.execute(f'CREATE TABLE facts AS SELECT * FROM ({view}) ORDER BY Date')
+        bounds = self.query('SELECT min(Date)::DATE AS first, max(Date)::DATE AS last FROM facts')
+        self._bounds = (bounds['first'][0].date(), bounds['last'][0].date())
+        self._values = {}
+
+    def query(self, sql, params=None):
+        """Result of `sql` as a DataFrame; each call runs on its own cursor, so threads can share the engine"""
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+    def date_bounds(self):
+        return self._bounds
+
+    def values(self, dimension):
+        """Sorted distinct values of a filterable dimension"""
+        if dimension not in self._values:
+            column = _quote(dimension)
+            self._values[dimension] = self.query(
+                f'SELECT DISTINCT {column} AS value FROM facts WHERE {column} IS NOT NULL ORDER BY 1'
+            )['value'].tolist()
+        return self._values[dimension]
+
+
+class SQLPanels:
+    """Panels as pushed-down SQL for one filter state"""
+
+    def __init__(self, engine, date_range=None, selections=None):
+        self.engine = engine
+        self.selections = selections
+        self.where, self.params = self._predicates(date_range, selections)
+
+    @staticmethod
+    def _predicates(date_range, selections):
+        clauses, params = [], []
+        if date_range:
+            start, end = date_range
+            # The table is ordered by Date, so these skip row groups by their min/max
+            clauses.append('Year BETWEEN ? AND ?')
+            params += [start.year, end.year]
+            clauses.append('Date >= ? AND Date < ?')
+            params += [datetime.datetime.combine(start, datetime.time()),
+                       datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time())]
+        for dim, value in (selections or {}).items():
+            if value is not None and value != 'All':
+                clauses.append(f'{_quote(dim)} = ?')
+                params.append(value)
+        return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _query(self, select, group_by=None, order_by=None, limit=None):
+        sql = f'SELECT {select} FROM facts {self.where}'
+        if group_by:
+            sql += f' GROUP BY {group_by}'
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        return self.engine.query(sql, self.params)
+
+    def _rollup(self, by, distinct=()):
+        columns = ', '.join(_quote(col) for col in by)
+        select = f'{columns}, {MEASURE_SUMS}'
+        select += ''.join(f', count(DISTINCT {_quote(col)}) AS {_quote(col)}' for col in distinct)
+        result = self._query(select, group_by=columns, order_by=columns)
+        return result.astype({'Quantity': 'int64', 'RowCount': 'int64'})
+
+    def totals(self):
+        row = self._query(MEASURE_SUMS).iloc[0]
+        return {
+            'Revenue': float(row['Revenue'] or 0.0),
+            'Profit': float(row['Profit'] or 0.0),
+            'Quantity': int(row['Quantity'] or 0),
+            'RowCount': int(row['RowCount']),
+        }
+
+    def orders(self):
+        return int(self._query('count(DISTINCT OrderID) AS n')['n'][0])
+
+    def monthly(self):
+        monthly = self._rollup(['Year', 'Month'])
+        monthly['Date'] = month_start(monthly['Year'], monthly['Month'])
+        return monthly
+
+    def region(self):
+        return self._rollup(['Region'])
+
+    def category(self):
+        return self._rollup(['Category'])
+
+    def subcategory(self):
+        return self._rollup(['Category', 'SubCategory'])
+
+    def segment(self):
+        segments = self._rollup(['Segment'], distinct=['OrderID', 'CustomerID'])
+        segments['Avg_Order_Value'] = segments['Revenue'] / segments['OrderID']
+        return segments
+
+    def quarterly(self):
+        return self._rollup(['Quarter'])
+
+    def correlation(self):
+        pairs = [(a, b) for i, a in enumerate(NUMERIC_COLS) for b in NUMERIC_COLS[i:]]
+        row = self._query(', '.join(f'corr({_quote(a)}, {_quote(b)}) AS "{a}|{b}"' for a, b in pairs)).iloc[0]
+        matrix = pd.DataFrame(index=NUMERIC_COLS, columns=NUMERIC_COLS, dtype='float64')
+        for a, b in pairs:
+            matrix.loc[a, b] = matrix.loc[b, a] = row[f'{a}|{b}']
+        return matrix
+
+    def time_intelligence(self):
+        # Every month for the selected dimensions, whatever the date range
+        where, params = self._predicates(None, self.selections)
+        sums = ', '.join(f'sum({_quote(measure)}) AS {_quote(measure)}' for measure in TIME_MEASURES)
+        monthly = self.engine.query(f'SELECT Year, Month, {sums} FROM facts {where} GROUP BY Year, Month', params)
+        return period_measures(monthly, months=self.engine.date_bounds())
+
+    def profit_bins(self, bins=HISTOGRAM_BINS):
+        bounds = self._query('min(Profit) AS low, max(Profit) AS high, count(Profit) AS n').iloc[0]
+        if not bounds['n']:
+            return pd.DataFrame({'Left': [], 'Right': [], 'Center': [], 'Count': []})
+        low, high = float(bounds['low']), float(bounds['high'])
+        if low == high:
+            # As numpy: a single value gets a unit-wide range around it
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        # The last bin is closed on the right, as in numpy.histogram
+        counts = self.engine.query(
+            f'SELECT least(floor((Profit - ?) * ? / (? - ?))::BIGINT, ?) AS bin, count(*) AS n '
+            f'FROM facts {self.where} {"AND" if self.where else "WHERE"} Profit IS NOT NULL GROUP BY 1',
+            [low, bins, high, low, bins - 1] + self.params
+        )
+        count = np.zeros(bins, dtype='int64')
+        count[counts['bin'].to_numpy(dtype='int64')] = counts['n'].to_numpy()
+        return pd.DataFrame({'Left': edges[:-1], 'Right': edges[1:], 'Center': (edges[:-1] + edges[1:]) / 2,
+                             'Count': count})
+
+    def scatter_points(self, max_points=None, outlier_share=0.1, seed=0):
+        """
+        As downsample.sample_points: the rows most extreme in Revenue or
+        Profit, then a per-Category sample in proportion to category size,
+        ranked inside DuckDB so only the kept rows are returned.
+        """
+        max_points = max_points or settings.MAX_PLOT_POINTS
+        columns = ', '.join(_quote(col) for col in SCATTER_COLS)
+        n_outliers = int(max_points * outlier_share)
+        sql = f'''
+            WITH filtered AS (
+                SELECT {columns}, RowID FROM facts {self.where}
+            ), ranked AS (
+                SELECT *, greatest(abs(percent_rank() OVER (ORDER BY Revenue) - 0.5),
+                                   abs(percent_rank() OVER (ORDER BY Profit) - 0.5)) AS extremity,
+                       count(*) OVER () AS total
+                FROM filtered
+            ), flagged AS (
+                SELECT *, row_number() OVER (ORDER BY extremity DESC, RowID) <= ? AS outlier FROM ranked
+            ), placed AS (
+                SELECT *,
+                       row_number() OVER (PARTITION BY outlier, Category ORDER BY hash(RowID, ?)) AS place,
+                       count(*) OVER (PARTITION BY outlier, Category) AS group_size,
+                       count(*) FILTER (WHERE NOT outlier) OVER () AS rest,
+                       count(DISTINCT Category) FILTER (WHERE NOT outlier) OVER () AS groups
+                FROM flagged
+            )
+            SELECT {columns} FROM placed
+            WHERE total <= ? OR outlier
+               OR place <= least(group_size, 1 + floor(group_size * greatest(? - groups, 0) / rest))
+            ORDER BY RowID
+        '''
+        return self.engine.query(sql, self.params + [n_outliers, seed, max_points, max_points - n_outliers])
+
+    def top_products(self):
+        return self._query('Product, sum(Revenue) AS Revenue, sum(Quantity) AS Quantity, sum(Profit) AS Profit',
+                           group_by='Product', order_by='Revenue DESC, Product', limit=TOP_N)
+
+    def top_customers(self):
+        return self._query('CustomerName, sum(Revenue) AS Revenue, count(DISTINCT OrderID) AS OrderID, '
+                           'sum(Profit) AS Profit',
+                           group_by='CustomerName', order_by='Revenue DESC, CustomerName', limit=TOP_N)
+
+    def numeric_summary(self):
+        stats = {
+            'count': 'count({})', 'mean': 'avg({})', 'std': 'stddev_samp({})', 'min': 'min({})',
+            '25%': 'quantile_cont({}, 0.25)', '50%': 'quantile_cont({}, 0.5)', '75%': 'quantile_cont({}, 0.75)',
+            'max': 'max({})',
+        }
+        row = self._query(', '.join(f'{template.format(_quote(col))}::DOUBLE AS "{col}|{stat}"'
+                                    for col in NUMERIC_COLS for stat, template in stats.items())).iloc[0]
+        return pd.DataFrame({col: [row[f'{col}|{stat}'] for stat in stats] for col in NUMERIC_COLS},
+                            index=list(stats))
+
+    def categorical_summary(self):
+        row = self._query(', '.join(f'count(DISTINCT {_quote(col)}) AS "{label}"'
+                                    for label, col in CATEGORICAL_SUMMARY.items())).iloc[0]
+        return pd.DataFrame({'Unique Count': [int(row[label]) for label in CATEGORICAL_SUMMARY]},
+                            index=list(CATEGORICAL_SUMMARY))
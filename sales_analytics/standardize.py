@@ -0,0 +1,128 @@
+"""
+Canonical spelling of categorical columns.
+
+A categorical column has a handful to a few hundred distinct values however
+many rows it has, so each column is factorized once, the rules run on the
+distinct values only, and the codes are mapped to the canonical values.
+The result is a categorical whose categories are the sorted canonical
+values. Spellings that become equal (' west', 'WEST', an alias) share a
+category.
+
+Rules per column: Unicode normalization form, whitespace stripping and
+collapsing, a case rule and an alias table. Aliases are matched after the
+other rules, so a key is written in any spelling of the value it replaces.
+Rules are read from the JSON file named by STANDARDIZATION_RULES:
+
+    {
+        "*": {"case": "title"},
+        "State": {"aliases": {"Washington DC": "District Of Columbia"}},
+        "ShipMode": {"case": null}
+    }
+
+Column entries override the "*" entry key by key, and "*" overrides the
+defaults (NFC, strip, title case), which give the cleaned values of the
+original str.strip().str.title() pass.
+"""
+
+import json
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+
+CASE_RULES = {
+    'title': str.title,
+    'upper': str.upper,
+    'lower': str.lower,
+    None: None,
+}
+UNICODE_FORMS = ['NFC', 'NFKC', 'NFD', 'NFKD', None]
+_WHITESPACE = re.compile(r'\s+')
+
+
+class CanonicalRules:
+    """How one column's values are spelled canonically"""
+
+    def __init__(self, unicode='NFC', strip=True, collapse_spaces=False, case='title', aliases=None):
+        if unicode not in UNICODE_FORMS:
+            raise ValueError(f"unknown Unicode normalization form {unicode!r}; expected one of {UNICODE_FORMS}")
+        if case not in CASE_RULES:
+            raise ValueError(f"unknown case rule {case!r}; expected one of {list(CASE_RULES)}")
+        self.unicode = unicode
+        self.strip = strip
+        self.collapse_spaces = collapse_spaces
+        self.case = case
+        # Alias keys are matched in their normalized spelling
+        self.aliases = {self.normalize(key): value for key, value in (aliases or {}).items()}
+
+    def normalize(self, value):
+        if not isinstance(value, str):
+            return value
+        if self.unicode:
+            value = unicodedata.normalize(self.unicode, value)
+        if self.collapse_spaces:
+            value = _WHITESPACE.sub(' ', value)
+        if self.strip:
+            value = value.strip()
+        if self.case:
+            value = CASE_RULES[self.case](value)
+        return value
+
+    def canonical(self, value):
+        value = self.normalize(value)
+        return self.aliases.get(value, value)
+
+
+DEFAULT_RULES = CanonicalRules()
+
+
+def parse_rules(config, columns):
+    """{column: CanonicalRules} from a rules mapping ("*" plus per-column entries)"""
+    unknown = sorted(set(config) - set(columns) - {'*'})
+    if unknown:
+        raise ValueError(f"standardization rules for unknown column(s): {', '.join(unknown)}")
+    shared = config.get('*', {})
+    return {col: CanonicalRules(**{**shared, **config.get(col, {})}) for col in columns}
+
+
+@lru_cache(maxsize=None)
+def load_rules(path, columns):
+    """Rules for `columns` from a JSON rules file; the defaults when `path` is empty"""
+    if not path:
+        return {col: DEFAULT_RULES for col in columns}
+    with open(path, encoding='utf-8') as f:
+        return parse_rules(json.load(f), columns)
+
+
+def configured_rules(columns):
+    return load_rules(settings.STANDARDIZATION_RULES, tuple(columns))
+
+
+def standardize_values(values, rules=DEFAULT_RULES):
+    """Canonical categorical of a column, applying `rules` once per distinct value"""
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    canonical = np.array([str(rules.canonical(value)) for value in uniques], dtype=object)
+    categories, remap = np.unique(canonical, return_inverse=True)
+    # Missing values keep code -1, which picks the appended -1
+    codes = np.append(remap, -1)[codes]
+    result = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype='str'))
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def standardize_frame(df, rules):
+    """Standardize each column of `rules` that `df` has, in place"""
+    for col, column_rules in rules.items():
+        if col in df.columns:
+            df[col] = standardize_values(df[col], column_rules)
+    return df
+
+
+def plain_strings(df):
+    """`df` with its categorical columns as strings, the dtype they are stored and shared with"""
+    categorical = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    return df.astype({col: 'str' for col in categorical}) if categorical else df
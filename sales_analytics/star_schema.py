@@ -0,0 +1,302 @@
+"""
+Star schema of the cleaned fact table.
+
+The cleaned CSV repeats every customer, product and place name on each order
+line. The star schema keeps one row per member in DimCustomer, DimProduct
+and DimGeography, and one row per calendar day in DimDate, which has the
+columns of the DimDate table in dax_measures.md. FactSales is left with
+int32 surrogate keys, the order and ship mode, and the measures.
+
+A member's key is its row position in the dimension, so joining a dimension
+column is a take() by key. Members are keyed by all their attribute values
+(some ProductIDs carry two product names), so the joined table reproduces
+the cleaned rows exactly. Keys are stable: a rebuild keeps the members and
+keys of the schema it replaces and appends new members with the next keys,
+and an incremental run keys only its new and changed rows
+(update_star_schema). Dates are keyed as yyyymmdd integers; DimDate spans
+every order and ship date.
+
+StarSchema.load() rebuilds fact-table columns, reading a dimension only when
+one of its columns is asked for. Joined text columns come back as
+categoricals built from the dimension, never as one string per row.
+"""
+
+import calendar
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import settings
+from .dates import date_features, month_start
+from .publish import replace_directory, staging_path
+from .standardize import plain_strings
+
+# Dimension: (surrogate key, member attributes)
+DIMENSIONS = {
+    'DimCustomer': ('CustomerKey', ['CustomerID', 'CustomerName', 'Segment']),
+    'DimProduct': ('ProductKey', ['ProductID', 'Product', 'Category', 'SubCategory']),
+    'DimGeography': ('GeographyKey', ['Country', 'City', 'State', 'PostalCode', 'Region']),
+}
+# Date roles of the fact table and the DimDate key they become
+DATE_KEYS = {'Date': 'DateKey', 'ShipDate': 'ShipDateKey'}
+# Calendar columns of the cleaned rows, served by DimDate for the order date
+DATE_ATTRIBUTES = ['Year', 'Month', 'YearMonth', 'Quarter', 'MonthStart']
+FACT_COLUMNS = ['RowID', 'OrderID', 'DateKey', 'ShipDateKey', 'ShipMode', 'CustomerKey', 'ProductKey',
+                'GeographyKey', 'Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']
+# Columns of the cleaned fact table, in order
+CLEAN_COLUMNS = [
+    'RowID', 'OrderID', 'Date', 'ShipDate', 'ShipMode', 'CustomerID', 'CustomerName', 'Segment', 'Country',
+    'City', 'State', 'PostalCode', 'Region', 'ProductID', 'Category', 'SubCategory', 'Product', 'Revenue',
+    'Quantity', 'Discount', 'Profit', 'Year', 'Month', 'YearMonth', 'Quarter', 'MonthStart', 'UnitPrice',
+]
+FACT_FILE = 'FactSales.parquet'
+MISSING_DATE_KEY = -1
+
+
+def date_keys(dates):
+    """yyyymmdd int32 keys of a datetime Series; MISSING_DATE_KEY where the date is missing"""
+    values = dates.to_numpy().astype('datetime64[D]')
+    missing = np.isnat(values)
+    months = values.astype('datetime64[M]')
+    year = months.astype(np.int64) // 12 + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (values - months).astype(np.int64) + 1
+    keys = year * 10000 + month * 100 + day
+    return np.where(missing, MISSING_DATE_KEY, keys).astype(np.int32)
+
+
+def date_dimension(first, last):
+    """DimDate of dax_measures.md: one row per day from `first` to `last`"""
+    dates = pd.Series(pd.date_range(first, last, freq='D').astype('datetime64[us]'))
+    features = date_features(dates)
+    year, month, quarter = features['Year'], features['Month'], features['Quarter']
+    weekday = dates.dt.dayofweek.to_numpy()  # Monday = 0
+    month_names = np.array(calendar.month_name)[month]
+    month_short = np.array(calendar.month_abbr)[month]
+    # WEEKNUM: week 1 holds January 1st, weeks start on Sunday
+    year_start = month_start(year, 1)
+    jan1_weekday = (pd.Series(year_start).dt.dayofweek.to_numpy() + 1) % 7  # Sunday = 0
+    day_of_year = dates.dt.dayofyear.to_numpy()
+    return pd.DataFrame({
+        'DateKey': date_keys(dates),
+        'Date': dates,
+        'Year': year,
+        'Quarter': quarter,
+        'Month': month,
+        'MonthName': month_names,
+        'MonthShort': month_short,
+        'YearMonth': features['YearMonth'],
+        'YearMonthName': year.astype(str) + '-' + month_short,
+        'WeekNum': ((day_of_year - 1 + jan1_weekday) // 7 + 1).astype(np.int32),
+        # WEEKDAY: Sunday = 1 ... Saturday = 7
+        'DayOfWeek': ((weekday + 1) % 7 + 1).astype(np.int32),
+        'DayName': np.array(calendar.day_name)[weekday],
+        'DayShort': np.array(calendar.day_abbr)[weekday],
+        'IsWeekend': weekday >= 5,
+        'MonthStart': features['MonthStart'],
+        'QuarterStart': month_start(year, (quarter - 1) * 3 + 1),
+        'YearStart': year_start,
+    })
+
+
+def _member_dimension(frames, key, attributes, existing=None):
+    """
+    Dimension of the distinct members in `frames`; members of `existing`
+    keep their keys and the others are appended, in order, with the next ones
+    """
+    members = plain_strings(pd.concat(frames, ignore_index=True)).drop_duplicates()
+    if existing is not None:
+        known = pd.MultiIndex.from_frame(members[attributes]).isin(pd.MultiIndex.from_frame(existing[attributes]))
+        members = members[~known]
+    members = members.sort_values(attributes, na_position='last', ignore_index=True)
+    start = 0 if existing is None else len(existing)
+    members.insert(0, key, np.arange(start, start + len(members), dtype=np.int32))
+    return members if existing is None else pd.concat([existing, members], ignore_index=True)
+
+
+def _dimensions(members, first, last, existing=None):
+    """Member dimensions and DimDate, extending the `existing` ones"""
+    existing = existing or {}
+    dimensions = {name: _member_dimension(members[name], key, cols, existing.get(name))
+                  for name, (key, cols) in DIMENSIONS.items()}
+    if 'DimDate' in existing:
+        first, last = min(first, existing['DimDate']['Date'].min()), max(last, existing['DimDate']['Date'].max())
+    dimensions['DimDate'] = date_dimension(first, last)
+    return dimensions
+
+
+def _lookups(dimensions):
+    return {name: pd.MultiIndex.from_frame(dimensions[name][cols]) for name, (_, cols) in DIMENSIONS.items()}
+
+
+def _read_dimensions(path):
+    """The dimensions of the star schema at `path`, or None when there is none"""
+    if not star_schema_exists(path):
+        return None
+    return {name: pd.read_parquet(os.path.join(path, f'{name}.parquet')) for name in list(DIMENSIONS) + ['DimDate']}
+
+
+def _write_star_schema(path, dimensions, fact_tables):
+    """
+    Write the dimensions and the FactSales tables of `fact_tables` next to
+    `path`, then swap them in; returns the row count of each table
+    """
+    staging = staging_path(path)
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    writer, rows = None, 0
+    try:
+        for table in fact_tables:
+            if writer is None:
+                writer = pq.ParquetWriter(os.path.join(staging, FACT_FILE), table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    for name, dimension in dimensions.items():
+        dimension.to_parquet(os.path.join(staging, f'{name}.parquet'), index=False)
+    replace_directory(staging, path)
+    return {'FactSales': rows, **{name: len(dimension) for name, dimension in dimensions.items()}}
+
+
+def _fact_batch(batch, lookups):
+    fact = {'RowID': batch['RowID'], 'OrderID': batch['OrderID']}
+    for role, key in DATE_KEYS.items():
+        fact[key] = date_keys(batch[role])
+    fact['ShipMode'] = batch['ShipMode']
+    for name, (key, attributes) in DIMENSIONS.items():
+        keys = lookups[name].get_indexer(pd.MultiIndex.from_frame(batch[attributes]))
+        if (keys < 0).any():
+            raise ValueError(f"{name} has no member for some rows; the batches changed between passes")
+        fact[key] = keys.astype(np.int32)
+    for col in ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']:
+        fact[col] = batch[col]
+    return pd.DataFrame(fact)[FACT_COLUMNS]
+
+
+def build_star_schema(read_batches, path=settings.STAR_SCHEMA_PATH):
+    """
+    Write the star schema of the fact rows, replacing any previous one.
+
+    `read_batches(columns)` returns an iterator of DataFrames over all rows
+    with those columns. It is called twice, so memory stays bounded by a
+    batch: once to collect the dimension members and date span, once to
+    key the facts. Members of the previous schema keep their keys. Returns
+    the row count of each table.
+    """
+    attributes = [col for _, cols in DIMENSIONS.values() for col in cols]
+    members = {name: [] for name in DIMENSIONS}
+    first = last = None
+    for batch in read_batches(attributes + list(DATE_KEYS)):
+        for name, (_, cols) in DIMENSIONS.items():
+            members[name].append(batch[cols].drop_duplicates())
+        dates = batch[list(DATE_KEYS)]
+        low, high = dates.min().min(), dates.max().max()
+        first = low if first is None or low < first else first
+        last = high if last is None or high > last else last
+    dimensions = _dimensions(members, first, last, _read_dimensions(path))
+    lookups = _lookups(dimensions)
+    facts = (pa.Table.from_pandas(_fact_batch(batch, lookups), preserve_index=False)
+             for batch in read_batches(CLEAN_COLUMNS))
+    return _write_star_schema(path, dimensions, facts)
+
+
+def update_star_schema(delta, path=settings.STAR_SCHEMA_PATH):
+    """
+    Merge the new and changed cleaned rows `delta` into the star schema.
+
+    Only `delta` is keyed: members it introduces are appended to their
+    dimensions, stored facts with its RowIDs are dropped while FactSales is
+    copied batch by batch, and its keyed rows are appended. Returns the row
+    count of each table.
+    """
+    existing = _read_dimensions(path)
+    if existing is None:
+        raise FileNotFoundError(f"No star schema in {path}; run a full build first")
+    dates = delta[list(DATE_KEYS)]
+    members = {name: [delta[cols]] for name, (_, cols) in DIMENSIONS.items()}
+    dimensions = _dimensions(members, dates.min().min(), dates.max().max(), existing)
+    replaced = pa.array(delta['RowID'].to_numpy())
+
+    def facts():
+        stored = pq.ParquetFile(os.path.join(path, FACT_FILE))
+        for batch in stored.iter_batches():
+            yield pa.Table.from_batches([batch]).filter(pc.invert(pc.is_in(batch['RowID'], replaced)))
+        yield pa.Table.from_pandas(_fact_batch(delta, _lookups(dimensions)), preserve_index=False)
+
+    return _write_star_schema(path, dimensions, facts())
+
+
+def star_schema_exists(path=settings.STAR_SCHEMA_PATH):
+    return os.path.isfile(os.path.join(path, FACT_FILE))
+
+
+def column_sources():
+    """Cleaned column -> (dimension, fact key, dimension column), None for columns kept in FactSales"""
+    sources = {col: None for col in FACT_COLUMNS}
+    for name, (key, attributes) in DIMENSIONS.items():
+        sources.update({col: (name, key, col) for col in attributes})
+    sources.update({role: ('DimDate', key, 'Date') for role, key in DATE_KEYS.items()})
+    sources.update({col: ('DimDate', 'DateKey', col) for col in DATE_ATTRIBUTES})
+    return sources
+
+
+class StarSchema:
+    """Reads a star schema back as fact-table columns, joining dimensions only as needed"""
+
+    def __init__(self, path=settings.STAR_SCHEMA_PATH):
+        self.path = path
+        self.sources = column_sources()
+        self._dimensions = {}
+
+    def dimension(self, name):
+        if name not in self._dimensions:
+            self._dimensions[name] = pd.read_parquet(os.path.join(self.path, f'{name}.parquet'))
+        return self._dimensions[name]
+
+    def fact(self, columns=None):
+        """FactSales itself: keys and measures"""
+        return pd.read_parquet(os.path.join(self.path, FACT_FILE), columns=columns)
+
+    def _positions(self, name, keys):
+        """Row positions in dimension `name` of the fact keys (-1 for a missing date)"""
+        keys = keys.to_numpy()
+        if name != 'DimDate':
+            return keys
+        calendar_keys = self.dimension(name)['DateKey'].to_numpy()
+        positions = np.searchsorted(calendar_keys, keys)
+        return np.where(keys == MISSING_DATE_KEY, -1, positions)
+
+    def _join(self, name, source, positions):
+        values = self.dimension(name)[source]
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            # Codes of the dimension's few distinct values, taken per row
+            codes, categories = pd.factorize(values, sort=True)
+            return pd.Categorical.from_codes(np.where(positions < 0, -1, codes[positions]), categories)
+        joined = values.to_numpy()[positions]
+        if (positions < 0).any():
+            joined = pd.Series(joined).where(positions >= 0).to_numpy()
+        return joined
+
+    def load(self, columns=None):
+        """Cleaned fact-table `columns` (all if None), in the cleaned table's order"""
+        wanted = [col for col in CLEAN_COLUMNS if columns is None or col in columns]
+        keys = {self.sources[col][1] for col in wanted if self.sources[col] is not None}
+        fact = self.fact([col for col in FACT_COLUMNS if col in keys or (col in wanted and self.sources[col] is None)])
+        positions = {}
+        result = {}
+        for col in wanted:
+            if self.sources[col] is None:
+                result[col] = fact[col]
+                continue
+            name, key, source = self.sources[col]
+            if key not in positions:
+                positions[key] = self._positions(name, fact[key])
+            result[col] = self._join(name, source, positions[key])
+        return pd.DataFrame(result, index=fact.index)
@@ -0,0 +1,167 @@
+"""
+Summary tables and anomaly checks produced by the pipeline.
+
+Everything here works from aggregates rather than fact rows: month,
+time-intelligence and region-quarter tables roll up the sales cube, and the
+customer, product and order tables are entity totals that the incremental
+mode keeps up to date between full runs.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .anomalies import ORDER_DETECTORS, RollingMedianDetector, ZScoreDetector
+from .cube import rollup
+from .standardize import plain_strings
+from .time_intelligence import period_measures
+from .topk import top_k
+
+ORDER_TOTAL_COLS = ['OrderID', 'Date', 'Region', 'Revenue']
+CUSTOMER_TOTAL_COLS = ['CustomerName', 'Revenue', 'OrderCount', 'Profit']
+PRODUCT_KEYS = ['Category', 'SubCategory', 'Product']
+PRODUCT_TOTAL_COLS = PRODUCT_KEYS + ['Revenue', 'Quantity', 'Profit']
+SCORE_COLUMNS = [detector.score_column for detector in ORDER_DETECTORS.values()]
+
+
+def order_totals(df):
+    """Revenue per order with the order's date and region"""
+    return df.groupby('OrderID').agg({
+        'Date': 'first',
+        'Region': 'first',
+        'Revenue': 'sum'
+    }).reset_index()
+
+
+def customer_totals(df):
+    """Revenue, distinct orders and profit per customer (RowCount tracks contributing rows)"""
+    return df.groupby('CustomerName').agg(
+        Revenue=('Revenue', 'sum'),
+        OrderCount=('OrderID', 'nunique'),
+        Profit=('Profit', 'sum'),
+        RowCount=('OrderID', 'size'),
+    ).reset_index()
+
+
+def product_totals(df):
+    """Revenue, quantity and profit per product (RowCount tracks contributing rows)"""
+    return df.groupby(PRODUCT_KEYS, observed=True).agg(
+        Revenue=('Revenue', 'sum'),
+        Quantity=('Quantity', 'sum'),
+        Profit=('Profit', 'sum'),
+        RowCount=('Revenue', 'size'),
+    ).reset_index().pipe(plain_strings)
+
+
+def revenue_by_month(cube):
+    """Monthly revenue, order count and profit (order counts merge the cube's OrderID sketches)"""
+    table = rollup(cube, ['Year', 'Month'], measures=['Revenue', 'Profit'], distinct=['OrderID'])
+    table['YearMonth'] = table['Year'].astype(str) + '-' + table['Month'].astype(str).str.zfill(2)
+    table = table[['YearMonth', 'Revenue', 'OrderID', 'Profit']].rename(columns={'OrderID': 'OrderCount'})
+    table['AvgOrderValue'] = table['Revenue'] / table['OrderCount']
+    return table.sort_values('YearMonth')
+
+
+def time_intelligence_by_month(cube):
+    """Revenue and profit per month with MoM/QoQ/YoY growth and rolling, QTD and YTD totals"""
+    table = period_measures(rollup(cube, ['Year', 'Month'], measures=['Revenue', 'Profit']))
+    table.insert(0, 'YearMonth', table['Date'].dt.strftime('%Y-%m'))
+    return table.drop(columns=['Date'])
+
+
+def revenue_by_region(cube):
+    """Revenue, order count and profit per region and quarter"""
+    table = rollup(cube, ['Region', 'Year', 'Quarter'], measures=['Revenue', 'Profit'], distinct=['OrderID'])
+    table = table[['Region', 'Year', 'Quarter', 'Revenue', 'OrderID', 'Profit']].rename(columns={'OrderID': 'OrderCount'})
+    table['AvgOrderValue'] = table['Revenue'] / table['OrderCount']
+    return table.sort_values(['Year', 'Quarter', 'Revenue'], ascending=[True, True, False])
+
+
+def top_customers(customers, n=20):
+    # Select the leaders first so derived columns are computed for n rows only
+    table = top_k(customers, 'Revenue', n)[CUSTOMER_TOTAL_COLS].copy()
+    table['AvgOrderValue'] = table['Revenue'] / table['OrderCount']
+    return table
+
+
+def top_products(products, n=20):
+    table = top_k(products, 'Revenue', n)[PRODUCT_TOTAL_COLS].copy()
+    table['ProfitMargin'] = (table['Profit'] / table['Revenue']) * 100
+    return table
+
+
+def fit_order_detector(orders, name='zscore', stats=None):
+    """
+    Order-revenue detector from ORDER_DETECTORS fitted on `orders`.
+
+    A z-score detector takes the running moments kept by the incremental
+    state instead of a pass over every order when `stats` is given.
+    """
+    if name == ZScoreDetector.name and stats is not None:
+        return ZScoreDetector(stats=stats)
+    return ORDER_DETECTORS[name]().update(orders['Revenue'])
+
+
+def detect_anomalies(orders, cube, order_detector=None, region_detector=None):
+    """
+    Flag unusual orders and region-quarters.
+
+    Returns (region_quarter_anomalies, order_anomalies). Orders are judged by
+    `order_detector` (default: revenue z-score above 3 over `orders`);
+    region-quarters by `region_detector` (default: revenue more than 50% off
+    the region's 3-quarter rolling median). order_anomalies is None when no
+    order is flagged.
+    """
+    if order_detector is None:
+        order_detector = fit_order_detector(orders)
+    if region_detector is None:
+        region_detector = RollingMedianDetector()
+
+    # Rolling median deviation by region-quarter, all regions in one pass
+    region_quarter_revenue = rollup(cube, ['Region', 'Year', 'Quarter'], measures=['Revenue'])
+    region_quarter_revenue['Region'] = region_quarter_revenue['Region'].astype(str)
+    evaluated = region_detector.evaluate(region_quarter_revenue, 'Region', ['Year', 'Quarter'], 'Revenue')
+    flagged_quarters = evaluated[evaluated['IsAnomaly']]
+
+    if not flagged_quarters.empty:
+        anomalies_df = flagged_quarters[['Region', 'Year', 'Quarter', 'Revenue', 'RollingMedian', 'MedianDeviation']]
+        anomalies_df = anomalies_df.rename(columns={'MedianDeviation': 'DeviationPercentage'})
+        anomalies_df['DeviationPercentage'] = anomalies_df['DeviationPercentage'] * 100  # Convert to percentage
+        anomalies_df['AnomalyType'] = region_detector.anomaly_type
+    else:
+        anomalies_df = pd.DataFrame(columns=['Region', 'Year', 'Quarter', 'Revenue', 'RollingMedian', 'DeviationPercentage', 'AnomalyType'])
+
+    # Order-level anomalies
+    is_anomaly = np.asarray(order_detector.flag(orders['Revenue']))
+    if not is_anomaly.any():
+        return anomalies_df, None
+    order_anomalies = orders.loc[is_anomaly, ['OrderID', 'Date', 'Region', 'Revenue']].copy()
+    order_anomalies[order_detector.score_column] = order_detector.score(order_anomalies['Revenue'])
+    order_anomalies['AnomalyType'] = order_detector.anomaly_type
+    order_anomalies['Year'] = order_anomalies['Date'].dt.year
+    order_anomalies['Quarter'] = order_anomalies['Date'].dt.quarter
+    return anomalies_df, order_anomalies.reset_index(drop=True)
+
+
+def combine_anomalies(anomalies_df, order_anomalies):
+    """Single Anomalies sheet, or None when nothing was flagged"""
+    if order_anomalies is not None:
+        # Scores keep the column of the detector that produced them
+        score_cols = [col for col in SCORE_COLUMNS if col in order_anomalies.columns]
+        order_cols = ['OrderID', 'Region', 'Year', 'Quarter', 'Revenue'] + score_cols + ['AnomalyType']
+        order_anomalies_for_excel = order_anomalies[order_cols].copy()
+        if anomalies_df.empty:
+            return order_anomalies_for_excel
+
+        region_cols = ['Region', 'Year', 'Quarter', 'Revenue', 'RollingMedian', 'DeviationPercentage', 'AnomalyType']
+        region_anomalies_for_excel = anomalies_df[region_cols].copy()
+
+        # Add placeholder columns to make dataframes compatible
+        order_anomalies_for_excel['RollingMedian'] = np.nan
+        order_anomalies_for_excel['DeviationPercentage'] = np.nan
+        region_anomalies_for_excel['OrderID'] = 'N/A'
+        for col in score_cols:
+            region_anomalies_for_excel[col] = np.nan
+        return pd.concat([order_anomalies_for_excel, region_anomalies_for_excel])
+    if not anomalies_df.empty:
+        return anomalies_df
+    return None
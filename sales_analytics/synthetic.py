@@ -0,0 +1,171 @@
+"""
+Synthetic raw extracts shaped like the Superstore sample, for benchmarks.
+
+Rows come out with the raw extract's columns and formats, so they go through
+the real cleaning step and produce the FactSales_clean.csv schema. The
+shape follows the sample: orders have one or more lines (about two on
+average), customers live in one city and segment, and product and customer
+popularity are Zipf-skewed. Customer and product counts grow sub-linearly
+with the row count (about 140k customers and 120k products at 10M rows).
+
+Extracts are generated and written chunk by chunk, so 100M-row files need
+no more memory than one chunk.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dates import RAW_DATE_FORMAT
+
+RAW_COLUMNS = [
+    'Row ID', 'Order ID', 'Order Date', 'Ship Date', 'Ship Mode', 'Customer ID', 'Customer Name',
+    'Segment', 'Country', 'City', 'State', 'Postal Code', 'Region', 'Product ID', 'Category',
+    'Sub-Category', 'Product Name', 'Sales', 'Quantity', 'Discount', 'Profit',
+]
+
+SUBCATEGORIES = {
+    'Furniture': ['Bookcases', 'Chairs', 'Furnishings', 'Tables'],
+    'Office Supplies': ['Appliances', 'Art', 'Binders', 'Envelopes', 'Fasteners', 'Labels', 'Paper',
+                        'Storage', 'Supplies'],
+    'Technology': ['Accessories', 'Copiers', 'Machines', 'Phones'],
+}
+CATEGORY_SHARES = {'Furniture': 0.21, 'Office Supplies': 0.60, 'Technology': 0.19}
+REGIONS = ['West', 'East', 'Central', 'South']
+REGION_SHARES = [0.32, 0.29, 0.23, 0.16]
+SEGMENTS = ['Consumer', 'Corporate', 'Home Office']
+SEGMENT_SHARES = [0.52, 0.30, 0.18]
+SHIP_MODES = ['Standard Class', 'Second Class', 'First Class', 'Same Day']
+SHIP_MODE_SHARES = [0.60, 0.19, 0.16, 0.05]
+SHIP_DAYS = {'Standard Class': (4, 7), 'Second Class': (2, 5), 'First Class': (1, 4), 'Same Day': (0, 1)}
+DISCOUNTS = [0.0, 0.2, 0.7, 0.8, 0.3, 0.4, 0.6, 0.1, 0.5]
+DISCOUNT_SHARES = [0.48, 0.37, 0.04, 0.03, 0.02, 0.02, 0.015, 0.01, 0.015]
+STATES_PER_REGION = 12
+CITIES_PER_STATE = 11
+
+
+def entity_counts(rows):
+    """(customers, products) for an extract of `rows` rows, matching the sample at 10k rows"""
+    scale = max(rows, 1) / 10_000
+    return max(50, int(800 * scale ** 0.75)), max(50, int(1850 * scale ** 0.6))
+
+
+def _zipf_weights(n, exponent, rng):
+    # Popularity ranks are shuffled so IDs do not encode popularity
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+class ExtractGenerator:
+    """Deterministic generator of raw extract chunks for a given total row count"""
+
+    def __init__(self, rows, seed=0, start='2014-01-01', end='2017-12-31'):
+        self.rows = rows
+        self.rng = np.random.default_rng(seed)
+        self.start = pd.Timestamp(start)
+        self.days = (pd.Timestamp(end) - self.start).days + 1
+        self.next_row_id = 1
+        self.next_order = 100000
+        self._build_customers()
+        self._build_products()
+
+    def _build_customers(self):
+        rng = self.rng
+        n, _ = entity_counts(self.rows)
+        self.n_customers = n
+        region = rng.choice(len(REGIONS), n, p=REGION_SHARES)
+        state = region * STATES_PER_REGION + rng.integers(0, STATES_PER_REGION, n)
+        city = state * CITIES_PER_STATE + rng.integers(0, CITIES_PER_STATE, n)
+        self.customers = pd.DataFrame({
+            'Customer ID': [f'CU-{i:06d}' for i in range(n)],
+            'Customer Name': [f'Customer {i}' for i in range(n)],
+            'Segment': np.array(SEGMENTS)[rng.choice(len(SEGMENTS), n, p=SEGMENT_SHARES)],
+            'City': [f'City {c}' for c in city],
+            'State': [f'State {s}' for s in state],
+            'Postal Code': 10000 + city * 7,
+            'Region': np.array(REGIONS)[region],
+        })
+        self.customer_weights = _zipf_weights(n, 0.8, rng)
+
+    def _build_products(self):
+        rng = self.rng
+        _, n = entity_counts(self.rows)
+        categories = list(CATEGORY_SHARES)
+        category = rng.choice(len(categories), n, p=list(CATEGORY_SHARES.values()))
+        subcategory = [SUBCATEGORIES[categories[c]][rng.integers(len(SUBCATEGORIES[categories[c]]))]
+                       for c in category]
+        self.products = pd.DataFrame({
+            'Product ID': [f'{categories[c][:3].upper()}-{s[:2].upper()}-{10000000 + i}'
+                           for i, (c, s) in enumerate(zip(category, subcategory))],
+            'Category': np.array(categories)[category],
+            'Sub-Category': subcategory,
+            'Product Name': [f'{s} Item {i}' for i, s in enumerate(subcategory)],
+        })
+        # Heavy-tailed list prices and per-product margins
+        self.list_price = np.round(rng.lognormal(3.4, 1.3, n), 2) + 0.5
+        self.margin = rng.normal(0.12, 0.12, n)
+        self.product_weights = _zipf_weights(n, 1.1, rng)
+
+    def chunk(self, rows):
+        """The next `rows` rows of the extract, in raw format"""
+        rng = self.rng
+        # Lines per order: geometric, about 2 on average, at most 14
+        lines = np.minimum(rng.geometric(0.5, rows), 14)
+        lines = lines[:np.searchsorted(np.cumsum(lines), rows) + 1]
+        lines[-1] -= lines.sum() - rows
+        n_orders = len(lines)
+
+        order_day = rng.integers(0, self.days, n_orders)
+        order_date = self.start + pd.to_timedelta(order_day, unit='D')
+        ship_mode = rng.choice(len(SHIP_MODES), n_orders, p=SHIP_MODE_SHARES)
+        low = np.array([SHIP_DAYS[mode][0] for mode in SHIP_MODES])[ship_mode]
+        high = np.array([SHIP_DAYS[mode][1] for mode in SHIP_MODES])[ship_mode]
+        ship_date = order_date + pd.to_timedelta(rng.integers(low, high + 1), unit='D')
+        customer = rng.choice(self.n_customers, n_orders, p=self.customer_weights)
+        order_number = self.next_order + np.arange(n_orders)
+        self.next_order += n_orders
+
+        order_of_line = np.repeat(np.arange(n_orders), lines)
+        product = rng.choice(len(self.products), rows, p=self.product_weights)
+        quantity = np.minimum(rng.geometric(0.27, rows), 14)
+        discount = np.array(DISCOUNTS)[rng.choice(len(DISCOUNTS), rows, p=DISCOUNT_SHARES)]
+        sales = np.round(self.list_price[product] * quantity * (1 - discount), 4)
+        profit = np.round(sales * (self.margin[product] - 1.2 * discount + rng.normal(0, 0.05, rows)), 4)
+
+        years = order_date.year.to_numpy()[order_of_line]
+        frame = pd.DataFrame({
+            'Row ID': self.next_row_id + np.arange(rows),
+            'Order ID': [f'CA-{y}-{n}' for y, n in zip(years, order_number[order_of_line])],
+            'Order Date': order_date.strftime(RAW_DATE_FORMAT).to_numpy()[order_of_line],
+            'Ship Date': ship_date.strftime(RAW_DATE_FORMAT).to_numpy()[order_of_line],
+            'Ship Mode': np.array(SHIP_MODES)[ship_mode][order_of_line],
+            'Country': 'United States',
+            'Sales': sales,
+            'Quantity': quantity,
+            'Discount': discount,
+            'Profit': profit,
+        })
+        self.next_row_id += rows
+        customers = self.customers.iloc[customer[order_of_line]].reset_index(drop=True)
+        products = self.products.iloc[product].reset_index(drop=True)
+        frame = pd.concat([frame, customers, products], axis=1)
+        return frame[RAW_COLUMNS]
+
+    def chunks(self, chunk_rows=1_000_000):
+        remaining = self.rows
+        while remaining > 0:
+            rows = min(chunk_rows, remaining)
+            remaining -= rows
+            yield self.chunk(rows)
+
+
+def generate_extract(rows, seed=0):
+    """A whole synthetic raw extract of `rows` rows as one frame"""
+    return pd.concat(ExtractGenerator(rows, seed).chunks(), ignore_index=True)
+
+
+def write_extract(path, rows, seed=0, chunk_rows=1_000_000):
+    """Write a synthetic raw extract CSV of `rows` rows, one chunk in memory at a time"""
+    generator = ExtractGenerator(rows, seed)
+    for i, chunk in enumerate(generator.chunks(chunk_rows)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
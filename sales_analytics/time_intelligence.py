@@ -0,0 +1,99 @@
+"""
+Time-intelligence measures over a dense month dimension.
+
+The measures of dax_measures.md (MoM, QoQ and YoY growth, rolling 3-month,
+YTD and QTD totals) are computed from a monthly rollup of the cube rather
+than from fact rows. The months are first laid out densely, one row per
+calendar month with zeros where nothing was sold, so a prior period is a
+fixed shift (1, 3 or 12 rows) and running totals are cumulative sums; every
+measure is one vectorized pass over a few dozen rows.
+
+As with DAX's DIVIDE(current - prior, prior, 0), growth against a zero prior
+is 0. Growth against a period before the first month is NaN: the prior
+period is unknown rather than empty.
+"""
+
+import numpy as np
+import pandas as pd
+
+TIME_MEASURES = ['Revenue', 'Profit']
+# Rows back to the prior period on a dense month axis
+PERIOD_SHIFTS = {'MoM': ('PrevMonth', 1), 'QoQ': ('PrevQuarter', 3), 'YoY': ('PrevYear', 12)}
+
+
+def _month_numbers(year, month):
+    return (np.asarray(year, dtype=np.int64) - 1970) * 12 + np.asarray(month, dtype=np.int64) - 1
+
+
+def month_span(frame):
+    """First and last month (datetime64[M]) of a frame with Year and Month columns"""
+    months = _month_numbers(frame['Year'], frame['Month'])
+    return months.min().astype('datetime64[M]'), months.max().astype('datetime64[M]')
+
+
+def dense_months(monthly, measures=TIME_MEASURES, months=None):
+    """
+    One row per calendar month from `months` = (first, last) (default: the
+    months in `monthly`), with the `measures` of `monthly` and 0 elsewhere
+    """
+    numbers = _month_numbers(monthly['Year'], monthly['Month'])
+    if months is None:
+        first, last = numbers.min(), numbers.max()
+    else:
+        first, last = (np.datetime64(month, 'M').astype(np.int64) for month in months)
+    axis = np.arange(first, last + 1)
+
+    dense = pd.DataFrame({
+        'Date': axis.astype('datetime64[M]').astype('datetime64[us]'),
+        'Year': (axis // 12 + 1970).astype(np.int32),
+        'Quarter': (axis % 12 // 3 + 1).astype(np.int32),
+        'Month': (axis % 12 + 1).astype(np.int32),
+    })
+    inside = (numbers >= first) & (numbers <= last)
+    positions = numbers[inside] - first
+    for measure in measures:
+        values = np.zeros(len(axis))
+        np.add.at(values, positions, monthly[measure].to_numpy(dtype=np.float64)[inside])
+        dense[measure] = values
+    return dense
+
+
+def growth(current, prior):
+    """(current - prior) / prior; 0 when prior is 0 and NaN when it is unknown"""
+    current, prior = np.asarray(current, dtype=np.float64), np.asarray(prior, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(prior == 0, 0.0, (current - prior) / prior)
+
+
+def period_measures(monthly, measures=TIME_MEASURES, months=None):
+    """
+    Dense monthly table with, for each measure M: M_PrevMonth, M_MoM,
+    M_PrevQuarter, M_QoQ (same month of the prior quarter, as DAX's
+    DATEADD(-1, QUARTER)), M_PrevYear, M_YoY, M_Rolling3M, M_QTD, M_YTD,
+    M_YTD_PrevYear and M_YTD_YoY
+    """
+    table = dense_months(monthly, measures, months)
+    columns = {}
+    for measure in measures:
+        values = table[measure].to_numpy()
+        for label, (prior_name, rows) in PERIOD_SHIFTS.items():
+            prior = table[measure].shift(rows).to_numpy()
+            columns[f'{measure}_{prior_name}'] = prior
+            columns[f'{measure}_{label}'] = growth(values, prior)
+
+        # Running totals: cumulative sums restarted at each quarter and year
+        running = np.cumsum(values)
+        columns[f'{measure}_Rolling3M'] = running - np.concatenate([np.zeros(3), running[:-3]])[:len(running)]
+        columns[f'{measure}_QTD'] = table.groupby(['Year', 'Quarter'])[measure].cumsum().to_numpy()
+        ytd = table.groupby('Year')[measure].cumsum()
+        columns[f'{measure}_YTD'] = ytd.to_numpy()
+        columns[f'{measure}_YTD_PrevYear'] = ytd.shift(12).to_numpy()
+        columns[f'{measure}_YTD_YoY'] = growth(ytd, columns[f'{measure}_YTD_PrevYear'])
+    return pd.concat([table, pd.DataFrame(columns, index=table.index)], axis=1)
+
+
+def as_of(table, day):
+    """The row of a period_measures table for the month containing `day`, or None"""
+    month = np.datetime64(day, 'M').astype('datetime64[us]')
+    rows = table[table['Date'].to_numpy() == month]
+    return rows.iloc[0] if len(rows) else None
@@ -0,0 +1,36 @@
+"""
+Top-K selection over per-entity totals.
+
+The summary tables and dashboard panels need only the leading 10-20 of
+potentially hundreds of thousands of customers or products, so sorting the
+whole entity set is wasted work. top_k() selects the leaders with a linear
+partition and orders only those. Incremental runs select from the
+customer and product totals they keep up to date, the same way.
+
+Ties are broken in favour of the entity seen first, as in
+DataFrame.nlargest(keep='first').
+"""
+
+import numpy as np
+
+
+def top_k_positions(values, k):
+    """Positions of the `k` largest `values`, largest first; NaN ranks last"""
+    values = np.asarray(values, dtype='float64')
+    values = np.where(np.isnan(values), -np.inf, values)
+    if k <= 0 or len(values) == 0:
+        return np.array([], dtype='int64')
+    if k < len(values):
+        # Everything at or above the k-th largest value, ties included
+        threshold = np.partition(values, len(values) - k)[len(values) - k]
+        candidates = np.flatnonzero(values >= threshold)
+    else:
+        candidates = np.arange(len(values))
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order[:k]]
+
+
+def top_k(frame, col, k):
+    """The `k` rows of `frame` with the largest `col`, largest first"""
+    return frame.iloc[top_k_positions(frame[col].to_numpy(dtype='float64', na_value=np.nan), k)]
+
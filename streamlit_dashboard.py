@@ -7,7 +7,22 @@ from plotly.subplots import make_subplots
 import seaborn as sns
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
+import os
 import warnings
+from functools import cached_property
+from sales_analytics.fact_store import fact_source, load_fact_table
+from sales_analytics.schema import compact_frame, summarize_report
+from sales_analytics.filter_index import FilterIndex, sort_by_date
+from sales_analytics.shared_cache import fingerprint, load_shared, source_mtime
+from sales_analytics.agg_cache import AggregationCache, filter_key
+from sales_analytics.instrumentation import RerunMetrics, RerunProfile, stage, stage_table, timed
+from sales_analytics.panels import PandasPanels
+from sales_analytics.time_intelligence import as_of
+from sales_analytics.sql_backend import SQLEngine, SQLPanels
+from sales_analytics.publish import read_manifest
+from sales_analytics.refresh import BackgroundRefresher
+from sales_analytics.cube import CUBE_DIMENSIONS, build_cube, cube_matches, filter_cells, full_months, read_cube
+from sales_analytics import settings
 warnings.filterwarnings('ignore')
 
 # Page configuration
@@ -76,106 +91,172 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load data
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('data/processed/FactSales_clean.csv')
-        # Convert date columns
-        df['Date'] = pd.to_datetime(df['Date'])
-        df['ShipDate'] = pd.to_datetime(df['ShipDate'])
-        df['MonthStart'] = pd.to_datetime(df['MonthStart'])
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return None
+# Columns read by each part of the dashboard; only their union is loaded
+PANEL_COLUMNS = {
+    'filters': ['Date', 'Region', 'Segment', 'Category'],
+    'kpis': ['OrderID', 'Revenue', 'Profit'],
+    'trend': ['Year', 'Month', 'Revenue', 'Profit', 'Quantity'],
+    'regional': ['Region', 'Revenue', 'Profit', 'OrderID'],
+    'category': ['Category', 'SubCategory', 'Revenue', 'Profit', 'Quantity'],
+    'segment': ['Segment', 'Revenue', 'Profit', 'OrderID', 'CustomerID'],
+    'time': ['Year', 'Month', 'Quarter', 'Revenue', 'Profit', 'OrderID'],
+    'profitability': ['Category', 'Revenue', 'Profit', 'Product', 'Quantity'],
+    'top_performers': ['Product', 'CustomerName', 'Revenue', 'Profit', 'Quantity', 'OrderID'],
+    'correlation': ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice'],
+    'summary': ['Region', 'Segment', 'Category', 'SubCategory', 'Product', 'CustomerName'],
+    # Partial months at the edges of a date range are aggregated from rows
+    'cube_edges': CUBE_DIMENSIONS + ['Revenue', 'Profit', 'Quantity', 'Discount', 'UnitPrice', 'OrderID', 'CustomerID'],
+}
+DASHBOARD_COLUMNS = sorted({col for cols in PANEL_COLUMNS.values() for col in cols})
 
-# Main dashboard
-def main():
-    # Header
-    st.markdown('<h1 class="main-header">📊 Sales Analytics Dashboard</h1>', unsafe_allow_html=True)
-    st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">Comprehensive EDA Dashboard for Sales Data Analysis</p>', unsafe_allow_html=True)
-    
-    # Load data
-    df = load_data()
-    if df is None:
-        st.stop()
-    
-    # Sidebar filters
-    st.sidebar.markdown("## 🔍 Filters & Controls")
-    
-    # Date range filter
-    min_date = df['Date'].min().date()
-    max_date = df['Date'].max().date()
-    date_range = st.sidebar.date_input(
-        "Select Date Range",
-        value=(min_date, max_date),
-        min_value=min_date,
-        max_value=max_date
-    )
-    
-    # Region filter
-    regions = ['All'] + sorted(df['Region'].unique().tolist())
-    selected_region = st.sidebar.selectbox("Select Region", regions)
-    
-    # Segment filter
-    segments = ['All'] + sorted(df['Segment'].unique().tolist())
-    selected_segment = st.sidebar.selectbox("Select Customer Segment", segments)
-    
-    # Category filter
-    categories = ['All'] + sorted(df['Category'].unique().tolist())
-    selected_category = st.sidebar.selectbox("Select Product Category", categories)
-    
-    # Apply filters
-    filtered_df = df.copy()
-    
-    if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df['Date'].dt.date >= date_range[0]) & 
-            (filtered_df['Date'].dt.date <= date_range[1])
-        ]
-    
-    if selected_region != 'All':
-        filtered_df = filtered_df[filtered_df['Region'] == selected_region]
-    
-    if selected_segment != 'All':
-        filtered_df = filtered_df[filtered_df['Segment'] == selected_segment]
-    
-    if selected_category != 'All':
-        filtered_df = filtered_df[filtered_df['Category'] == selected_category]
-    
-    # Key Metrics
-    st.markdown('<div class="section-header">📈 Key Performance Indicators</div>', unsafe_allow_html=True)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        total_revenue = filtered_df['Revenue'].sum()
-        st.metric("Total Revenue", f"${total_revenue:,.2f}")
-    
-    with col2:
-        total_orders = filtered_df['OrderID'].nunique()
-        st.metric("Total Orders", f"{total_orders:,}")
-    
-    with col3:
-        avg_order_value = filtered_df.groupby('OrderID')['Revenue'].sum().mean()
-        st.metric("Average Order Value", f"${avg_order_value:,.2f}")
-    
-    with col4:
-        total_profit = filtered_df['Profit'].sum()
-        profit_margin = (total_profit / total_revenue) * 100 if total_revenue > 0 else 0
-        st.metric("Profit Margin", f"{profit_margin:.1f}%")
-    
+def data_sources():
+    """
+    Files the published data is versioned on. The pipeline writes its manifest
+    after every other output, so only the manifest is checked: a run in
+    progress is not picked up until it has finished, and a check is one stat.
+    Without a manifest (e.g. only the cleaned CSV) they are the data files
+    """
+    if os.path.isfile(settings.MANIFEST_PATH):
+        return [settings.MANIFEST_PATH]
+    return [fact_source(), settings.CUBE_PATH]
+
+def data_version():
+    return fingerprint(data_sources(), extra=DASHBOARD_COLUMNS)
+
+def dataset_version():
+    # (rows, cube): both change with every published run
+    version = data_version()
+    return version, fingerprint([], extra=[version, 'cube'])
+
+def build_frame():
+    # Parquet store when the pipeline has written one, else the star schema or the cleaned CSV
+    # Date order lets the filter index answer date ranges with binary search
+    with stage('load_data.read'):
+        df = sort_by_date(load_fact_table(columns=DASHBOARD_COLUMNS))
+    # Categoricals, small ints and float32 measures keep the footprint small
+    with stage('load_data.compact'):
+        return compact_frame(df)
+
+def build_dataset(version):
+    """Rows, filter index and cube of one dataset version; runs on the refresh thread after the first load"""
+    rows_version, cube_version = version
+    # Memory-mapped from the host-wide cache, so sessions and processes share one copy
+    # stamped with the data's mtime, so only cache files of older data are removed
+    df, memory_report = load_shared(rows_version, build_frame, settings.SHARED_CACHE_DIR,
+                                    version_time=source_mtime(data_sources()))
+    # Cube written by the pipeline, unless it was built from other rows than the loaded ones
+    cube = read_cube(settings.CUBE_PATH) if os.path.isfile(settings.CUBE_PATH) else None
+    if cube is None or not cube_matches(cube, df):
+        cube = build_cube(df)
+    manifest = read_manifest(settings.MANIFEST_PATH)
+    return {
+        'df': df,
+        'memory_report': memory_report,
+        'filter_index': FilterIndex(df),
+        'cube': cube,
+        'cube_version': cube_version,
+        'published': manifest['published'] if manifest else None,
+    }
+
+@st.cache_resource
+def load_refresher():
+    # One snapshot per server process, swapped in by its watcher thread when new data is published
+    return BackgroundRefresher(dataset_version, build_dataset)
+
+@st.cache_resource(max_entries=1)
+def load_sql_engine(version):
+    # QUERY_BACKEND=sql: panels query the store through DuckDB, no rows are held in memory
+    return SQLEngine(settings.FACT_STORE_PATH, settings.FACT_CSV_PATH, settings.STAR_SCHEMA_PATH)
+
+@st.cache_resource
+def load_aggregation_cache():
+    # One cache per server process, shared by every session
+    return AggregationCache(max_bytes=int(settings.AGG_CACHE_MAX_MB * 1e6))
+
+@st.cache_resource
+def load_rerun_metrics():
+    # Rerun latencies of every session in this server process
+    return RerunMetrics(settings.RERUN_METRICS_LOG, settings.RERUN_METRICS_PROMETHEUS,
+                        window=settings.RERUN_METRICS_WINDOW)
+
+class FilteredData:
+    """
+    Filtered inputs shared by the dashboard sections.
+
+    Sections ask for named panels (panels.py). With the pandas backend they
+    are answered from cube cells and filtered rows, both built on first use,
+    so a section that needs only one never pays for the other; with the SQL
+    backend each panel is one query against the fact store. Every panel
+    result (and the cells and rows) is
+    memoized in the aggregation cache under (data version, filter state,
+    panel); returning to a filter combination seen before renders from the
+    cache. Cached values are shared, so sections never modify them in place.
+    """
+
+    def __init__(self, df, cube, filter_index, date_range, selections, agg_cache, key, sql_engine=None):
+        self.df = df
+        self.cube = cube
+        self.filter_index = filter_index
+        self.date_range = date_range
+        self.selections = selections
+        self.agg_cache = agg_cache
+        self.key = key
+        self.sql_engine = sql_engine
+
+    def cached(self, panel, compute):
+        # Lookups and computations count as the current stage's compute time
+        with timed('compute') as outcome:
+            missed = []
+
+            def compute_and_note():
+                missed.append(panel)
+                return compute()
+
+            value = self.agg_cache.get_or_compute(self.key + (panel,), compute_and_note)
+            outcome['hit'] = not missed
+        return value
+
+    @cached_property
+    def cells(self):
+        # Cube cells for the filters answer every additive panel
+        return self.cached('cells', lambda: filter_cells(
+            self.cube, self.df, self.filter_index, date_range=self.date_range, selections=self.selections
+        ))
+
+    @cached_property
+    def history_cells(self):
+        # Cells for the dimension filters over every date: prior periods for growth
+        return self.cached('history_cells', lambda: filter_cells(
+            self.cube, self.df, self.filter_index, selections=self.selections
+        ))
+
+    @cached_property
+    def filtered_df(self):
+        # Posting-list intersections inside the date-sorted block
+        rows = self.cached('rows', lambda: self.filter_index.query(date_range=self.date_range, selections=self.selections))
+        return self.df.iloc[rows]
+
+    @cached_property
+    def panels(self):
+        # Pushed-down SQL over the fact store, or the in-memory reference path
+        if self.sql_engine is not None:
+            return SQLPanels(self.sql_engine, self.date_range, self.selections)
+        return PandasPanels(self)
+
+    def panel(self, name):
+        return self.cached(name, getattr(self.panels, name))
+
+def plotly_chart(fig):
+    # Timed apart from building the figure: this is where it is serialized
+    with timed('serialize'):
+        st.plotly_chart(fig, use_container_width=True)
+
+def render_trend(data):
     # Revenue Trend Analysis
     st.markdown('<div class="section-header">📈 Revenue Trend Analysis</div>', unsafe_allow_html=True)
     
     # Monthly revenue trend
-    monthly_revenue = filtered_df.groupby(['Year', 'Month']).agg({
-        'Revenue': 'sum',
-        'Profit': 'sum',
-        'Quantity': 'sum'
-    }).reset_index()
-    monthly_revenue['Date'] = pd.to_datetime(monthly_revenue[['Year', 'Month']].assign(day=1))
+    monthly_revenue = data.panel('monthly')
     
     fig_trend = px.line(
         monthly_revenue, 
@@ -189,7 +270,33 @@ def main():
         yaxis_title="Revenue ($)",
         hovermode='x unified'
     )
-    st.plotly_chart(fig_trend, use_container_width=True)
+    plotly_chart(fig_trend)
+
+    # Period-over-period growth of the full months in the range; a range
+    # starting or ending mid-month leaves that partial month out
+    periods = data.panel('time_intelligence')
+    if data.date_range:
+        first, last = full_months(data.date_range, data.filter_index.date_bounds())
+        months = periods['Date'].dt.year * 12 + periods['Date'].dt.month - 1
+        periods = periods[(months >= first) & (months <= last)]
+    growth = periods.melt(id_vars='Date', value_vars=['Revenue_MoM', 'Revenue_YoY'],
+                          var_name='Measure', value_name='Growth')
+    growth['Measure'] = growth['Measure'].map({'Revenue_MoM': 'Month over Month',
+                                               'Revenue_YoY': 'Year over Year'})
+    fig_growth = px.line(
+        growth,
+        x='Date',
+        y='Growth',
+        color='Measure',
+        title='Revenue Growth (MoM and YoY)'
+    )
+    fig_growth.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Growth",
+        yaxis_tickformat='.0%',
+        hovermode='x unified'
+    )
+    plotly_chart(fig_growth)
     
     # Insight for revenue trend
     st.markdown("""
@@ -200,7 +307,8 @@ def main():
         • Compare with profit trends to assess profitability consistency
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_regional(data):
     # Regional Analysis
     st.markdown('<div class="section-header">🌍 Regional Performance Analysis</div>', unsafe_allow_html=True)
     
@@ -208,11 +316,7 @@ def main():
     
     with col1:
         # Revenue by region
-        region_revenue = filtered_df.groupby('Region').agg({
-            'Revenue': 'sum',
-            'Profit': 'sum',
-            'OrderID': 'nunique'
-        }).reset_index()
+        region_revenue = data.panel('region')
         
         fig_region = px.pie(
             region_revenue, 
@@ -222,11 +326,11 @@ def main():
             color_discrete_sequence=px.colors.qualitative.Set3
         )
         fig_region.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_region, use_container_width=True)
+        plotly_chart(fig_region)
     
     with col2:
         # Top regions by profit
-        region_profit = filtered_df.groupby('Region')['Profit'].sum().sort_values(ascending=True)
+        region_profit = region_revenue.set_index('Region')['Profit'].sort_values(ascending=True)
         
         fig_profit = px.bar(
             x=region_profit.values,
@@ -241,7 +345,7 @@ def main():
             yaxis_title="Region",
             showlegend=False
         )
-        st.plotly_chart(fig_profit, use_container_width=True)
+        plotly_chart(fig_profit)
     
     # Regional insights
     st.markdown("""
@@ -252,7 +356,8 @@ def main():
         • Consider regional market penetration and growth opportunities
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_category(data):
     # Product Category Analysis
     st.markdown('<div class="section-header">📦 Product Category Performance</div>', unsafe_allow_html=True)
     
@@ -260,10 +365,7 @@ def main():
     
     with col1:
         # Revenue by category
-        category_revenue = filtered_df.groupby('Category').agg({
-            'Revenue': 'sum',
-            'Quantity': 'sum'
-        }).reset_index()
+        category_revenue = data.panel('category')
         
         fig_category = px.bar(
             category_revenue,
@@ -274,14 +376,11 @@ def main():
             color_continuous_scale='Blues'
         )
         fig_category.update_layout(xaxis_tickangle=-45)
-        st.plotly_chart(fig_category, use_container_width=True)
+        plotly_chart(fig_category)
     
     with col2:
         # Subcategory analysis
-        subcategory_analysis = filtered_df.groupby(['Category', 'SubCategory']).agg({
-            'Revenue': 'sum',
-            'Profit': 'sum'
-        }).reset_index()
+        subcategory_analysis = data.panel('subcategory')
         
         fig_subcategory = px.treemap(
             subcategory_analysis,
@@ -291,7 +390,7 @@ def main():
             color='Profit',
             color_continuous_scale='RdYlGn'
         )
-        st.plotly_chart(fig_subcategory, use_container_width=True)
+        plotly_chart(fig_subcategory)
     
     # Category insights
     st.markdown("""
@@ -302,7 +401,8 @@ def main():
         • Focus on high-revenue, high-profit categories for growth strategies
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_segment(data):
     # Customer Segment Analysis
     st.markdown('<div class="section-header">👥 Customer Segment Analysis</div>', unsafe_allow_html=True)
     
@@ -310,13 +410,7 @@ def main():
     
     with col1:
         # Segment performance
-        segment_analysis = filtered_df.groupby('Segment').agg({
-            'Revenue': 'sum',
-            'Profit': 'sum',
-            'OrderID': 'nunique',
-            'CustomerID': 'nunique'
-        }).reset_index()
-        segment_analysis['Avg_Order_Value'] = segment_analysis['Revenue'] / segment_analysis['OrderID']
+        segment_analysis = data.panel('segment')
         
         fig_segment = px.scatter(
             segment_analysis,
@@ -327,11 +421,11 @@ def main():
             title='Segment Performance: Revenue vs Profit',
             hover_data=['CustomerID', 'Avg_Order_Value']
         )
-        st.plotly_chart(fig_segment, use_container_width=True)
+        plotly_chart(fig_segment)
     
     with col2:
         # Customer count by segment
-        customer_count = filtered_df.groupby('Segment')['CustomerID'].nunique().reset_index()
+        customer_count = segment_analysis[['Segment', 'CustomerID']]
         
         fig_customers = px.bar(
             customer_count,
@@ -341,7 +435,7 @@ def main():
             color='CustomerID',
             color_continuous_scale='Oranges'
         )
-        st.plotly_chart(fig_customers, use_container_width=True)
+        plotly_chart(fig_customers)
     
     # Segment insights
     st.markdown("""
@@ -352,7 +446,8 @@ def main():
         • Identify segments with high revenue but low profitability for optimization
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_time(data):
     # Sales Performance by Time
     st.markdown('<div class="section-header">⏰ Time-based Sales Analysis</div>', unsafe_allow_html=True)
     
@@ -360,11 +455,7 @@ def main():
     
     with col1:
         # Quarterly performance
-        quarterly_data = filtered_df.groupby('Quarter').agg({
-            'Revenue': 'sum',
-            'Profit': 'sum',
-            'OrderID': 'nunique'
-        }).reset_index()
+        quarterly_data = data.panel('quarterly')
         
         fig_quarterly = px.bar(
             quarterly_data,
@@ -374,11 +465,11 @@ def main():
             color='Revenue',
             color_continuous_scale='Greens'
         )
-        st.plotly_chart(fig_quarterly, use_container_width=True)
+        plotly_chart(fig_quarterly)
     
     with col2:
         # Monthly heatmap
-        monthly_heatmap = filtered_df.groupby(['Year', 'Month'])['Revenue'].sum().reset_index()
+        monthly_heatmap = data.panel('monthly')[['Year', 'Month', 'Revenue']].copy()
         monthly_heatmap['Month_Name'] = monthly_heatmap['Month'].map({
             1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
             7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
@@ -392,7 +483,7 @@ def main():
             color_continuous_scale='Blues',
             aspect='auto'
         )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        plotly_chart(fig_heatmap)
     
     # Time-based insights
     st.markdown("""
@@ -403,28 +494,35 @@ def main():
         • Darker colors indicate higher revenue periods
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_profitability(data):
     # Profitability Analysis
     st.markdown('<div class="section-header">💰 Profitability Deep Dive</div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # Profit distribution
-        fig_profit_dist = px.histogram(
-            filtered_df,
-            x='Profit',
-            nbins=50,
+        # Profit distribution, binned here so only the 50 bar heights reach the browser
+        profit_bins = data.panel('profit_bins')
+        fig_profit_dist = px.bar(
+            profit_bins,
+            x='Center',
+            y='Count',
             title='Profit Distribution',
-            color_discrete_sequence=['#ff7f0e']
+            color_discrete_sequence=['#ff7f0e'],
+            hover_data={'Left': ':,.2f', 'Right': ':,.2f'}
         )
+        fig_profit_dist.update_traces(width=profit_bins['Right'] - profit_bins['Left'])
+        fig_profit_dist.update_layout(xaxis_title="Profit", yaxis_title="count", bargap=0)
         fig_profit_dist.add_vline(x=0, line_dash="dash", line_color="red", annotation_text="Break-even")
-        st.plotly_chart(fig_profit_dist, use_container_width=True)
+        plotly_chart(fig_profit_dist)
     
     with col2:
-        # Revenue vs Profit scatter
+        # Revenue vs Profit scatter, cut to the render budget: extreme points are
+        # always kept and the rest sampled evenly within each category
+        scatter_points = data.panel('scatter_points')
         fig_rev_profit = px.scatter(
-            filtered_df,
+            scatter_points,
             x='Revenue',
             y='Profit',
             color='Category',
@@ -432,7 +530,11 @@ def main():
             hover_data=['Product', 'Quantity']
         )
         fig_rev_profit.add_hline(y=0, line_dash="dash", line_color="red")
-        st.plotly_chart(fig_rev_profit, use_container_width=True)
+        plotly_chart(fig_rev_profit)
+        total_rows = data.panel('totals')['RowCount']
+        if len(scatter_points) < total_rows:
+            st.caption(f"Showing {len(scatter_points):,} of {total_rows:,} transactions "
+                       "(outliers kept, the rest sampled by category)")
     
     # Profitability insights
     st.markdown("""
@@ -443,7 +545,8 @@ def main():
         • Scatter plot reveals which categories have better profit margins relative to revenue
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_top_performers(data):
     # Top Performers
     st.markdown('<div class="section-header">🏆 Top Performers Analysis</div>', unsafe_allow_html=True)
     
@@ -451,11 +554,7 @@ def main():
     
     with col1:
         # Top products by revenue
-        top_products = filtered_df.groupby('Product').agg({
-            'Revenue': 'sum',
-            'Quantity': 'sum',
-            'Profit': 'sum'
-        }).reset_index().nlargest(10, 'Revenue')
+        top_products = data.panel('top_products')
         
         fig_top_products = px.bar(
             top_products,
@@ -466,15 +565,11 @@ def main():
             color='Profit',
             color_continuous_scale='Viridis'
         )
-        st.plotly_chart(fig_top_products, use_container_width=True)
+        plotly_chart(fig_top_products)
     
     with col2:
         # Top customers by revenue
-        top_customers = filtered_df.groupby('CustomerName').agg({
-            'Revenue': 'sum',
-            'OrderID': 'nunique',
-            'Profit': 'sum'
-        }).reset_index().nlargest(10, 'Revenue')
+        top_customers = data.panel('top_customers')
         
         fig_top_customers = px.bar(
             top_customers,
@@ -485,7 +580,7 @@ def main():
             color='OrderID',
             color_continuous_scale='Plasma'
         )
-        st.plotly_chart(fig_top_customers, use_container_width=True)
+        plotly_chart(fig_top_customers)
     
     # Top performers insights
     st.markdown("""
@@ -496,13 +591,12 @@ def main():
         • Focus on these high-performers for retention and expansion strategies
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_correlation(data):
     # Correlation Analysis
     st.markdown('<div class="section-header">🔗 Correlation Analysis</div>', unsafe_allow_html=True)
     
-    # Select numeric columns for correlation
-    numeric_cols = ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']
-    correlation_data = filtered_df[numeric_cols].corr()
+    correlation_data = data.panel('correlation')
     
     fig_corr = px.imshow(
         correlation_data,
@@ -511,7 +605,7 @@ def main():
         title='Correlation Matrix of Numeric Variables',
         color_continuous_scale='RdBu'
     )
-    st.plotly_chart(fig_corr, use_container_width=True)
+    plotly_chart(fig_corr)
     
     # Correlation insights
     st.markdown("""
@@ -522,7 +616,8 @@ def main():
         • Look for unexpected correlations that might indicate business opportunities
     </div>
     """, unsafe_allow_html=True)
-    
+
+def render_summary(data):
     # Summary Statistics
     st.markdown('<div class="section-header">📊 Summary Statistics</div>', unsafe_allow_html=True)
     
@@ -530,22 +625,185 @@ def main():
     
     with col1:
         st.markdown("### Numeric Summary")
-        numeric_summary = filtered_df[numeric_cols].describe()
+        numeric_summary = data.panel('numeric_summary')
         st.dataframe(numeric_summary, use_container_width=True)
     
     with col2:
         st.markdown("### Categorical Summary")
-        categorical_summary = pd.DataFrame({
-            'Unique Count': [
-                filtered_df['Region'].nunique(),
-                filtered_df['Segment'].nunique(),
-                filtered_df['Category'].nunique(),
-                filtered_df['SubCategory'].nunique(),
-                filtered_df['Product'].nunique(),
-                filtered_df['CustomerName'].nunique()
-            ]
-        }, index=['Regions', 'Segments', 'Categories', 'Subcategories', 'Products', 'Customers'])
+        categorical_summary = data.panel('categorical_summary')
         st.dataframe(categorical_summary, use_container_width=True)
+
+# Dashboard sections, one tab each; only the open tab is computed and rendered
+SECTIONS = {
+    '📈 Revenue Trends': render_trend,
+    '🌍 Regional': render_regional,
+    '📦 Products': render_category,
+    '👥 Segments': render_segment,
+    '⏰ Time': render_time,
+    '💰 Profitability': render_profitability,
+    '🏆 Top Performers': render_top_performers,
+    '🔗 Correlation': render_correlation,
+    '📊 Summary': render_summary,
+}
+
+def show_rerun_timings(rerun, metrics):
+    # Developer panel: where this rerun's time went, and recent percentiles
+    with st.sidebar.expander("⏱️ Rerun Timings", expanded=True):
+        percentiles = metrics.percentiles().get('rerun', {})
+        st.write(f"This rerun: {rerun['seconds'] * 1000:,.0f} ms; "
+                 f"p50 {percentiles.get(0.5, 0) * 1000:,.0f} ms, p95 {percentiles.get(0.95, 0) * 1000:,.0f} ms")
+        st.dataframe(pd.DataFrame(stage_table(rerun)).set_index('Stage').round(1), use_container_width=True)
+        st.caption("Compute: panel aggregations (cache lookups included); Serialize: st.plotly_chart; "
+                   "Other: figure construction and remaining Streamlit calls")
+
+def render_dashboard():
+    # Header
+    st.markdown('<h1 class="main-header">📊 Sales Analytics Dashboard</h1>', unsafe_allow_html=True)
+    st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">Comprehensive EDA Dashboard for Sales Data Analysis</p>', unsafe_allow_html=True)
+    
+    # Load data
+    sql_engine = refresher = None
+    if settings.QUERY_BACKEND == 'sql':
+        # The engine answers the filter widgets too; no rows or cube are loaded
+        with stage('load_indexes'):
+            version = data_version()
+            sql_engine = filter_index = load_sql_engine(version)
+            df = cube = memory_report = None
+            cube_version = fingerprint([], extra=[version, 'sql'])
+            agg_cache = load_aggregation_cache()
+    else:
+        # One snapshot for the whole rerun, even if a newer one is swapped in meanwhile
+        with stage('load_data'):
+            refresher = load_refresher()
+            try:
+                snapshot = refresher.current()
+            except Exception as e:
+                st.error(f"Error loading data: {e}")
+                st.stop()
+            dataset = snapshot.data
+            df, memory_report = dataset['df'], dataset['memory_report']
+        with stage('load_indexes'):
+            filter_index, cube, cube_version = dataset['filter_index'], dataset['cube'], dataset['cube_version']
+            agg_cache = load_aggregation_cache()
+    
+    # Sidebar filters
+    with stage('filters'):
+        st.sidebar.markdown("## 🔍 Filters & Controls")
+    
+        # Date range filter
+        min_date, max_date = filter_index.date_bounds()
+        date_range = st.sidebar.date_input(
+            "Select Date Range",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date
+        )
+    
+        # Region filter
+        regions = ['All'] + filter_index.values('Region')
+        selected_region = st.sidebar.selectbox("Select Region", regions)
+    
+        # Segment filter
+        segments = ['All'] + filter_index.values('Segment')
+        selected_segment = st.sidebar.selectbox("Select Customer Segment", segments)
+    
+        # Category filter
+        categories = ['All'] + filter_index.values('Category')
+        selected_category = st.sidebar.selectbox("Select Product Category", categories)
+
+        # Memory footprint of the compact in-memory table
+        if memory_report is not None:
+            with st.sidebar.expander("🧠 Memory Footprint"):
+                totals = summarize_report(memory_report)
+                st.write(f"{totals['bytes_after'] / 1e6:,.1f} MB resident, "
+                         f"{totals['reduction_factor']:.1f}× smaller than the loaded columns")
+                st.dataframe(memory_report[['DtypeAfter', 'BytesSaved']], use_container_width=True)
+
+        # Version being served; newer data is loaded in the background and swapped in
+        if refresher is not None:
+            status = refresher.status()
+            loaded = f"Data loaded at {datetime.fromtimestamp(status['loaded_at']):%Y-%m-%d %H:%M:%S}"
+            if dataset['published']:
+                loaded += f" (published {datetime.fromisoformat(dataset['published']):%Y-%m-%d %H:%M:%S})"
+            if status['building']:
+                loaded += "; loading newer data in the background"
+            st.sidebar.caption(loaded)
+            if status['last_error']:
+                st.sidebar.warning(f"Newer data could not be loaded ({status['last_error']}); "
+                                   f"showing the previous version")
+
+    # Apply filters: posting-list intersections inside the date-sorted block
+    active_range = date_range if len(date_range) == 2 else None
+    selections = {
+        'Region': selected_region,
+        'Segment': selected_segment,
+        'Category': selected_category,
+    }
+
+    # Filtered cells and the KPI row
+    with stage('kpis'):
+        data = FilteredData(df, cube, filter_index, active_range, selections, agg_cache,
+                            (cube_version, filter_key(active_range, selections, bounds=(min_date, max_date))),
+                            sql_engine)
+        cell_totals = data.panel('totals')
+
+        # Key Metrics
+        st.markdown('<div class="section-header">📈 Key Performance Indicators</div>', unsafe_allow_html=True)
+    
+        col1, col2, col3, col4 = st.columns(4)
+    
+        with col1:
+            total_revenue = cell_totals['Revenue']
+            st.metric("Total Revenue", f"${total_revenue:,.2f}")
+    
+        with col2:
+            total_orders = data.panel('orders')
+            st.metric("Total Orders", f"{total_orders:,}")
+    
+        with col3:
+            # Mean of per-order revenue == total revenue / distinct orders
+            avg_order_value = total_revenue / total_orders if total_orders else 0
+            st.metric("Average Order Value", f"${avg_order_value:,.2f}")
+    
+        with col4:
+            total_profit = cell_totals['Profit']
+            profit_margin = (total_profit / total_revenue) * 100 if total_revenue > 0 else 0
+            st.metric("Profit Margin", f"{profit_margin:.1f}%")
+
+        # Growth as of the last month in the range; growth compares full months
+        as_of_day = active_range[1] if active_range else max_date
+        month = as_of(data.panel('time_intelligence'), as_of_day)
+        if month is not None:
+            st.caption(f"Growth for {month['Date']:%B %Y}, the last month of the date range "
+                       f"(full months, prior periods outside the range included)")
+            growth_metrics = [
+                ("Revenue MoM", month['Revenue_MoM'], month['Revenue'] - month['Revenue_PrevMonth']),
+                ("Revenue QoQ", month['Revenue_QoQ'], month['Revenue'] - month['Revenue_PrevQuarter']),
+                ("Revenue YoY", month['Revenue_YoY'], month['Revenue'] - month['Revenue_PrevYear']),
+                ("Revenue YTD YoY", month['Revenue_YTD_YoY'], month['Revenue_YTD'] - month['Revenue_YTD_PrevYear']),
+            ]
+            for col, (label, rate, change) in zip(st.columns(4), growth_metrics):
+                with col:
+                    if np.isnan(rate):
+                        st.metric(label, "n/a")
+                    else:
+                        st.metric(label, f"{rate:+.1%}", f"{'-' if change < 0 else '+'}${abs(change):,.0f}")
+
+    # Only the selected section's aggregations and figures are built; the
+    # others stay empty until their tab is opened
+    tabs = st.tabs(list(SECTIONS), key='section', on_change='rerun')
+    for (label, render), tab in zip(SECTIONS.items(), tabs):
+        if tab.open:
+            with tab, stage(label):
+                render(data)
+
+    # Aggregation cache counters, after this rerun's lookups
+    with st.sidebar.expander("⚡ Aggregation Cache"):
+        stats = agg_cache.stats()
+        st.write(f"{stats['hits']:,} hits, {stats['misses']:,} misses "
+                 f"({stats['hit_rate']:.0%} hit rate)")
+        st.write(f"{stats['entries']:,} entries, {stats['bytes'] / 1e6:,.1f} of "
+                 f"{settings.AGG_CACHE_MAX_MB:,.0f} MB, {stats['evictions']:,} evictions")
     
     # Footer
     st.markdown("---")
@@ -556,5 +814,17 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+# Main dashboard
+def main():
+    # Each rerun is timed stage by stage and recorded for the latency metrics
+    profile = RerunProfile()
+    with profile.activate():
+        render_dashboard()
+    rerun = profile.finish()
+    metrics = load_rerun_metrics()
+    metrics.record(rerun)
+    if settings.SHOW_RERUN_TIMINGS:
+        show_rerun_timings(rerun, metrics)
+
 if __name__ == "__main__":
     main()
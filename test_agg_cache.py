@@ -0,0 +1,59 @@
+import datetime
+
+import numpy as np
+
+from sales_analytics.agg_cache import AggregationCache, filter_key
+
+
+def test_repeated_state_is_served_from_cache():
+    cache = AggregationCache(max_bytes=10_000)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.arange(10)
+
+    key = ('v1', filter_key(None, {'Region': 'West'}), 'region')
+    first = cache.get_or_compute(key, compute)
+    again = cache.get_or_compute(key, compute)
+    assert again is first
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = AggregationCache(max_bytes=2_500)
+    for panel in ['a', 'b']:
+        cache.get_or_compute(('v1', (), panel), lambda: np.zeros(100))  # 800 bytes each
+    # Touching 'a' makes 'b' the eviction candidate
+    cache.get_or_compute(('v1', (), 'a'), lambda: None)
+    cache.get_or_compute(('v1', (), 'c'), lambda: np.zeros(150))
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 2_500
+    assert isinstance(cache.get_or_compute(('v1', (), 'a'), lambda: 'recomputed'), np.ndarray)
+    assert cache.get_or_compute(('v1', (), 'b'), lambda: 'recomputed') == 'recomputed'
+
+    # Values larger than the whole budget are returned but not kept
+    cache.get_or_compute(('v1', (), 'huge'), lambda: np.zeros(1_000))
+    assert cache.stats()['bytes'] <= 2_500
+
+
+def test_new_data_version_invalidates_older_entries():
+    cache = AggregationCache(max_bytes=10_000)
+    cache.get_or_compute(('v1', (), 'kpis'), lambda: 1)
+    assert cache.get_or_compute(('v2', (), 'kpis'), lambda: 2) == 2
+    assert cache.stats()['entries'] == 1
+    assert cache.get_or_compute(('v1', (), 'kpis'), lambda: 3) == 3
+
+
+def test_filter_key_normalizes_equivalent_states():
+    bounds = (datetime.date(2014, 1, 3), datetime.date(2017, 12, 30))
+    assert filter_key(bounds, {'Region': 'All', 'Segment': 'All'}, bounds) == filter_key(None, {})
+    assert (filter_key(None, {'Segment': 'Consumer', 'Region': 'West'})
+            == filter_key(None, {'Region': 'West', 'Segment': 'Consumer', 'Category': 'All'}))
+    narrowed = (datetime.date(2015, 1, 1), bounds[1])
+    assert filter_key(narrowed, {}, bounds) != filter_key(None, {})
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.anomalies import MADDetector, RunningStats, ZScoreDetector, rolling_group_median
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.cube import build_cube
+from sales_analytics.summaries import combine_anomalies, detect_anomalies, order_totals
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_running_stats_match_pandas_across_batches():
+    revenue = order_totals(read_fact_csv(CSV_PATH))['Revenue']
+    stats = RunningStats()
+    for batch in np.array_split(revenue.to_numpy(), 7):
+        stats.update(batch)
+    assert stats.count == len(revenue)
+    np.testing.assert_allclose([stats.mean, stats.std], [revenue.mean(), revenue.std()], rtol=1e-12)
+
+    # Merging partial streams and taking values back give the same moments
+    merged = RunningStats().update(revenue[:2000]).merge(RunningStats().update(revenue[2000:]))
+    np.testing.assert_allclose([merged.mean, merged.variance], [stats.mean, stats.variance], rtol=1e-12)
+    stats.remove(revenue[:500])
+    np.testing.assert_allclose([stats.mean, stats.std], [revenue[500:].mean(), revenue[500:].std()], rtol=1e-9)
+    restored = RunningStats.from_dict(stats.to_dict())
+    assert (restored.count, restored.mean, restored.m2) == (stats.count, stats.mean, stats.m2)
+
+
+def test_zscore_detector_flags_like_a_full_pass():
+    revenue = order_totals(read_fact_csv(CSV_PATH))['Revenue']
+    detector = ZScoreDetector(threshold=3.0).update(revenue)
+    expected = ((revenue - revenue.mean()) / revenue.std()).abs() > 3.0
+    np.testing.assert_array_equal(detector.flag(revenue), expected.to_numpy())
+
+
+def test_mad_detector_update_and_remove():
+    detector = MADDetector(threshold=3.5).update([1.0, 2.0, 2.0, 3.0, 100.0])
+    assert detector.flag([100.0, 2.5]).tolist() == [True, False]
+    detector.update([2.0, 50.0]).remove([2.0, 50.0, 7.0])
+    assert detector.sketch.counts.sort_index().to_dict() == {1.0: 1, 2.0: 2, 3.0: 1, 100.0: 1}
+
+
+def test_mad_detector_matches_a_full_pass_and_handles_zero_mad():
+    revenue = order_totals(read_fact_csv(CSV_PATH))['Revenue']
+    detector = MADDetector()
+    for batch in np.array_split(revenue.to_numpy(), 7):
+        detector.update(batch)
+    median = revenue.median()
+    expected = 0.6745 * (revenue - median) / (revenue - median).abs().median()
+    np.testing.assert_allclose(detector.score(revenue), expected, rtol=1e-9)
+
+    # Over half the values at the median: the mean absolute deviation stands in
+    skewed = MADDetector().update([5.0, 5.0, 5.0, 5.0, 9.0])
+    np.testing.assert_allclose(skewed.score([5.0, 9.0]), [0.0, 4.0 / (0.8 / 0.7979)])
+    assert MADDetector().update([5.0, 5.0]).score([5.0, 7.0]).tolist() == [0.0, 0.0]
+
+
+def test_anomaly_scores_are_named_after_their_detector():
+    df = read_fact_csv(CSV_PATH)
+    orders, cube = order_totals(df), build_cube(df)
+    for detector in (ZScoreDetector(), MADDetector()):
+        detector.update(orders['Revenue'])
+        _, flagged = detect_anomalies(orders, cube, detector)
+        assert len(flagged) == detector.flag(orders['Revenue']).sum()
+        assert detector.score_column in flagged.columns
+        assert combine_anomalies(pd.DataFrame(columns=['Region']), flagged).columns.tolist() == [
+            'OrderID', 'Region', 'Year', 'Quarter', 'Revenue', detector.score_column, 'AnomalyType']
+
+
+def test_rolling_group_median_matches_pandas():
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame({
+        'Region': np.repeat(['Central', 'East', 'South', 'West'], [16, 16, 3, 1]),
+        'Revenue': rng.gamma(2.0, 1000.0, 36),
+    })
+    expected = table.groupby('Region')['Revenue'].rolling(window=3, min_periods=1).median().to_numpy()
+    codes = pd.factorize(table['Region'])[0]
+    np.testing.assert_allclose(rolling_group_median(table['Revenue'], codes, 3), expected)
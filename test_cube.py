@@ -0,0 +1,82 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from sales_analytics.cube import (
+    build_cube, correlation_matrix, cube_matches, filter_cells, full_months, merge_cubes, rollup
+)
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.filter_index import FilterIndex, sort_by_date
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def _load():
+    df = sort_by_date(read_fact_csv(CSV_PATH))
+    return df, FilterIndex(df), build_cube(df)
+
+
+def test_cube_rollups_match_row_groupbys():
+    """Rolling up the cube over any date range gives the row-level groupby result"""
+    df, index, cube = _load()
+    ranges = [None, index.date_bounds(),
+              (datetime.date(2015, 3, 15), datetime.date(2016, 8, 20)),
+              (datetime.date(2016, 2, 3), datetime.date(2016, 2, 17)),
+              (datetime.date(2016, 2, 3), datetime.date(2016, 3, 17))]
+    for date_range in ranges:
+        for selections in ({}, {'Region': 'West', 'Category': 'Technology'}):
+            cells = filter_cells(cube, df, index, date_range, selections)
+            rows = df.iloc[index.query(date_range, selections)]
+
+            expected = rows.groupby('Region')[['Revenue', 'Profit', 'Quantity']].sum()
+            actual = rollup(cells, 'Region').set_index('Region')[['Revenue', 'Profit', 'Quantity']]
+            actual.index = actual.index.astype(str)
+            pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False)
+            assert cells['RowCount'].sum() == len(rows)
+
+
+def test_cube_correlation_matches_pandas():
+    df, _, cube = _load()
+    columns = ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']
+    assert np.allclose(correlation_matrix(cube, columns), df[columns].corr())
+
+
+def test_cube_distinct_counts_match_nunique():
+    df, index, cube = _load()
+    selections = {'Region': 'West'}
+    date_range = (datetime.date(2015, 3, 15), datetime.date(2016, 8, 20))
+    cells = filter_cells(cube, df, index, date_range, selections)
+    rows = df.iloc[index.query(date_range, selections)]
+
+    actual = rollup(cells, 'Segment', distinct=['OrderID', 'CustomerID']).set_index('Segment')
+    expected = rows.groupby('Segment')[['OrderID', 'CustomerID']].nunique()
+    assert (actual.loc[expected.index, ['OrderID', 'CustomerID']].to_numpy() == expected.to_numpy()).all()
+
+
+def test_correlation_is_stable_at_large_means():
+    """Centred moments merged across cells and cubes keep the correlation of values far from zero"""
+    df, _, _ = _load()
+    columns = ['Revenue', 'Quantity', 'Discount', 'Profit', 'UnitPrice']
+    shifted = df.copy()
+    for col in columns:
+        shifted[col] = df[col].astype('float64') + 1e9
+    cube = merge_cubes([build_cube(shifted.iloc[:3000]), build_cube(shifted.iloc[3000:])])
+    assert np.allclose(correlation_matrix(cube, columns), df[columns].astype('float64').corr(), atol=1e-9)
+
+
+def test_cube_matches_its_rows():
+    df, _, cube = _load()
+    assert cube_matches(cube, df)
+    assert not cube_matches(cube, df.iloc[1:])
+    assert not cube_matches(cube.drop(columns='Mean_Revenue'), df)
+
+
+def test_full_months_leave_out_partial_edge_months():
+    bounds = (datetime.date(2014, 1, 3), datetime.date(2017, 12, 30))
+    mid_month = (datetime.date(2015, 3, 15), datetime.date(2016, 8, 20))
+    assert full_months(mid_month, bounds) == (2015 * 12 + 3, 2016 * 12 + 6)  # April 2015 .. July 2016
+    month_edges = (datetime.date(2015, 3, 1), datetime.date(2016, 8, 31))
+    assert full_months(month_edges, bounds) == (2015 * 12 + 2, 2016 * 12 + 7)
+    # Days before or after the data count as covered, so the default range keeps every month
+    assert full_months(bounds, bounds) == (2014 * 12, 2017 * 12 + 11)
@@ -0,0 +1,26 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from sales_analytics import settings
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_dashboard.py')
+
+
+def rendered_sections(app):
+    return [tab.label for tab in app.tabs if len(tab.children)]
+
+
+def test_only_the_open_section_renders(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'SHARED_CACHE_DIR', str(tmp_path))
+    app = AppTest.from_file(DASHBOARD, default_timeout=120)
+    app.run()
+    assert not app.exception
+    labels = [tab.label for tab in app.tabs]
+    assert rendered_sections(app) == [labels[0]]
+
+    # Selecting another tab renders that section instead
+    app.session_state['section'] = labels[-2]
+    app.run()
+    assert not app.exception
+    assert rendered_sections(app) == [labels[-2]]
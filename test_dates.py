@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.dates import RAW_DATE_FORMAT, date_features, month_start, parse_dates
+
+
+def test_parse_dates_matches_to_datetime():
+    raw = pd.Series(['11/8/2016', '6/12/2016', '11/8/2016', None, '1/3/2014'])
+    parsed = parse_dates(raw, RAW_DATE_FORMAT)
+    pd.testing.assert_series_equal(parsed, pd.to_datetime(raw))
+
+    # Strings in another layout still parse, through format inference
+    pd.testing.assert_series_equal(parse_dates(pd.Series(['2016-11-08']), RAW_DATE_FORMAT),
+                                   pd.to_datetime(pd.Series(['2016-11-08'])))
+    # So do extracts mixing layouts
+    mixed = parse_dates(pd.Series(['11/8/2016', '2016-06-12', None, 'Jan 3, 2014', '11/8/2016']), RAW_DATE_FORMAT)
+    expected = pd.Series(pd.to_datetime(['2016-11-08', '2016-06-12', None, '2014-01-03', '2016-11-08']))
+    pd.testing.assert_series_equal(mixed, expected, check_dtype=False)
+
+
+def test_date_features_match_dt_accessors():
+    dates = pd.to_datetime(pd.Series(['2014-01-03', '2015-03-31', '2016-11-08', '2017-12-30', None]))
+    features = date_features(dates)
+    pd.testing.assert_series_equal(features['Year'], dates.dt.year, check_names=False)
+    pd.testing.assert_series_equal(features['Month'], dates.dt.month, check_names=False)
+    pd.testing.assert_series_equal(features['Quarter'], dates.dt.quarter, check_names=False)
+    pd.testing.assert_series_equal(features['YearMonth'], dates.dt.strftime('%Y-%m'), check_names=False)
+    pd.testing.assert_series_equal(features['MonthStart'], dates.dt.to_period('M').dt.to_timestamp(),
+                                   check_names=False)
+
+    complete = date_features(dates.dropna())
+    assert complete['Year'].dtype == np.int32
+    assert complete['YearMonth'].tolist() == ['2014-01', '2015-03', '2016-11', '2017-12']
+
+
+def test_month_start():
+    starts = month_start([2014, 2017], [1, 12])
+    assert list(pd.DatetimeIndex(starts)) == [pd.Timestamp('2014-01-01'), pd.Timestamp('2017-12-01')]
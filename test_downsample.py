@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.downsample import histogram_bins, sample_points
+from sales_analytics.fact_store import read_fact_csv
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_histogram_bins_match_numpy():
+    profit = read_fact_csv(CSV_PATH, columns=['Profit'])['Profit']
+    bins = histogram_bins(profit, bins=50)
+    counts, edges = np.histogram(profit, bins=50)
+    assert len(bins) == 50
+    assert bins['Count'].sum() == len(profit)
+    np.testing.assert_array_equal(bins['Count'], counts)
+    np.testing.assert_allclose(bins['Left'], edges[:-1])
+    assert histogram_bins([np.nan]).empty
+
+
+def test_sample_points_keeps_outliers_and_category_mix():
+    df = read_fact_csv(CSV_PATH, columns=['Revenue', 'Profit', 'Category'])
+    sample = sample_points(df, ['Revenue', 'Profit'], by='Category', max_points=2000)
+
+    assert len(sample) <= 2000
+    assert sample.index.is_monotonic_increasing
+    # The extremes of both axes survive sampling
+    for col in ['Revenue', 'Profit']:
+        assert sample[col].max() == df[col].max()
+        assert sample[col].min() == df[col].min()
+    shares = sample['Category'].value_counts(normalize=True)
+    expected = df['Category'].value_counts(normalize=True)
+    pd.testing.assert_series_equal(shares.sort_index(), expected.sort_index(), atol=0.03)
+
+    # Under the budget nothing is dropped, and sampling is repeatable
+    assert sample_points(df, ['Revenue'], max_points=len(df)) is df
+    pd.testing.assert_frame_equal(sample, sample_points(df, ['Revenue', 'Profit'], by='Category', max_points=2000))
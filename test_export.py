@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from sales_analytics.export import export_tables
+from sales_analytics.fact_store import read_fact_csv
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def _tables():
+    sample = read_fact_csv(CSV_PATH).head(200)
+    anomalies = pd.DataFrame({'OrderID': ['CA-2017-1', 'US-2016-7'], 'Revenue': [5000.0, 120.5], 'ZScore': [4.2, None]})
+    return {'Anomalies': anomalies, 'FactSales_clean_sample': sample}
+
+
+def test_every_target_writes_the_same_tables(tmp_path):
+    tables = _tables()
+    xlsx = tmp_path / 'Summary_Tables.xlsx'
+    timings = export_tables(tables, {'parquet': str(tmp_path), 'feather': str(tmp_path), 'excel': str(xlsx)},
+                            log=lambda message: None)
+    assert set(timings) == {'parquet', 'feather', 'excel'}
+
+    sheets = pd.read_excel(xlsx, sheet_name=None)
+    assert list(sheets) == list(tables)
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / f'{name}.parquet'), table)
+        pd.testing.assert_frame_equal(pd.read_feather(tmp_path / f'{name}.feather'), table)
+        pd.testing.assert_frame_equal(sheets[name], table, check_dtype=False)
+
+
+def test_failed_target_is_raised_after_the_others(tmp_path):
+    blocker = tmp_path / 'not_a_dir'
+    blocker.write_text('')
+    with pytest.raises(OSError):
+        export_tables(_tables(), {'parquet': str(blocker), 'feather': str(tmp_path)}, log=lambda message: None)
+    assert (tmp_path / 'Anomalies.feather').exists()
+
+
+def test_tables_missing_from_an_export_leave_no_stale_files(tmp_path):
+    targets = {'parquet': str(tmp_path), 'feather': str(tmp_path)}
+    export_tables(_tables(), targets, log=lambda message: None)
+    (tmp_path / 'notes.txt').write_text('kept')
+    # A later run without anomalies
+    tables = {'FactSales_clean_sample': _tables()['FactSales_clean_sample']}
+    export_tables(tables, targets, log=lambda message: None)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'FactSales_clean_sample.feather', 'FactSales_clean_sample.parquet', 'notes.txt']
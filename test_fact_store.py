@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from sales_analytics.fact_store import load_fact_table, read_fact_store, write_fact_store
+from sales_analytics.publish import read_manifest, write_manifest
+from sales_analytics.shared_cache import fingerprint
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_fact_store_round_trip(tmp_path):
+    """The Parquet store returns the same typed data as the parsed CSV"""
+    df = load_fact_table(store_path=str(tmp_path / 'missing'), csv_path=CSV_PATH)
+    store_path = str(tmp_path / 'store')
+    write_fact_store(df, store_path)
+
+    restored = read_fact_store(store_path)
+    assert sorted(restored.columns) == sorted(df.columns)
+    assert len(restored) == len(df)
+    assert pd.api.types.is_datetime64_any_dtype(restored['Date'])
+    assert pd.api.types.is_integer_dtype(restored['Year'])
+    assert abs(restored['Revenue'].sum() - df['Revenue'].sum()) < 1e-6
+
+    partitions = {p.name for p in (tmp_path / 'store').iterdir() if p.is_dir()}
+    assert partitions == {f'Year={year}' for year in df['Year'].unique()}
+
+
+def test_fact_store_column_projection(tmp_path):
+    """Only the requested columns are loaded, from either source"""
+    columns = ['Date', 'Region', 'Revenue']
+    from_csv = load_fact_table(columns=columns, store_path=str(tmp_path / 'missing'), csv_path=CSV_PATH)
+    assert sorted(from_csv.columns) == sorted(columns)
+
+    write_fact_store(load_fact_table(store_path=str(tmp_path / 'missing'), csv_path=CSV_PATH), str(tmp_path / 'store'))
+    from_store = load_fact_table(columns=columns, store_path=str(tmp_path / 'store'), csv_path=CSV_PATH)
+    assert sorted(from_store.columns) == sorted(columns)
+    assert pd.api.types.is_datetime64_any_dtype(from_store['Date'])
+
+
+def test_rewriting_the_store_swaps_it_in_whole(tmp_path):
+    """A new store replaces the old one in one step; a failed write leaves the old one untouched"""
+    df = load_fact_table(store_path=str(tmp_path / 'missing'), csv_path=CSV_PATH)
+    store_path = str(tmp_path / 'store')
+    write_fact_store(df, store_path)
+    write_fact_store(df[df['Year'] == 2017], store_path)
+    assert len(read_fact_store(store_path)) == (df['Year'] == 2017).sum()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['store']
+
+    with pytest.raises(KeyError):
+        write_fact_store(df.drop(columns='Region'), store_path)
+    assert len(read_fact_store(store_path)) == (df['Year'] == 2017).sum()
+
+
+def test_version_follows_the_manifest_not_the_outputs(tmp_path):
+    """Outputs rewritten mid-run leave the version alone until the manifest is written"""
+    df = load_fact_table(store_path=str(tmp_path / 'missing'), csv_path=CSV_PATH)
+    store_path, manifest_path = str(tmp_path / 'store'), str(tmp_path / 'manifest.json')
+    write_fact_store(df, store_path)
+    first = write_manifest(manifest_path, mode='full', rows=len(df))
+    version = fingerprint([manifest_path])
+
+    write_fact_store(df[df['Year'] == 2017], store_path)
+    assert fingerprint([manifest_path]) == version
+    second = write_manifest(manifest_path, mode='incremental', rows=int((df['Year'] == 2017).sum()))
+    assert fingerprint([manifest_path]) != version
+    assert read_manifest(manifest_path) == second and second['published'] > first['published']
+    assert read_manifest(str(tmp_path / 'none.json')) is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['manifest.json', 'store']
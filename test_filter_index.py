@@ -0,0 +1,43 @@
+import datetime
+import itertools
+
+import numpy as np
+import pytest
+
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.filter_index import FilterIndex, sort_by_date
+from sales_analytics.schema import compact_frame
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def _mask_filter(df, date_range, region, segment, category):
+    mask = (df['Date'].dt.date >= date_range[0]) & (df['Date'].dt.date <= date_range[1])
+    for col, value in (('Region', region), ('Segment', segment), ('Category', category)):
+        if value != 'All':
+            mask &= df[col] == value
+    return np.flatnonzero(mask.to_numpy())
+
+
+@pytest.mark.parametrize('compact', [False, True], ids=['datetime', 'day_codes'])
+def test_index_matches_boolean_filters(compact):
+    """Every filter combination selects exactly the rows the boolean scan does"""
+    df = sort_by_date(read_fact_csv(CSV_PATH))
+    index = FilterIndex(compact_frame(df)[0] if compact else df)
+
+    date_ranges = [index.date_bounds(), (datetime.date(2015, 3, 15), datetime.date(2016, 8, 20)),
+                   (datetime.date(2017, 12, 30), datetime.date(2017, 12, 30))]
+    regions = ['All'] + index.values('Region')
+    segments = ['All', 'Consumer']
+    categories = ['All'] + index.values('Category')
+
+    for date_range, region, segment, category in itertools.product(date_ranges, regions, segments, categories):
+        rows = index.query(date_range, {'Region': region, 'Segment': segment, 'Category': category})
+        expected = _mask_filter(df, date_range, region, segment, category)
+        assert np.array_equal(np.arange(len(df))[rows], expected)
+
+
+def test_unknown_value_selects_nothing():
+    df = sort_by_date(read_fact_csv(CSV_PATH))
+    rows = FilterIndex(df).query(selections={'Region': 'Atlantis'})
+    assert len(df.iloc[rows]) == 0
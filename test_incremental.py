@@ -0,0 +1,115 @@
+import os
+
+import pandas as pd
+import pytest
+
+from sales_analytics import incremental
+from sales_analytics.cube import build_cube, read_cube, rollup, write_cube
+from sales_analytics.dates import date_features
+from sales_analytics.fact_store import read_fact_csv, read_fact_store, write_fact_store
+from sales_analytics.incremental import apply_increment, increment_pending, save_state
+from sales_analytics.summaries import customer_totals, order_totals, product_totals
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def _full_build(df, tmp_path):
+    paths = {'store_path': str(tmp_path / 'store'), 'cube_path': str(tmp_path / 'cube.parquet'),
+             'state_dir': str(tmp_path / 'state')}
+    write_fact_store(df, paths['store_path'])
+    write_cube(build_cube(df), paths['cube_path'])
+    save_state(paths['state_dir'], df['Date'].max(), order_totals(df), customer_totals(df), product_totals(df))
+    return paths
+
+
+def _sorted(df, keys):
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+def test_increment_matches_full_rebuild(tmp_path):
+    """Appending new rows and a late correction gives the same results as rebuilding"""
+    df = read_fact_csv(CSV_PATH)
+    paths = _full_build(df[df['Date'] < '2017-10-01'], tmp_path)
+
+    updated = df.copy()
+    corrected = updated.index[(updated['Date'] >= '2017-09-25') & (updated['Date'] < '2017-10-01')][0]
+    updated.loc[corrected, 'Revenue'] += 1000
+    updated.loc[corrected, 'Region'] = 'East' if updated.loc[corrected, 'Region'] != 'East' else 'West'
+
+    result = apply_increment(updated, lookback_days=14, log=lambda message: None, **paths)
+    assert result['changed_rows'] == 1
+    assert result['new_rows'] == (df['Date'] >= '2017-10-01').sum()
+
+    _assert_matches_rebuild(result, updated, paths)
+
+    # Re-running with the same input finds nothing to do
+    assert apply_increment(updated, lookback_days=14, log=lambda message: None, **paths) is None
+
+
+def test_row_moved_into_the_window_replaces_its_stored_version(tmp_path):
+    """A stored row re-dated past the high-water mark is a change, not a second copy"""
+    df = read_fact_csv(CSV_PATH)
+    paths = _full_build(df, tmp_path)
+
+    updated = df.copy()
+    moved = updated.index[updated['RowID'] == 1]
+    updated.loc[moved, 'Date'] = pd.Timestamp('2017-12-31')
+    features = date_features(updated.loc[moved, 'Date'])
+    for col in ['Year', 'Month', 'Quarter', 'YearMonth', 'MonthStart']:
+        updated.loc[moved, col] = features[col]
+
+    result = apply_increment(updated, log=lambda message: None, **paths)
+    assert result['changed_rows'] == 1 and result['new_rows'] == 0
+    _assert_matches_rebuild(result, updated, paths)
+
+
+def test_interrupted_increment_forces_a_full_build(tmp_path, monkeypatch):
+    """A failure before the swap leaves every output as it was; one during it leaves the pending marker"""
+    df = read_fact_csv(CSV_PATH)
+    paths = _full_build(df[df['Date'] < '2017-10-01'], tmp_path)
+    stored_files = sorted(os.path.join(root, name) for root, _, files in os.walk(paths['store_path']) for name in files)
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(incremental, 'order_totals', fail)
+    with pytest.raises(OSError):
+        apply_increment(df, log=lambda message: None, **paths)
+    assert sorted(os.path.join(root, name) for root, _, files in os.walk(paths['store_path'])
+                  for name in files) == stored_files
+    assert not increment_pending(paths['state_dir'])
+    monkeypatch.undo()
+
+    # Dying after the store was swapped: the cube and state no longer match it
+    monkeypatch.setattr(incremental, 'write_cube', fail)
+    with pytest.raises(OSError):
+        apply_increment(df, log=lambda message: None, **paths)
+    assert len(read_fact_store(paths['store_path'])) == len(df)
+    assert read_cube(paths['cube_path'])['RowCount'].sum() < len(df)
+    assert increment_pending(paths['state_dir'])
+    with pytest.raises(RuntimeError):
+        apply_increment(df, log=lambda message: None, **paths)
+
+    # A full build's saved state clears it
+    save_state(paths['state_dir'], df['Date'].max(), order_totals(df), customer_totals(df), product_totals(df))
+    assert not increment_pending(paths['state_dir'])
+
+
+def _assert_matches_rebuild(result, updated, paths):
+    store = read_fact_store(paths['store_path'])
+    assert len(store) == len(updated) == store['RowID'].nunique()
+    assert abs(store['Revenue'].sum() - updated['Revenue'].sum()) < 0.01
+
+    expected = build_cube(updated)
+    by = ['Year', 'Month', 'Region']
+    actual_rollup = rollup(result['cube'], by, distinct=['OrderID'])
+    expected_rollup = rollup(expected, by, distinct=['OrderID'])
+    pd.testing.assert_frame_equal(_sorted(actual_rollup, by), _sorted(expected_rollup, by), check_dtype=False)
+
+    pd.testing.assert_frame_equal(_sorted(result['customers'], ['CustomerName']),
+                                  _sorted(customer_totals(updated), ['CustomerName']), check_dtype=False)
+    pd.testing.assert_frame_equal(_sorted(result['products'], ['Product', 'Category', 'SubCategory']),
+                                  _sorted(product_totals(updated), ['Product', 'Category', 'SubCategory']),
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(_sorted(result['orders'], ['OrderID']),
+                                  _sorted(order_totals(updated), ['OrderID']), check_dtype=False)
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from sales_analytics.cube import rollup
+from sales_analytics.fact_store import read_fact_store
+from sales_analytics.ingest import count_replacements, detect_encoding, ingest_extract, update_scaling_report
+
+RAW_PATH = 'data/raw/Sample - Superstore.csv'
+
+
+def _ingest(tmp_path, name, chunksize, workers=1):
+    aggregates, quality, sample, _ = ingest_extract(RAW_PATH, str(tmp_path / f'{name}.csv'), str(tmp_path / name),
+                                                    chunksize=chunksize, workers=workers, log=lambda message: None)
+    return aggregates, quality, sample
+
+
+def _sorted(df, keys):
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+def test_detect_encoding(tmp_path):
+    assert detect_encoding(RAW_PATH) == 'latin1'
+    utf8_path = tmp_path / 'utf8.csv'
+    utf8_path.write_bytes('Name\nCafé\n'.encode('utf-8') * 50000)
+    assert detect_encoding(str(utf8_path), sample_bytes=1000) == 'utf-8'
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_chunked_ingest_matches_whole_file(tmp_path, workers):
+    """Folding chunk aggregates, serially or in a process pool, matches cleaning the file in one piece"""
+    whole, whole_quality, whole_sample = _ingest(tmp_path, 'whole', None)
+    chunked, chunked_quality, chunked_sample = _ingest(tmp_path, 'chunked', 700, workers)
+
+    assert chunked_quality.report() == whole_quality.report()
+    pd.testing.assert_frame_equal(chunked_sample, whole_sample)
+    assert (tmp_path / 'chunked.csv').read_bytes() == (tmp_path / 'whole.csv').read_bytes()
+    assert len(read_fact_store(str(tmp_path / 'chunked'))) == whole_quality.row_count
+
+    by = ['Year', 'Month', 'Region', 'Segment']
+    pd.testing.assert_frame_equal(rollup(chunked.cube(), by, distinct=['OrderID', 'CustomerID']),
+                                  rollup(whole.cube(), by, distinct=['OrderID', 'CustomerID']))
+    pd.testing.assert_frame_equal(chunked.orders(), whole.orders())
+    pd.testing.assert_frame_equal(_sorted(chunked.customers(), ['CustomerName']),
+                                  _sorted(whole.customers(), ['CustomerName']))
+    pd.testing.assert_frame_equal(_sorted(chunked.products(), ['Product', 'Category', 'SubCategory']),
+                                  _sorted(whole.products(), ['Product', 'Category', 'SubCategory']))
+
+
+def test_scaling_report_speedup(tmp_path):
+    path = str(tmp_path / 'scaling.json')
+    run = {'rows': 100, 'chunks': 4, 'chunksize': 25}
+    update_scaling_report(path, RAW_PATH, dict(run, workers=1, wall_seconds=8.0))
+    report = update_scaling_report(path, RAW_PATH, dict(run, workers=4, wall_seconds=2.5))
+    assert list(report['runs']) == ['1', '4']
+    assert report['runs']['4']['speedup'] == 3.2
+    assert report['runs']['4']['efficiency'] == 0.8
+
+
+def test_undecodable_bytes_are_counted(tmp_path):
+    """A byte that is not UTF-8 outside the sampled head and tail is replaced, counted and reported"""
+    text = open(RAW_PATH, encoding='latin1').read().encode('utf-8')
+    middle = text.index(b'\n', len(text) // 2) + 1
+    field = text.index(b',', middle) + 1
+    raw_path = tmp_path / 'raw.csv'
+    raw_path.write_bytes(text[:field] + b'\xff' + text[field + 1:])
+
+    messages = []
+    _, quality, _, _ = ingest_extract(str(raw_path), str(tmp_path / 'clean.csv'), str(tmp_path / 'store'),
+                                      chunksize=3000, log=messages.append)
+    assert detect_encoding(str(raw_path)) == 'utf-8'
+    assert quality.report()['validity_checks']['undecodable_characters'] == 1
+    assert any('U+FFFD' in message for message in messages)
+    assert count_replacements(pd.DataFrame({'Name': ['Caf\ufffd', 'Bob'], 'Sales': [1.0, 2.0]})) == 1
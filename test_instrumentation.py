@@ -0,0 +1,85 @@
+import json
+import sys
+
+import pytest
+
+from sales_analytics import instrumentation
+from sales_analytics.instrumentation import RerunMetrics, RerunProfile, stage, stage_table, timed
+
+
+def test_stages_collect_parts_and_cache_lookups():
+    profile = RerunProfile()
+    with profile.activate():
+        with stage('kpis'):
+            with timed('compute') as outcome:
+                # Nested timing of the same part is not counted twice
+                with timed('compute') as inner:
+                    inner['hit'] = True
+                outcome['hit'] = False
+            with timed('serialize'):
+                pass
+        with stage('kpis'):
+            with timed('compute') as outcome:
+                outcome['hit'] = True
+    rerun = profile.finish()
+
+    kpis = rerun['stages']['kpis']
+    assert (kpis['hits'], kpis['misses']) == (1, 1)
+    assert set(kpis['parts']) == {'compute', 'serialize'}
+    assert kpis['seconds'] >= kpis['parts']['compute'] + kpis['parts']['serialize']
+    assert rerun['seconds'] >= kpis['seconds']
+    row = stage_table(rerun)[0]
+    assert row['Stage'] == 'kpis' and row['Other ms'] >= 0
+    json.dumps(rerun)
+
+
+def test_rss_is_not_available_without_proc_psutil_or_resource(monkeypatch):
+    def no_proc(*args, **kwargs):
+        raise OSError('no /proc')
+
+    # Windows without psutil
+    monkeypatch.setattr(instrumentation, 'open', no_proc, raising=False)
+    monkeypatch.setitem(sys.modules, 'psutil', None)
+    monkeypatch.setattr(instrumentation, 'resource', None)
+    assert instrumentation.rss_bytes() is None
+
+    profile = RerunProfile()
+    with profile.activate():
+        with stage('kpis'):
+            pass
+    rerun = profile.finish()
+    assert rerun['rss_bytes'] is None and rerun['stages']['kpis']['rss_delta_bytes'] is None
+    assert stage_table(rerun)[0]['RSS Δ MB'] == 'n/a'
+    assert json.loads(json.dumps(rerun))['rss_bytes'] is None
+
+
+def test_helpers_are_no_ops_without_a_profile():
+    with stage('load_data') as record:
+        with timed('compute') as outcome:
+            outcome['hit'] = True
+    assert record is None
+
+
+def test_metrics_log_and_prometheus_file(tmp_path):
+    log_path = tmp_path / 'metrics' / 'reruns.jsonl'
+    prometheus_path = tmp_path / 'metrics' / 'dashboard.prom'
+    metrics = RerunMetrics(str(log_path), str(prometheus_path), window=3)
+    for seconds in [0.1, 0.2, 0.3, 0.4]:
+        metrics.record({'seconds': seconds, 'stages': {'kpis': {'seconds': seconds / 2}}})
+
+    assert [json.loads(line)['seconds'] for line in log_path.read_text().splitlines()] == [0.1, 0.2, 0.3, 0.4]
+    # Percentiles cover the last `window` reruns
+    assert metrics.percentiles()['rerun'][0.5] == pytest.approx(0.3)
+    assert metrics.percentiles()['kpis'][0.5] == pytest.approx(0.15)
+    text = prometheus_path.read_text()
+    assert 'dashboard_rerun_seconds{quantile="0.5"} 0.300000' in text
+    assert 'dashboard_rerun_seconds_count 4' in text
+    assert 'dashboard_stage_seconds{stage="kpis",quantile="0.95"}' in text
+    assert not list(prometheus_path.parent.glob('*.tmp'))
+
+
+def test_metrics_without_paths_write_nothing(tmp_path):
+    metrics = RerunMetrics()
+    metrics.record({'seconds': 0.1, 'stages': {}})
+    assert metrics.percentiles()['rerun'][0.95] == pytest.approx(0.1)
+    assert not list(tmp_path.iterdir())
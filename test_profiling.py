@@ -0,0 +1,59 @@
+import json
+import os
+
+from sales_analytics import profiling
+from sales_analytics.cleaning import CLEANING_STEPS, clean_frame
+from sales_analytics.ingest import iter_raw_chunks
+from sales_analytics.profiling import StageProfiler
+
+RAW_PATH = 'data/raw/Sample - Superstore.csv'
+
+
+def test_stages_are_recorded_in_order(tmp_path):
+    profiler = StageProfiler(log=lambda message: None)
+    with profiler.stage('clean', rows_in=500) as stage:
+        raw = next(iter_raw_chunks(RAW_PATH, chunksize=500))
+        steps = {}
+        df = clean_frame(raw, log=lambda message: None, timings=steps)
+        stage['rows_out'] = len(df)
+        stage['breakdown'] = steps
+    with profiler.stage('sum'):
+        sum(range(1000))
+
+    report = profiler.write_report(tmp_path / 'run.json', mode='full')
+    assert json.loads((tmp_path / 'run.json').read_text())['mode'] == 'full'
+    assert [stage['name'] for stage in report['stages']] == ['clean', 'sum']
+    clean = report['stages'][0]
+    assert (clean['rows_in'], clean['rows_out']) == (500, 500)
+    assert list(clean['breakdown']) == [name for name, _, _ in CLEANING_STEPS]
+    assert clean['wall_seconds'] >= sum(clean['breakdown'].values())
+    assert clean['peak_rss_delta_mb'] >= 0 and clean['cpu_seconds'] >= 0
+    assert report['wall_seconds'] >= clean['wall_seconds'] and report['profile'] is None
+    assert len(profiler.summary(top=1)) == 1
+
+
+def test_one_stage_runs_under_cprofile(tmp_path):
+    profiler = StageProfiler('work', str(tmp_path / 'profiles'), log=lambda message: None)
+    with profiler.stage('setup'):
+        pass
+    with profiler.stage('work'):
+        sorted(range(10000), key=lambda value: -value)
+
+    paths = profiler.report()['profile']
+    assert sorted(os.listdir(tmp_path / 'profiles')) == ['work.prof', 'work.txt']
+    assert paths['prof'].endswith('work.prof')
+    assert 'function calls' in open(paths['summary']).read()
+
+
+def test_peak_rss_is_none_without_resource(tmp_path, monkeypatch):
+    # Windows has no resource module
+    monkeypatch.setattr(profiling, 'resource', None)
+    profiler = StageProfiler(log=lambda message: None)
+    with profiler.stage('sum'):
+        sum(range(1000))
+
+    report = profiler.write_report(tmp_path / 'run.json')
+    assert report['peak_rss_mb'] is None and report['peak_child_rss_mb'] is None
+    assert report['stages'][0]['peak_rss_delta_mb'] is None
+    assert json.loads((tmp_path / 'run.json').read_text())['stages'][0]['peak_child_rss_delta_mb'] is None
+    assert profiler.summary()[0].endswith('n/a MB peak')
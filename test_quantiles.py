@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.quality import QualityStats
+from sales_analytics.quantiles import QuantileSketch
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_exact_median_below_the_distinct_limit():
+    revenue = read_fact_csv(CSV_PATH, columns=['Revenue'])['Revenue']
+    sketch = QuantileSketch(exact_limit=len(revenue))
+    for chunk in np.array_split(revenue.to_numpy(), 9):
+        sketch.merge(QuantileSketch(exact_limit=len(revenue)).add(chunk))
+    assert not sketch.approximate
+    assert sketch.median() == revenue.median()
+
+
+def test_bucketed_median_is_within_the_relative_error():
+    values = pd.Series(np.random.default_rng(1).lognormal(4.0, 1.5, 50_000))
+    whole = QuantileSketch(relative_error=0.001, exact_limit=1000).add(values)
+    chunked = QuantileSketch(relative_error=0.001, exact_limit=1000)
+    for chunk in np.array_split(values.to_numpy(), 7):
+        chunked.merge(QuantileSketch(relative_error=0.001, exact_limit=1000).add(chunk))
+
+    assert whole.approximate and chunked.approximate
+    assert len(whole.counts) < 10_000
+    assert abs(whole.median() / values.median() - 1) <= 0.001
+    # Bucket counts add up, so chunking does not change the answer
+    assert chunked.median() == whole.median()
+    # Signs and zeros survive bucketing
+    mixed = QuantileSketch(exact_limit=2).add([-5.0, -5.0, 0.0, 3.0, 8.0, -1.0])
+    assert mixed.approximate
+    assert abs(mixed.median() - (-0.5)) < 0.01
+
+
+def test_quality_report_counts_invalid_and_non_positive_values():
+    df = read_fact_csv(CSV_PATH).head(100).copy()
+    df.loc[:4, 'Date'] = pd.NaT
+    df.loc[5:6, 'Quantity'] = 0
+    df.loc[7, 'Revenue'] = -1.0
+    stats = QualityStats().add(df.iloc[:50]).merge(QualityStats().add(df.iloc[50:]))
+    assert stats.report()['validity_checks'] == {
+        'invalid_dates': 5,
+        'non_positive_quantity': 2,
+        'non_positive_revenue': 1,
+        'undecodable_characters': 0,
+    }
+    assert stats.report()['null_counts']['Date'] == 5
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from sales_analytics.refresh import BackgroundRefresher
+
+
+class Source:
+    """A version counter and a build that can be held to simulate a slow load"""
+
+    def __init__(self):
+        self.version = 1
+        self.builds = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def build(self, version):
+        self.builds.append(version)
+        self.release.wait()
+        if self.fail:
+            raise OSError('store is being replaced')
+        return {'rows': version * 10}
+
+
+def test_new_version_is_built_aside_and_swapped_in():
+    source = Source()
+    refresher = BackgroundRefresher(lambda: source.version, source.build, interval=3600)
+    first = refresher.current()
+    assert first.data == {'rows': 10} and source.builds == [1]
+
+    # A new version is loaded once a second poll sees it unchanged
+    source.version = 2
+    assert not refresher.check()
+    source.release.clear()
+    builder = threading.Thread(target=refresher.check)
+    builder.start()
+    while refresher.building != 2:
+        time.sleep(0.001)
+    # Readers are served the old snapshot while the new one builds
+    assert refresher.current() is first
+    source.release.set()
+    builder.join()
+
+    second = refresher.current()
+    assert second.version == 2 and second.data == {'rows': 20}
+    assert first.data == {'rows': 10}
+    assert refresher.status()['refreshes'] == 2
+    assert not refresher.check() and source.builds == [1, 2]
+    refresher.stop()
+
+
+def test_failed_build_keeps_serving_the_old_snapshot():
+    source = Source()
+    refresher = BackgroundRefresher(lambda: source.version, source.build, interval=0)
+    first = refresher.current()
+    source.version, source.fail = 2, True
+    # Without a watcher each read checks and loads on the caller's thread
+    assert refresher.current() is first
+    assert refresher.status()['failures'] == 1 and 'store is being replaced' in refresher.last_error
+    # The failed version is not retried until the version changes again
+    assert refresher.current() is first and source.builds == [1, 2]
+
+    source.version, source.fail = 3, False
+    assert refresher.current().data == {'rows': 30}
+    assert refresher.last_error is None
+
+
+def test_watcher_thread_picks_up_new_versions():
+    source = Source()
+    refresher = BackgroundRefresher(lambda: source.version, source.build, interval=0.01)
+    assert refresher.current().version == 1
+    source.version = 2
+    deadline = time.time() + 5
+    while refresher.current().version != 2 and time.time() < deadline:
+        time.sleep(0.01)
+    refresher.stop()
+    assert refresher.current().version == 2 and source.builds == [1, 2]
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.schema import FLOAT32_TOLERANCE, compact_frame, summarize_report
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_compact_frame_preserves_values():
+    """Compaction changes storage types only, never the values"""
+    df = read_fact_csv(CSV_PATH)
+    compact, report = compact_frame(df)
+
+    assert isinstance(compact['Region'].dtype, pd.CategoricalDtype)
+    assert compact['Month'].dtype == np.int8
+    assert compact['Revenue'].dtype == np.float32
+    assert (compact['Region'].astype(str) == df['Region']).all()
+    assert (compact['Quantity'] == df['Quantity']).all()
+    assert np.abs(compact['Profit'].astype('float64') - df['Profit']).max() <= FLOAT32_TOLERANCE
+    assert compact['Date'].cat.ordered and compact['Date'].cat.codes.dtype == np.int16
+    assert (compact['Date'].astype('datetime64[us]') == df['Date']).all()
+
+    assert (report['BytesSaved'] >= 0).all()
+    assert summarize_report(report)['reduction_factor'] >= 4
+
+
+def test_float32_is_skipped_when_unsafe():
+    """Values that float32 cannot hold within tolerance keep their float64 type"""
+    df = pd.DataFrame({'Revenue': [123456789.01, 1.0]})
+    compact, _ = compact_frame(df)
+    assert compact['Revenue'].dtype == np.float64
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.schema import compact_frame
+from sales_analytics.shared_cache import cache_path, fingerprint, load_shared
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_load_shared_maps_published_frame(tmp_path):
+    """The first load publishes the frame; later loads map it read-only without rebuilding"""
+    cache_dir = str(tmp_path / 'cache')
+    builds = []
+
+    def build():
+        builds.append(1)
+        return compact_frame(read_fact_csv(CSV_PATH, columns=['Date', 'Region', 'Revenue', 'Quantity']))
+
+    df, report = load_shared('v1', build, cache_dir)
+    again, again_report = load_shared('v1', build, cache_dir)
+    assert len(builds) == 1
+
+    expected, expected_report = build()
+    pd.testing.assert_frame_equal(again, expected)
+    pd.testing.assert_frame_equal(again_report, expected_report, check_dtype=False)
+    # Columns are views on the mapped file, not private copies
+    assert not again['Revenue'].to_numpy().flags.writeable
+
+    load_shared('v2', build, cache_dir)
+    assert not os.path.exists(cache_path('v1', cache_dir))
+    assert os.path.exists(cache_path('v2', cache_dir))
+
+
+def test_publishing_an_older_version_keeps_newer_files(tmp_path):
+    """A process still on old data must not remove the file of a version published before it finished"""
+    cache_dir = str(tmp_path / 'cache')
+
+    def build():
+        return compact_frame(read_fact_csv(CSV_PATH, columns=['Date', 'Revenue']).head(50))
+
+    second = 10**9
+    load_shared('v1', build, cache_dir, version_time=1 * second)
+    load_shared('v3', build, cache_dir, version_time=3 * second)
+    # Written last, but from data older than v3
+    load_shared('v2', build, cache_dir, version_time=2 * second)
+    assert not os.path.exists(cache_path('v1', cache_dir))
+    assert os.path.exists(cache_path('v2', cache_dir))
+    assert os.path.exists(cache_path('v3', cache_dir))
+
+    load_shared('v4', build, cache_dir, version_time=4 * second)
+    assert sorted(os.listdir(cache_dir)) == [os.path.basename(cache_path('v4', cache_dir))]
+
+
+def test_fingerprint_tracks_source_files(tmp_path):
+    source = tmp_path / 'store'
+    source.mkdir()
+    (source / 'part-0.parquet').write_bytes(b'a')
+    first = fingerprint([str(source)], extra=['Revenue'])
+    assert fingerprint([str(source)], extra=['Revenue']) == first
+    assert fingerprint([str(source)], extra=['Profit']) != first
+
+    (source / 'part-1.parquet').write_bytes(b'b')
+    assert fingerprint([str(source)], extra=['Revenue']) != first
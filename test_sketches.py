@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from sales_analytics.sketches import (
+    ExactDistinct, HyperLogLog, count_blobs, hash_ids, merge_blob_groups, merge_blobs, precision_for_error,
+    sketch_from_hashes
+)
+
+
+def _hashes(start, stop):
+    return hash_ids(np.array([f'ORD-{i}' for i in range(start, stop)], dtype=object))
+
+
+def test_hyperloglog_stays_within_error_bound():
+    relative_error = 0.01
+    sketch = HyperLogLog(precision_for_error(relative_error)).add_hashes(_hashes(0, 200_000))
+    assert abs(sketch.count() - 200_000) / 200_000 < 3 * relative_error
+
+
+def test_merged_sketches_count_the_union():
+    """Overlapping parts merge to the distinct count of their union, in both modes"""
+    parts = [_hashes(0, 6000), _hashes(4000, 9000), _hashes(8500, 12000)]
+    for mode, tolerance in (('exact', 0), ('hll', 0.03)):
+        blobs = [sketch_from_hashes(part, mode).to_bytes() for part in parts]
+        assert abs(count_blobs(blobs) - 12000) <= tolerance * 12000
+
+
+def test_serialization_round_trip():
+    hashes = _hashes(0, 50)
+    exact = ExactDistinct(hashes)
+    assert ExactDistinct.from_bytes(exact.to_bytes()).count() == 50
+
+    hll = HyperLogLog(12).add_hashes(hashes)
+    restored = HyperLogLog.from_bytes(hll.to_bytes())
+    assert np.array_equal(restored.registers, hll.registers)
+
+
+def test_mixed_kinds_and_precisions_merge_to_the_coarsest_hyperloglog():
+    """Exact sets and HyperLogLogs of any precision merge as one HyperLogLog at the lowest precision"""
+    hashes = _hashes(0, 20000)
+    # Folding a finer HyperLogLog down gives the registers of one built at the lower precision
+    folded = merge_blobs([HyperLogLog(14).add_hashes(hashes).to_bytes(), HyperLogLog(10).to_bytes()])
+    assert folded.precision == 10
+    assert np.array_equal(folded.registers, HyperLogLog(10).add_hashes(hashes).registers)
+
+    blobs = [ExactDistinct(_hashes(0, 8000)).to_bytes(),
+             HyperLogLog(14).add_hashes(_hashes(6000, 15000)).to_bytes(),
+             HyperLogLog(11).add_hashes(_hashes(14000, 20000)).to_bytes()]
+    merged = merge_blobs(blobs)
+    assert merged.precision == 11
+    assert np.array_equal(merged.registers, HyperLogLog(11).add_hashes(hashes).registers)
+
+    grouped = merge_blob_groups(blobs + [ExactDistinct(_hashes(0, 10)).to_bytes()], [0, 0, 0, 1], 2)
+    assert grouped[0] == merged.to_bytes()
+    assert count_blobs(grouped[1:]) == 10
+    with pytest.raises(ValueError, match='sketch'):
+        merge_blobs([b'X123'])
@@ -0,0 +1,92 @@
+import datetime
+import shutil
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.cube import build_cube, filter_cells
+from sales_analytics.fact_store import iter_fact_batches, read_fact_csv, write_fact_store
+from sales_analytics.filter_index import FilterIndex, sort_by_date
+from sales_analytics.panels import PandasPanels
+from sales_analytics.schema import compact_frame
+from sales_analytics.star_schema import build_star_schema
+
+pytest.importorskip('duckdb')
+
+from sales_analytics.sql_backend import SQLEngine, SQLPanels  # noqa: E402
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+FRAME_PANELS = ['monthly', 'region', 'category', 'subcategory', 'segment', 'quarterly', 'profit_bins',
+                'top_products', 'top_customers', 'numeric_summary', 'categorical_summary', 'time_intelligence']
+STATES = [
+    (None, {}),
+    ((datetime.date(2015, 3, 10), datetime.date(2016, 8, 20)), {'Region': 'West', 'Segment': 'Consumer'}),
+]
+
+
+@pytest.fixture(scope='module')
+def reference():
+    rows, _ = compact_frame(sort_by_date(read_fact_csv(CSV_PATH)))
+    return rows, FilterIndex(rows), build_cube(rows)
+
+
+def _as_plain(frame, name):
+    if name.startswith('top_'):
+        # Ranked panels keep the positions of their groups; only the order matters
+        frame = frame.reset_index(drop=True)
+    return frame.astype({col: str for col in frame.columns if not pd.api.types.is_numeric_dtype(frame[col])})
+
+
+@pytest.mark.parametrize('source', ['store', 'star', 'csv'])
+def test_sql_panels_match_pandas(tmp_path, reference, source):
+    """Every panel agrees with the in-memory reference, from the Parquet store, the star schema or the CSV"""
+    rows, index, cube = reference
+    store_path, star_path = str(tmp_path / 'store'), str(tmp_path / 'star')
+    if source != 'csv':
+        write_fact_store(read_fact_csv(CSV_PATH), store_path)
+    if source == 'star':
+        build_star_schema(lambda columns: iter_fact_batches(store_path, columns), star_path)
+        shutil.rmtree(store_path)
+    engine = SQLEngine(store_path, CSV_PATH, star_path)
+    assert engine.source == {'store': store_path, 'star': star_path, 'csv': CSV_PATH}[source]
+    assert engine.date_bounds() == index.date_bounds()
+    assert engine.values('Region') == index.values('Region')
+
+    for date_range, selections in STATES:
+        positions = index.query(date_range, selections)
+        data = SimpleNamespace(cells=filter_cells(cube, rows, index, date_range, selections),
+                               filtered_df=rows.iloc[positions], cube=cube,
+                               history_cells=filter_cells(cube, rows, index, selections=selections))
+        expected, actual = PandasPanels(data), SQLPanels(engine, date_range, selections)
+
+        totals = actual.totals()
+        assert totals.keys() == expected.totals().keys()
+        assert np.allclose(list(totals.values()), list(expected.totals().values()))
+        assert actual.orders() == expected.orders()
+        pd.testing.assert_frame_equal(actual.correlation(), expected.correlation())
+        # The compacted rows hold float32 measures, so edges near zero differ in the last digits
+        for name in FRAME_PANELS:
+            pd.testing.assert_frame_equal(_as_plain(getattr(actual, name)(), name),
+                                          _as_plain(getattr(expected, name)(), name),
+                                          check_dtype=False, check_index_type=False, rtol=1e-6, atol=1e-2, obj=name)
+
+        # Sampled rows differ, but the outliers and the size of the sample do not
+        points = actual.scatter_points()
+        assert list(points.columns) == list(expected.scatter_points().columns)
+        assert len(points) == len(expected.scatter_points())
+        assert np.isclose(points['Revenue'].max(), data.filtered_df['Revenue'].max())
+
+
+def test_engine_keeps_the_data_it_was_built_with(tmp_path):
+    """Rewriting the store (a pipeline run in progress) does not show through an existing engine"""
+    store_path = str(tmp_path / 'store')
+    df = read_fact_csv(CSV_PATH)
+    write_fact_store(df, store_path)
+    engine = SQLEngine(store_path, CSV_PATH, str(tmp_path / 'star'))
+    before = SQLPanels(engine).totals()
+
+    write_fact_store(df[df['Region'] == 'West'], store_path)
+    assert SQLPanels(engine).totals() == before
+    assert SQLPanels(SQLEngine(store_path, CSV_PATH, str(tmp_path / 'star'))).totals() != before
@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.cleaning import CATEGORICAL_COLS, standardize_categoricals
+from sales_analytics.standardize import CanonicalRules, load_rules, parse_rules, standardize_values
+
+
+def test_default_rules_match_strip_and_title():
+    """Each distinct spelling is cleaned once; rows get the same values as str.strip().str.title()"""
+    raw = pd.DataFrame({col: [' west', 'WEST', 'east ', 'West', np.nan, 'east'] for col in CATEGORICAL_COLS})
+    expected = {col: raw[col].str.strip().str.title() for col in CATEGORICAL_COLS}
+    cleaned = standardize_categoricals(raw.copy())
+    for col in CATEGORICAL_COLS:
+        assert isinstance(cleaned[col].dtype, pd.CategoricalDtype)
+        assert cleaned[col].cat.categories.tolist() == ['East', 'West']
+        pd.testing.assert_series_equal(cleaned[col].astype(object), expected[col].astype(object))
+    assert cleaned['Region'].isna().tolist() == [False, False, False, False, True, False]
+
+
+def test_aliases_and_unicode_merge_categories():
+    rules = CanonicalRules(unicode='NFKC', collapse_spaces=True, case='upper',
+                           aliases={'washington  dc': 'DC', 'wash. d.c.': 'DC'})
+    values = pd.Series(['Washington DC', ' washington   dc', 'Wash. D.C.', 'Ｏｈｉｏ', 'Ohio', None], name='State')
+    result = standardize_values(values, rules)
+    assert result.cat.categories.tolist() == ['DC', 'OHIO']
+    assert result.astype(object).tolist()[:5] == ['DC', 'DC', 'DC', 'OHIO', 'OHIO']
+    assert pd.isna(result.iloc[5]) and result.name == 'State'
+
+    # Without a case rule the spelling is only stripped
+    assert standardize_values(pd.Series(['Second Class ', 'second class']), CanonicalRules(case=None)).nunique() == 2
+
+
+def test_rules_file(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'*': {'case': 'upper'}, 'ShipMode': {'case': None, 'aliases': {'1st': 'First Class'}}}))
+    rules = load_rules(str(path), ('ShipMode', 'Region'))
+    assert rules['Region'].case == 'upper' and rules['ShipMode'].case is None
+    frame = standardize_categoricals(pd.DataFrame({'ShipMode': ['1st ', 'Same Day'], 'Region': ['west', 'West']}), rules)
+    assert frame['ShipMode'].tolist() == ['First Class', 'Same Day']
+    assert frame['Region'].cat.categories.tolist() == ['WEST']
+
+    with pytest.raises(ValueError, match='Segmnt'):
+        parse_rules({'Segmnt': {'case': 'lower'}}, CATEGORICAL_COLS)
+    with pytest.raises(ValueError, match='case rule'):
+        parse_rules({'*': {'case': 'sentence'}}, CATEGORICAL_COLS)
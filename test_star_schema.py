@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from sales_analytics.fact_store import iter_fact_batches, load_fact_table, read_fact_csv, write_fact_store
+from sales_analytics.star_schema import (
+    CLEAN_COLUMNS, DIMENSIONS, StarSchema, build_star_schema, date_dimension, update_star_schema
+)
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def _build(tmp_path):
+    store_path, star_path = str(tmp_path / 'store'), str(tmp_path / 'star')
+    write_fact_store(read_fact_csv(CSV_PATH), store_path)
+    counts = build_star_schema(lambda columns: iter_fact_batches(store_path, columns, batch_rows=3000), star_path)
+    return store_path, star_path, counts
+
+
+def test_star_schema_round_trips_the_fact_table(tmp_path):
+    """Joining every dimension back gives the cleaned rows; keys are dense int32"""
+    store_path, star_path, counts = _build(tmp_path)
+    expected = read_fact_csv(CSV_PATH)
+    star = StarSchema(star_path)
+    assert counts['FactSales'] == len(expected)
+    assert counts['DimGeography'] == len(expected[['Country', 'City', 'State', 'PostalCode', 'Region']].drop_duplicates())
+
+    fact = star.fact()
+    assert fact['CustomerKey'].dtype == np.int32 and fact['DateKey'].iloc[0] > 20000000
+    assert fact['ProductKey'].max() == counts['DimProduct'] - 1
+
+    actual = star.load().sort_values('RowID', ignore_index=True)
+    assert list(actual.columns) == CLEAN_COLUMNS
+    expected = expected.sort_values('RowID', ignore_index=True)
+    for col in CLEAN_COLUMNS:
+        values = actual[col].astype(str) if isinstance(actual[col].dtype, pd.CategoricalDtype) else actual[col]
+        assert (np.asarray(values) == np.asarray(expected[col])).all(), col
+
+
+def test_dimensions_are_joined_lazily(tmp_path):
+    store_path, star_path, _ = _build(tmp_path)
+    star = StarSchema(star_path)
+    rows = star.load(['Revenue', 'Region', 'Year'])
+    assert list(rows.columns) == ['Region', 'Revenue', 'Year']
+    assert set(star._dimensions) == {'DimGeography', 'DimDate'}
+    assert isinstance(rows['Region'].dtype, pd.CategoricalDtype)
+
+    # With no Parquet store the loader reads the star schema before the CSV
+    loaded = load_fact_table(['Revenue', 'Segment'], store_path=str(tmp_path / 'none'),
+                             csv_path=str(tmp_path / 'none.csv'), star_path=star_path)
+    assert len(loaded) == len(rows) and loaded['Segment'].nunique() == 3
+
+
+def test_date_dimension_follows_dax_calendar():
+    dates = date_dimension('2016-12-25', '2017-01-08')
+    assert len(dates) == 15
+    assert dates['DateKey'].iloc[0] == 20161225
+    # WEEKNUM: week 1 holds January 1st (a Sunday in 2017); WEEKDAY: Sunday = 1
+    week_zero_based = dates['Date'].dt.strftime('%U').astype(int)
+    jan1_sunday = pd.to_datetime(dates['Year'].astype(str) + '-01-01').dt.dayofweek == 6
+    assert (dates['WeekNum'] == week_zero_based + np.where(jan1_sunday, 0, 1)).all()
+    assert dates['DayOfWeek'].tolist()[:8] == [1, 2, 3, 4, 5, 6, 7, 1]
+    assert dates['IsWeekend'].tolist()[:7] == [True, False, False, False, False, False, True]
+    assert dates['YearMonthName'].iloc[-1] == '2017-Jan' and dates['MonthName'].iloc[0] == 'December'
+    assert str(dates['QuarterStart'].iloc[0].date()) == '2016-10-01'
+    assert str(dates['YearStart'].iloc[-1].date()) == '2017-01-01'
+
+
+def _loaded(star_path):
+    rows = StarSchema(star_path).load().sort_values('RowID', ignore_index=True)
+    return rows.astype({col: str for col in rows.columns if isinstance(rows[col].dtype, pd.CategoricalDtype)})
+
+
+def test_keys_are_kept_across_rebuilds_and_updates(tmp_path):
+    df = read_fact_csv(CSV_PATH).sort_values('Date', ignore_index=True)
+    early, late = df.iloc[:8000], df.iloc[8000:]
+    store_path, star_path = str(tmp_path / 'store'), str(tmp_path / 'star')
+    write_fact_store(early, store_path)
+    build_star_schema(lambda columns: iter_fact_batches(store_path, columns), star_path)
+    before = {name: pd.read_parquet(tmp_path / 'star' / f'{name}.parquet') for name in DIMENSIONS}
+
+    # An incremental update keys the new rows and a changed one, appending unseen members
+    changed = early.iloc[[5]].assign(Revenue=early['Revenue'].iloc[5] + 100.0)
+    counts = update_star_schema(pd.concat([late, changed], ignore_index=True), star_path)
+    assert counts['FactSales'] == len(df)
+    for name, (key, _) in DIMENSIONS.items():
+        after = pd.read_parquet(tmp_path / 'star' / f'{name}.parquet')
+        pd.testing.assert_frame_equal(after.head(len(before[name])), before[name])
+        assert (after[key] == np.arange(len(after))).all()
+    expected = pd.concat([early.drop(index=5), changed, late]).sort_values('RowID', ignore_index=True)
+    updated = _loaded(star_path)
+    pd.testing.assert_series_equal(updated['Revenue'], expected['Revenue'], check_dtype=False)
+
+    # A full rebuild over the same rows keeps every key
+    write_fact_store(expected, store_path)
+    build_star_schema(lambda columns: iter_fact_batches(store_path, columns), star_path)
+    pd.testing.assert_frame_equal(_loaded(star_path), updated)
+    # Swapped in without leaving the staged or retired copies behind
+    assert sorted(os.listdir(tmp_path)) == ['star', 'store']
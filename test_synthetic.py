@@ -0,0 +1,54 @@
+import pandas as pd
+
+from sales_analytics.cleaning import clean_frame
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.ingest import iter_raw_chunks
+from sales_analytics.synthetic import ExtractGenerator, entity_counts, generate_extract, write_extract
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+RAW_PATH = 'data/raw/Sample - Superstore.csv'
+
+
+def test_extract_cleans_to_the_fact_schema():
+    raw = generate_extract(5000, seed=1)
+    sample = next(iter_raw_chunks(RAW_PATH, chunksize=10))
+    assert raw.columns.tolist() == sample.columns.tolist()
+
+    clean = clean_frame(raw, log=lambda message: None)
+    expected = read_fact_csv(CSV_PATH).head(10)
+    assert clean.columns.tolist() == expected.columns.tolist()
+    assert clean['Date'].notna().all() and (clean['ShipDate'] >= clean['Date']).all()
+    assert clean['RowID'].is_unique and len(clean) == 5000
+
+
+def test_orders_have_several_lines_and_one_customer():
+    raw = generate_extract(20000, seed=2)
+    lines = raw.groupby('Order ID').size()
+    assert 1.7 < lines.mean() < 2.3 and lines.max() > 3
+    per_order = raw.groupby('Order ID')[['Customer ID', 'Order Date', 'Ship Mode']].nunique()
+    assert (per_order == 1).all().all()
+    # A customer always lives in the same place
+    assert (raw.groupby('Customer ID')['City'].nunique() == 1).all()
+
+
+def test_popularity_is_skewed():
+    raw = generate_extract(20000, seed=3)
+    for col in ['Customer ID', 'Product ID']:
+        counts = raw[col].value_counts()
+        top_share = counts.head(len(counts) // 10).sum() / len(raw)
+        assert top_share > 0.3, col
+    customers, products = entity_counts(10_000)
+    assert 700 <= customers <= 900 and 1700 <= products <= 2000
+
+
+def test_chunks_continue_ids_and_are_deterministic(tmp_path):
+    path = write_extract(tmp_path / 'raw.csv', 2500, seed=4, chunk_rows=1000)
+    written = pd.read_csv(path)
+    assert written['Row ID'].tolist() == list(range(1, 2501))
+    # Orders never straddle chunks, and their IDs do not repeat across chunks
+    chunk_of_row = (written['Row ID'] - 1) // 1000
+    assert (written.groupby('Order ID').apply(lambda rows: chunk_of_row[rows.index].nunique()) == 1).all()
+
+    again = pd.concat(ExtractGenerator(2500, seed=4).chunks(1000), ignore_index=True)
+    assert written['Order ID'].tolist() == again['Order ID'].tolist()
+    pd.testing.assert_series_equal(written['Sales'], again['Sales'])
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.cube import build_cube, rollup
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.time_intelligence import as_of, month_span, period_measures
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_period_measures_match_resampled_rows():
+    """Shifts and running totals on the dense month axis match a resample of the fact rows"""
+    df = read_fact_csv(CSV_PATH)
+    cube = build_cube(df)
+    west = cube[cube['Region'] == 'West']
+    table = period_measures(rollup(west, ['Year', 'Month']), months=month_span(cube))
+
+    monthly = df[df['Region'] == 'West'].set_index('Date')['Revenue'].resample('MS').sum()
+    monthly = monthly.reindex(pd.date_range('2014-01-01', '2017-12-01', freq='MS'), fill_value=0.0)
+    assert len(table) == 48
+    assert np.allclose(table['Revenue'], monthly)
+    assert np.allclose(table['Revenue_MoM'][1:], monthly.pct_change().fillna(0.0)[1:])
+    assert np.allclose(table['Revenue_QoQ'][3:], monthly.pct_change(3)[3:])
+    assert np.allclose(table['Revenue_YoY'][12:], monthly.pct_change(12)[12:])
+    assert table['Revenue_YoY'][:12].isna().all()
+    assert np.allclose(table['Revenue_Rolling3M'], monthly.rolling(3, min_periods=1).sum())
+    assert np.allclose(table['Revenue_YTD'], monthly.groupby(monthly.index.year).cumsum())
+    assert np.allclose(table['Revenue_QTD'], monthly.groupby([monthly.index.year, monthly.index.quarter]).cumsum())
+
+    row = as_of(table, pd.Timestamp('2016-08-20'))
+    ytd = monthly['2016-01':'2016-08'].sum()
+    assert np.isclose(row['Revenue_YTD'], ytd)
+    assert np.isclose(row['Revenue_YTD_YoY'], ytd / monthly['2015-01':'2015-08'].sum() - 1)
+    assert as_of(table, pd.Timestamp('2018-01-01')) is None
+
+
+def test_growth_against_empty_months():
+    """Months without sales are zeros; growth from a zero prior is 0, as DAX's DIVIDE"""
+    monthly = pd.DataFrame({'Year': [2016, 2016], 'Month': [2, 4], 'Revenue': [10.0, 30.0], 'Profit': [1.0, 3.0]})
+    table = period_measures(monthly, months=(np.datetime64('2016-01'), np.datetime64('2016-05')))
+    assert table['Revenue'].tolist() == [0.0, 10.0, 0.0, 30.0, 0.0]
+    assert np.isnan(table['Revenue_MoM'][0])
+    assert table['Revenue_MoM'][1:].tolist() == [0.0, -1.0, 0.0, -1.0]
+    assert table['Revenue_QTD'].tolist() == [0.0, 10.0, 10.0, 30.0, 30.0]
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from sales_analytics.fact_store import read_fact_csv
+from sales_analytics.topk import top_k, top_k_positions
+
+CSV_PATH = 'data/processed/FactSales_clean.csv'
+
+
+def test_top_k_matches_nlargest():
+    df = read_fact_csv(CSV_PATH, columns=['Product', 'State', 'Revenue'])
+    for entity, k in [('Product', 20), ('State', 15)]:
+        totals = df.groupby(entity, observed=True)['Revenue'].sum().reset_index()
+        pd.testing.assert_frame_equal(top_k(totals, 'Revenue', k), totals.nlargest(k, 'Revenue'))
+
+
+def test_top_k_positions_ties_and_nan():
+    values = np.array([3.0, np.nan, 5.0, 3.0, 5.0, 1.0])
+    assert top_k_positions(values, 3).tolist() == [2, 4, 0]
+    assert top_k_positions(values, 10).tolist() == [2, 4, 0, 3, 5, 1]
+    assert top_k_positions(values, 0).tolist() == []
+